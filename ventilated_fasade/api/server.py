@@ -0,0 +1,505 @@
+from logic.batch_runner import calculate_chunk
+from logic.calculator import InsulationCalculator
+from logic.thermal import ThermalSolver
+from logic.result_cache import canonical_payload, get_result_cache
+from logic.validators import InputValidator, ValidationError
+from data.catalog import get_catalog
+from config import (
+    API_HOST, API_MAX_BODY, API_MAX_CONCURRENCY, API_MAX_DRAWS,
+    API_MAX_PAGE_SIZE, API_PORT, ARCHIVE_PAGE_SIZE, DB_URL,
+    MONTE_CARLO_DRAWS)
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+from collections import Counter, deque
+from dataclasses import asdict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 4096
+THROUGHPUT_WINDOW_S = 60
+
+
+class HttpError(Exception):
+    """Ошибка запроса с HTTP-статусом."""
+
+    def __init__(self, status: int, message: str):
+        self.status = status
+        self.message = message
+        super().__init__(message)
+
+
+class ServiceStats:
+    """Счетчики задержек и пропускной способности сервиса."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = Counter()
+        self.errors = Counter()
+        self.coalesced = 0
+        self.in_flight = 0
+        self._latencies: Dict[str, deque] = {}
+        self._recent = deque()
+
+    def record(self, route: str, status: int, elapsed: float):
+        now = time.monotonic()
+        self.requests[route] += 1
+        if status >= 400:
+            self.errors[route] += 1
+        self._latencies.setdefault(
+            route, deque(maxlen=LATENCY_WINDOW)).append(elapsed)
+        self._recent.append(now)
+        while self._recent and now - self._recent[0] > THROUGHPUT_WINDOW_S:
+            self._recent.popleft()
+
+    @staticmethod
+    def _percentiles(values) -> dict:
+        ordered = sorted(values)
+
+        def pick(q):
+            return round(ordered[min(len(ordered) - 1,
+                                     int(q * len(ordered)))] * 1000, 3)
+        return {
+            'p50_ms': pick(0.5), 'p95_ms': pick(0.95),
+            'p99_ms': pick(0.99), 'max_ms': round(ordered[-1] * 1000, 3),
+        }
+
+    def snapshot(self) -> dict:
+        uptime = time.monotonic() - self.started
+        total = sum(self.requests.values())
+        return {
+            'uptime_s': round(uptime, 1),
+            'requests': total,
+            'errors': sum(self.errors.values()),
+            'coalesced': self.coalesced,
+            'in_flight': self.in_flight,
+            'rps_total': round(total / uptime, 2) if uptime else 0.0,
+            'rps_recent': round(
+                len(self._recent) / min(uptime, THROUGHPUT_WINDOW_S), 2
+            ) if uptime else 0.0,
+            'routes': {
+                route: {
+                    'requests': self.requests[route],
+                    'errors': self.errors[route],
+                    **self._percentiles(latencies),
+                }
+                for route, latencies in self._latencies.items()
+            },
+        }
+
+
+class Coalescer:
+    """
+    Объединение одинаковых одновременных запросов.
+
+    Пока запрос с ключом key выполняется, повторные запросы
+    с тем же ключом ждут его результат, а не считают заново.
+    """
+
+    def __init__(self, stats: ServiceStats):
+        self.stats = stats
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, factory: Callable[[], Awaitable]):
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(factory())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+
+ROUTES = ('health', 'stats', 'materials', 'calculate', 'batch', 'thermal')
+
+
+def route_of(path: str) -> str:
+    """Имя маршрута для счетчиков."""
+    if path == '/calculations' or path.startswith('/calculations/'):
+        return 'calculations'
+    name = path.strip('/')
+    return name if name in ROUTES else 'unknown'
+
+
+def _payload_key(route: str, payload) -> str:
+    return route + ':' + json.dumps(
+        payload, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def list_materials(db_url: str = DB_URL) -> dict:
+    """Каталог материалов (выполняется в потоке пула)."""
+    return {'items': get_catalog(db_url).get_all_materials()}
+
+
+def result_cache_stats(db_url: str = DB_URL) -> dict:
+    """Счетчики кэша результатов (выполняется в потоке пула)."""
+    return get_result_cache(db_url).stats()
+
+
+def calculate_single(payload: dict, db_url: str = DB_URL) -> dict:
+    """Одиночный расчет: валидация и отчет InsulationCalculator."""
+    if not isinstance(payload, dict):
+        raise HttpError(400, 'Ожидался JSON-объект')
+    try:
+        validated = InputValidator.validate_inputs(payload)
+        reveal_area_m2 = InputValidator.validate_positive_number(
+            payload.get('reveal_area_m2') or 0, 'Площадь откосов',
+            min_value=0)
+        # Слои берутся из канонического вида, по нему же ключ кэша
+        canonical = canonical_payload(payload)
+        monte_carlo = payload.get('monte_carlo')
+        if monte_carlo is not None:
+            if not isinstance(monte_carlo, dict):
+                raise ValidationError('monte_carlo должен быть объектом')
+            draws = InputValidator.validate_positive_integer(
+                monte_carlo.get('draws') or MONTE_CARLO_DRAWS,
+                'Число розыгрышей')
+            if draws > API_MAX_DRAWS:
+                raise ValidationError(
+                    f'Число розыгрышей не больше {API_MAX_DRAWS}')
+            seed = monte_carlo.get('seed')
+            if seed is not None:
+                seed = InputValidator.validate_positive_integer(
+                    seed, 'seed', min_value=0)
+    except ValidationError as e:
+        raise HttpError(422, str(e))
+    outer = canonical['outer_material']
+    inner = canonical['inner_material']
+    if not outer:
+        raise HttpError(422, 'Не указан материал внешнего слоя')
+    try:
+        repo = get_catalog(db_url)
+        calc = InsulationCalculator(
+            outer_material_ru_name=outer,
+            inner_material_ru_name=inner,
+            repo=repo,
+            use_layout=bool(payload.get('use_layout')),
+            reveal_area_m2=reveal_area_m2,
+            zoned_fasteners=bool(payload.get('zoned_fasteners')),
+            **validated
+        )
+        result = get_result_cache(db_url).get_or_compute(
+            canonical, calc.summary, catalog_version=repo.version)
+        if monte_carlo is not None:
+            result['monte_carlo'] = calc.simulate(draws, seed)
+        return result
+    except ValueError as e:
+        raise HttpError(422, str(e))
+
+
+_solvers: Dict[str, Tuple[object, ThermalSolver]] = {}
+
+
+def solve_thermal(payload: dict, db_url: str = DB_URL) -> dict:
+    """
+    Система с R >= target_r и наименьшим объемом утеплителя.
+
+    Индексы решателя строятся один раз на каталог и переиспользуются
+    до его перезагрузки.
+    """
+    if not isinstance(payload, dict):
+        raise HttpError(400, 'Ожидался JSON-объект')
+    try:
+        target_r = InputValidator.validate_positive_number(
+            payload.get('target_r'), 'Целевое сопротивление')
+    except ValidationError as e:
+        raise HttpError(422, str(e))
+    catalog = get_catalog(db_url)
+    cached = _solvers.get(db_url)
+    if cached is None or cached[0] is not catalog:
+        cached = _solvers[db_url] = (catalog, ThermalSolver(catalog))
+    try:
+        stack = cached[1].solve(
+            target_r,
+            system_type=payload.get('system_type') or 'any',
+            outer_material_type=payload.get('outer_material_type'),
+            inner_material_type=payload.get('inner_material_type'),
+            allow_same=payload.get('allow_same', True),
+        )
+    except ValueError as e:
+        raise HttpError(422, str(e))
+    if stack is None:
+        raise HttpError(404, f'Нет системы с R >= {target_r}')
+    return {**asdict(stack), 'system_type': stack.system_type}
+
+
+def _int_param(params: dict, name: str) -> Optional[int]:
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise HttpError(400, f'Параметр {name} должен быть целым числом')
+
+
+def list_calculations(params: Dict[str, str], db_url: str = DB_URL) -> dict:
+    """Страница архива расчетов по параметрам запроса (в потоке пула)."""
+    from data.calc_archive import archive_item_to_dict, query_archive
+    from data.db import get_scoped_session
+    from data.services_calc import calc_to_dict
+
+    limit = _int_param(params, 'limit')
+    if limit is None:
+        limit = ARCHIVE_PAGE_SIZE
+    if not 1 <= limit <= API_MAX_PAGE_SIZE:
+        raise HttpError(
+            422, f'limit должен быть от 1 до {API_MAX_PAGE_SIZE}')
+    with_payloads = params.get('payloads') in ('1', 'true')
+    registry = get_scoped_session(db_url)
+    try:
+        page = query_archive(
+            registry(),
+            engineer_id=_int_param(params, 'engineer_id'),
+            year=_int_param(params, 'year'),
+            month=_int_param(params, 'month'),
+            status=params.get('status'),
+            address=params.get('address'),
+            manager_id=_int_param(params, 'manager_id'),
+            series_only=params.get('series_only') in ('1', 'true'),
+            cursor=params.get('cursor'),
+            limit=limit,
+            with_payloads=with_payloads,
+        )
+        to_dict = calc_to_dict if with_payloads else archive_item_to_dict
+        return {
+            'items': [to_dict(calc) for calc in page.items],
+            'next_cursor': page.next_cursor,
+        }
+    except ValueError as e:
+        raise HttpError(400, str(e))
+    finally:
+        registry.remove()
+
+
+def lookup_calculation(number: str, db_url: str = DB_URL) -> dict:
+    """Сохраненный расчет по номеру (выполняется в потоке пула)."""
+    from data.db import get_scoped_session
+    from data.services_calc import calc_to_dict, get_calc_by_number
+
+    registry = get_scoped_session(db_url)
+    try:
+        calc = get_calc_by_number(registry(), number)
+        if calc is None:
+            raise HttpError(404, f'Расчет {number} не найден')
+        return calc_to_dict(calc)
+    finally:
+        registry.remove()
+
+
+class CalculationService:
+    """
+    Локальный HTTP/JSON-сервис расчетов на asyncio.
+
+    Маршруты:
+        GET  /health                — проверка доступности
+        GET  /stats                 — счетчики задержек и нагрузки
+        GET  /materials             — каталог материалов
+        POST /calculate             — расчет одного фасада
+        POST /batch                 — расчет списка фасадов {"items": [...]}
+        POST /thermal               — подбор системы по целевому R
+        GET  /calculations          — архив расчетов: фильтры
+                                      engineer_id, year, month, status,
+                                      address, manager_id, series_only;
+                                      страницы limit и cursor
+        GET  /calculations/<номер>  — сохраненный расчет
+
+    Блокирующая работа выполняется в пуле потоков, не больше
+    max_concurrency запросов одновременно; соединения с БД берутся
+    из общего пула движка.
+    """
+
+    def __init__(self, db_url: str = DB_URL,
+                 max_concurrency: int = API_MAX_CONCURRENCY,
+                 max_body: int = API_MAX_BODY):
+        self.db_url = db_url
+        self.max_body = max_body
+        self.stats = ServiceStats()
+        self.coalescer = Coalescer(self.stats)
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix='api')
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def _run_blocking(self, fn, *args):
+        async with self._limit:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, fn, *args)
+
+    async def _call(self, route: str, payload, fn, *args):
+        return await self.coalescer.run(
+            _payload_key(route, payload),
+            lambda: self._run_blocking(fn, *args)
+        )
+
+    async def dispatch(self, method: str, path: str, body: bytes,
+                       query: str = '') -> Tuple[int, object]:
+        """Выполняет запрос, возвращает (статус, тело ответа)."""
+        if path == '/health' and method == 'GET':
+            return 200, {'status': 'ok'}
+        if path == '/stats' and method == 'GET':
+            snapshot = self.stats.snapshot()
+            cache = await self._run_blocking(result_cache_stats, self.db_url)
+            return 200, {**snapshot, 'result_cache': cache}
+        if path == '/materials' and method == 'GET':
+            result = await self._call(
+                'materials', None, list_materials, self.db_url)
+            return 200, result
+        if path == '/calculations' and method == 'GET':
+            params = dict(parse_qsl(query))
+            result = await self._call(
+                'calculations', params,
+                list_calculations, params, self.db_url)
+            return 200, result
+        if path.startswith('/calculations/') and method == 'GET':
+            number = unquote(path[len('/calculations/'):])
+            result = await self._call(
+                'calculations', number,
+                lookup_calculation, number, self.db_url)
+            return 200, result
+        if path in ('/calculate', '/batch', '/thermal'):
+            if method != 'POST':
+                raise HttpError(405, 'Метод не поддерживается')
+            try:
+                payload = json.loads(body or b'null')
+            except ValueError:
+                raise HttpError(400, 'Некорректный JSON')
+            if path == '/calculate':
+                result = await self._call(
+                    'calculate', payload,
+                    calculate_single, payload, self.db_url)
+                return 200, result
+            if path == '/thermal':
+                result = await self._call(
+                    'thermal', payload, solve_thermal, payload, self.db_url)
+                return 200, result
+            items = payload.get('items') if isinstance(payload, dict) else None
+            if not isinstance(items, list):
+                raise HttpError(400, 'Ожидался объект {"items": [...]}')
+            rows = [item if isinstance(item, dict) else {
+                '_error': 'Элемент должен быть объектом'} for item in items]
+            records = await self._call(
+                'batch', items, calculate_chunk, rows, 0, self.db_url)
+            return 200, {'items': records}
+        raise HttpError(404, 'Маршрут не найден')
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise HttpError(400, 'Некорректная строка запроса')
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = header.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HttpError(400, 'Некорректный Content-Length')
+        if length > self.max_body:
+            raise HttpError(413, 'Слишком большое тело запроса')
+        body = await reader.readexactly(length) if length else b''
+        keep_alive = (
+            headers.get('connection', '').lower() != 'close'
+            if version == 'HTTP/1.1'
+            else headers.get('connection', '').lower() == 'keep-alive'
+        )
+        url = urlsplit(target)
+        return method.upper(), url.path, url.query, body, keep_alive
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int,
+                       data, keep_alive: bool):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        head = (
+            f'HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n'
+            f'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n'
+            f'\r\n'
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, query, body, keep_alive = request
+                except HttpError as e:
+                    await self._respond(
+                        writer, e.status, {'error': e.message}, False)
+                    break
+
+                started = time.perf_counter()
+                self.stats.in_flight += 1
+                try:
+                    status, data = await self.dispatch(
+                        method, path, body, query)
+                except HttpError as e:
+                    status, data = e.status, {'error': e.message}
+                except Exception as e:
+                    logger.error(f'Ошибка обработки {method} {path}: {e}',
+                                 exc_info=True)
+                    status, data = 500, {'error': 'Внутренняя ошибка'}
+                finally:
+                    self.stats.in_flight -= 1
+                self.stats.record(
+                    route_of(path), status, time.perf_counter() - started)
+                await self._respond(writer, status, data, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = API_HOST, port: int = API_PORT):
+        """Прогревает каталог и начинает принимать соединения."""
+        await self._run_blocking(get_catalog, self.db_url)
+        self._server = await asyncio.start_server(
+            self.handle_connection, host, port)
+        logger.info(f'Сервис расчетов запущен на http://{host}:{port}')
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        logger.info('Сервис расчетов остановлен')
+
+
+async def serve(host: str = API_HOST, port: int = API_PORT,
+                db_url: str = DB_URL,
+                max_concurrency: int = API_MAX_CONCURRENCY):
+    """Запускает сервис и работает до отмены."""
+    service = CalculationService(db_url, max_concurrency)
+    server = await service.start(host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
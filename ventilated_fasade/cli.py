@@ -0,0 +1,253 @@
+from config import (
+    API_HOST, API_MAX_CONCURRENCY, API_PORT, BATCH_CHUNK_SIZE,
+    CALC_TRANSFER_BATCH_SIZE, DB_URL, SWEEP_CHUNK_SIZE)
+import sys
+import os
+import time
+import asyncio
+import argparse
+import logging
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+logger = logging.getLogger(__name__)
+
+
+def setup_logging(verbose: bool = False):
+    """Логирование консольного режима: только stderr, без файлов GUI."""
+    logging.basicConfig(
+        level=logging.DEBUG if verbose else logging.INFO,
+        format='%(asctime)s %(levelname)s: %(message)s',
+        datefmt='%H:%M:%S',
+        stream=sys.stderr
+    )
+    logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
+    # Пакетный калькулятор пишет INFO на каждую порцию
+    logging.getLogger('logic.batch_calculator').setLevel(logging.WARNING)
+
+
+def cmd_batch(args) -> int:
+    """Пакетный расчет фасадов из CSV/JSONL."""
+    from logic.batch_runner import run_batch
+
+    started = time.perf_counter()
+
+    def progress(total, errors):
+        logger.info(f'Обработано строк: {total}, ошибок: {errors}')
+
+    stats = run_batch(
+        args.input, args.output,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        input_format=args.input_format,
+        output_format=args.output_format,
+        db_url=args.db_url,
+        progress=progress if args.verbose else None
+    )
+    elapsed = time.perf_counter() - started
+    print(
+        f'Готово: {stats["total"]} строк, успешно {stats["ok"]}, '
+        f'ошибок {stats["errors"]} за {elapsed:.1f} с',
+        file=sys.stderr
+    )
+    return 1 if args.fail_on_error and stats['errors'] else 0
+
+
+def cmd_sweep(args) -> int:
+    """Перебор параметров фасада с выгрузкой таблицы чувствительности."""
+    from logic.sweep import ParameterSweep, parse_range
+
+    started = time.perf_counter()
+    sweep = ParameterSweep(
+        area_m2=parse_range(args.area),
+        building_height_m=parse_range(args.height),
+        count_corner=[int(v) for v in parse_range(args.corners)],
+        outer_materials=args.outer,
+        inner_materials=args.inner or [None],
+    )
+    result = sweep.run(workers=args.workers, chunk_size=args.chunk_size)
+    result.save(args.output)
+    elapsed = time.perf_counter() - started
+    print(f'Готово: {len(result)} точек за {elapsed:.1f} с', file=sys.stderr)
+    return 0
+
+
+def cmd_export_calcs(args) -> int:
+    """Выгрузка сохраненных расчетов в JSONL."""
+    from data.calc_transfer import export_calculations
+
+    started = time.perf_counter()
+    count = export_calculations(
+        args.output, db_url=args.db_url, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - started
+    print(f'Готово: {count} расчетов за {elapsed:.1f} с', file=sys.stderr)
+    return 0
+
+
+def cmd_import_calcs(args) -> int:
+    """Загрузка расчетов из JSONL-выгрузки."""
+    from data.calc_transfer import CalcImporter
+
+    started = time.perf_counter()
+
+    def progress(stats):
+        logger.info(
+            f'Обработано строк: {stats["total"]}, '
+            f'загружено: {stats["imported"]}'
+        )
+
+    importer = CalcImporter(
+        args.db_url, batch_size=args.batch_size,
+        on_conflict='skip' if args.skip_existing else 'remap')
+    stats = importer.run(args.input, progress if args.verbose else None)
+    for old, new in importer.remapped.items():
+        logger.debug(f'Серия {old} загружена под номером {new}')
+    elapsed = time.perf_counter() - started
+    print(
+        f'Готово: {stats["total"]} строк, загружено {stats["imported"]}, '
+        f'новых номеров серий {stats["remapped"]}, '
+        f'пропущено {stats["skipped"]}, ошибок {stats["errors"]} '
+        f'за {elapsed:.1f} с',
+        file=sys.stderr
+    )
+    return 1 if args.fail_on_error and stats['errors'] else 0
+
+
+def cmd_serve(args) -> int:
+    """Локальный HTTP-сервис расчетов."""
+    from api.server import serve
+
+    try:
+        asyncio.run(serve(
+            args.host, args.port, args.db_url, args.concurrency))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='Калькулятор теплоизоляции НФС без графического интерфейса'
+    )
+    parser.add_argument('--db-url', default=DB_URL, help='URL базы материалов')
+    parser.add_argument(
+        '-v', '--verbose', action='store_true', help='Подробный журнал')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    batch = commands.add_parser(
+        'batch', help='Пакетный расчет фасадов из CSV или JSONL',
+        description=(
+            'Колонки: area_m2, building_height_m, count_corner, perimeter_m, '
+            'outer_material, inner_material (необязательно), id '
+            '(необязательно).'
+        )
+    )
+    batch.add_argument('input', help='Входной файл .csv или .jsonl')
+    batch.add_argument('output', help='Файл результатов .csv или .jsonl')
+    batch.add_argument(
+        '-w', '--workers', type=int, default=None,
+        help='Число процессов (по умолчанию — число ядер)')
+    batch.add_argument(
+        '--chunk-size', type=int, default=BATCH_CHUNK_SIZE,
+        help='Число фасадов в порции')
+    batch.add_argument(
+        '--input-format', choices=['csv', 'jsonl'],
+        help='Формат входа, если не определяется по расширению')
+    batch.add_argument(
+        '--output-format', choices=['csv', 'jsonl'],
+        help='Формат результата, если не определяется по расширению')
+    batch.add_argument(
+        '--fail-on-error', action='store_true',
+        help='Код возврата 1, если есть строки с ошибками')
+    batch.set_defaults(handler=cmd_batch)
+
+    sweep = commands.add_parser(
+        'sweep', help='Перебор параметров фасада (таблица чувствительности)',
+        description=(
+            'Значения осей: "30", "30,40,60" или "30:60:5" '
+            '(начало:конец:шаг, конец включается). Рассчитывается '
+            'каждая комбинация значений и материалов.'
+        )
+    )
+    sweep.add_argument('output', help='Файл результатов .csv или .xlsx')
+    sweep.add_argument('--area', required=True, help='Площадь фасада, м²')
+    sweep.add_argument(
+        '--height', required=True, help='Высота здания, м')
+    sweep.add_argument(
+        '--corners', default='0', help='Количество внешних углов')
+    sweep.add_argument(
+        '--outer', action='append', required=True,
+        help='Материал внешнего слоя (можно указать несколько раз)')
+    sweep.add_argument(
+        '--inner', action='append',
+        help='Материал внутреннего слоя (можно указать несколько раз)')
+    sweep.add_argument(
+        '-w', '--workers', type=int, default=None,
+        help='Число потоков (по умолчанию — число ядер)')
+    sweep.add_argument(
+        '--chunk-size', type=int, default=SWEEP_CHUNK_SIZE,
+        help='Число точек сетки в порции')
+    sweep.set_defaults(handler=cmd_sweep)
+
+    export_calcs = commands.add_parser(
+        'export-calcs', help='Выгрузка сохраненных расчетов в JSONL',
+        description=(
+            'Одна строка — один расчет с инженером, адресом, менеджерами, '
+            'входными данными и результатом.'
+        )
+    )
+    export_calcs.add_argument('output', help='Файл выгрузки .jsonl')
+    export_calcs.add_argument(
+        '--batch-size', type=int, default=CALC_TRANSFER_BATCH_SIZE,
+        help='Число расчетов в порции')
+    export_calcs.set_defaults(handler=cmd_export_calcs)
+
+    import_calcs = commands.add_parser(
+        'import-calcs', help='Загрузка расчетов из JSONL-выгрузки',
+        description=(
+            'Инженеры, адреса и менеджеры сопоставляются с существующими. '
+            'Серии, номера которых уже заняты, получают новые номера '
+            '(или пропускаются с --skip-existing).'
+        )
+    )
+    import_calcs.add_argument('input', help='Файл выгрузки .jsonl')
+    import_calcs.add_argument(
+        '--batch-size', type=int, default=CALC_TRANSFER_BATCH_SIZE,
+        help='Число расчетов в транзакции')
+    import_calcs.add_argument(
+        '--skip-existing', action='store_true',
+        help='Пропускать серии с занятыми номерами вместо перенумерации')
+    import_calcs.add_argument(
+        '--fail-on-error', action='store_true',
+        help='Код возврата 1, если есть строки с ошибками')
+    import_calcs.set_defaults(handler=cmd_import_calcs)
+
+    serve = commands.add_parser(
+        'serve', help='Локальный HTTP/JSON-сервис расчетов')
+    serve.add_argument('--host', default=API_HOST, help='Адрес сервиса')
+    serve.add_argument(
+        '--port', type=int, default=API_PORT, help='Порт сервиса')
+    serve.add_argument(
+        '--concurrency', type=int, default=API_MAX_CONCURRENCY,
+        help='Число одновременно выполняемых запросов')
+    serve.set_defaults(handler=cmd_serve)
+    return parser
+
+
+def main(argv=None) -> int:
+    """Точка входа консольного режима."""
+    args = build_parser().parse_args(argv)
+    setup_logging(args.verbose)
+    try:
+        return args.handler(args)
+    except (OSError, ValueError) as e:
+        logger.error(f'Ошибка: {e}')
+        return 2
+    finally:
+        from data.db import dispose_engines
+        dispose_engines()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
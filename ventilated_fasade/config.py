@@ -11,7 +11,51 @@ os.makedirs(os.path.dirname(INSUL_DB_NAME), exist_ok=True)
 os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
 
 STRICT_FIXTURE = True
+# Размер пачки продуктов при потоковой синхронизации фикстуры
+FIXTURE_BATCH_SIZE = 5000
+# Число фасадов в одной порции консольного пакетного расчета
+BATCH_CHUNK_SIZE = 2000
+# Число точек сетки в одной порции параметрического расчета
+SWEEP_CHUNK_SIZE = 100000
+# Число розыгрышей вероятностного расчета на фасад
+MONTE_CARLO_DRAWS = 20000
+# Число результатов расчета в памяти; остальные — в таблице result_cache
+RESULT_CACHE_SIZE = 512
+# Метка версии каталога перечитывается из БД при изменении файлов БД
+# и не реже чем раз в столько секунд (на случай грубого mtime)
+CATALOG_VERSION_MAX_AGE = 5.0
+
+# Локальный HTTP-сервис расчетов
+API_HOST = '127.0.0.1'
+API_PORT = 8765
+# Одновременно выполняемых запросов, остальные ждут в очереди
+API_MAX_CONCURRENCY = 8
+# Максимальный размер тела запроса, байт
+API_MAX_BODY = 16 * 1024 * 1024
+# Предел розыгрышей вероятностного расчета в одном запросе
+API_MAX_DRAWS = 200000
+
+# Строк расчетов в одной транзакции импорта/экспорта JSONL
+CALC_TRANSFER_BATCH_SIZE = 5000
+
+# Строк на странице архива расчетов и предел для одного запроса API
+ARCHIVE_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+
+# Повторы транзакции при занятой БД SQLite (database is locked)
+SQLITE_BUSY_RETRIES = 5
+# Начальная пауза между повторами, с; удваивается с каждой попыткой
+SQLITE_BUSY_BACKOFF = 0.05
+
+# Профиль SQLite, применяется к каждому новому соединению
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
 REQUIRED_DEPENDENCIES = [
+    'numpy',
     'openpyxl',
     'reportlab',
     'sqlalchemy'
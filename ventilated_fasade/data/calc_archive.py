@@ -0,0 +1,151 @@
+# data/calc_archive.py
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import exists, func, or_, select, tuple_
+from sqlalchemy.orm import defer, joinedload, selectinload
+
+from config import ARCHIVE_PAGE_SIZE
+from .models_calc import Address, Calculation, calculation_managers
+
+PAYLOAD_COLUMNS = (Calculation.input_payload, Calculation.result_payload)
+ADDRESS_COLUMNS = (Address.line1, Address.city, Address.region)
+
+
+@dataclass
+class ArchivePage:
+    """Страница архива; next_cursor=None — страница последняя."""
+    items: List[Calculation] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(calc: Calculation) -> str:
+    return f"{calc.created_at.isoformat()},{calc.id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Позиция (created_at, id) из курсора encode_cursor."""
+    try:
+        created_at, calc_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(created_at), int(calc_id)
+    except ValueError:
+        raise ValueError(f"Некорректный курсор архива: {cursor}")
+
+
+def _load_options(with_payloads: bool) -> list:
+    options = [
+        joinedload(Calculation.engineer),
+        joinedload(Calculation.address),
+        selectinload(Calculation.managers),
+    ]
+    if not with_payloads:
+        # JSON входа и результата загрузится при первом обращении
+        options += [defer(column) for column in PAYLOAD_COLUMNS]
+    return options
+
+
+def query_archive(
+    session,
+    engineer_id: Optional[int] = None,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    status: Optional[str] = None,
+    address: Optional[str] = None,
+    manager_id: Optional[int] = None,
+    series_only: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = ARCHIVE_PAGE_SIZE,
+    with_payloads: bool = False,
+) -> ArchivePage:
+    """
+    Страница архива расчетов, новые сверху.
+
+    Страницы выбираются по ключу (created_at, id): следующая начинается
+    строго после последней строки предыдущей (курсор next_cursor),
+    поэтому запрос идет по индексу ix_calc_created и не зависит от
+    номера страницы, как OFFSET. address — подстрока улицы, города
+    или региона без учета регистра, в том числе кириллицы;
+    series_only оставляет только первые версии серий (ревизии —
+    list_revisions). Без with_payloads колонки input_payload
+    и result_payload не читаются, пока к ним не обратятся
+    в открытой сессии.
+    """
+    if limit < 1:
+        raise ValueError("Размер страницы должен быть больше нуля")
+    stmt = select(Calculation)
+    if engineer_id is not None:
+        stmt = stmt.where(Calculation.engineer_id == engineer_id)
+    if year is not None:
+        stmt = stmt.where(Calculation.year == year)
+    if month is not None:
+        stmt = stmt.where(Calculation.month == month)
+    if status:
+        stmt = stmt.where(Calculation.status == status)
+    if series_only:
+        stmt = stmt.where(Calculation.version == 0)
+    if address:
+        # casefold регистрирует get_engine: lower() SQLite знает только ASCII
+        pattern = address.casefold()
+        stmt = stmt.where(Calculation.address_id.in_(
+            select(Address.id).where(or_(*(
+                func.casefold(column).contains(pattern, autoescape=True)
+                for column in ADDRESS_COLUMNS)))))
+    if manager_id is not None:
+        link = calculation_managers.c
+        stmt = stmt.where(exists().where(
+            link.calculation_id == Calculation.id,
+            link.manager_id == manager_id))
+    if cursor:
+        stmt = stmt.where(tuple_(Calculation.created_at, Calculation.id)
+                          < tuple_(*decode_cursor(cursor)))
+
+    stmt = (stmt.options(*_load_options(with_payloads))
+            .order_by(Calculation.created_at.desc(), Calculation.id.desc())
+            .limit(limit + 1))
+    items = list(session.execute(stmt).unique().scalars())
+    page = ArchivePage(items=items[:limit])
+    if len(items) > limit:
+        page.next_cursor = encode_cursor(page.items[-1])
+    return page
+
+
+def list_revisions(session, base_number: str,
+                   with_payloads: bool = False) -> List[Calculation]:
+    """Все версии серии по возрастанию номера версии."""
+    return list(session.execute(
+        select(Calculation)
+        .where(Calculation.base_number == base_number)
+        .options(*_load_options(with_payloads))
+        .order_by(Calculation.version)
+    ).unique().scalars())
+
+
+def count_versions(session, base_numbers: Iterable[str]) -> Dict[str, int]:
+    """Число версий каждой из серий (одним запросом по uq_calc_version)."""
+    base_numbers = list(base_numbers)
+    if not base_numbers:
+        return {}
+    return dict(session.execute(
+        select(Calculation.base_number, func.count())
+        .where(Calculation.base_number.in_(base_numbers))
+        .group_by(Calculation.base_number)
+    ).tuples().all())
+
+
+def archive_item_to_dict(calc: Calculation) -> dict:
+    """Строка архива без входных данных и результата."""
+    return {
+        "id": calc.id,
+        "number": calc.number,
+        "base_number": calc.base_number,
+        "version": calc.version,
+        "status": calc.status,
+        "year": calc.year,
+        "month": calc.month,
+        "created_at": calc.created_at.isoformat(),
+        "updated_at": calc.updated_at.isoformat(),
+        "engineer": f"{calc.engineer.last_name} {calc.engineer.first_name}",
+        "address": calc.address.line1 if calc.address else None,
+        "managers": [f"{m.last_name} {m.first_name}" for m in calc.managers],
+    }
@@ -0,0 +1,489 @@
+# data/calc_transfer.py
+import json
+import logging
+import tempfile
+from collections import defaultdict
+from operator import itemgetter
+from datetime import datetime
+from itertools import islice
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import String, insert, select, text, type_coerce
+
+from config import CALC_TRANSFER_BATCH_SIZE, DB_URL
+from .db import ensure_indexes, ensure_unique_constraints, get_engine
+from .models_calc import (
+    Address, Base, Calculation, Engineer, Manager, calculation_managers)
+from .services_calc import advance_seqs, make_base_number, make_number, \
+    reserve_seq
+
+logger = logging.getLogger("insulation.calc")
+
+PERSON_FIELDS = ("first_name", "last_name", "email", "phone")
+ADDRESS_FIELDS = ("line1", "city", "region", "postal_code", "note")
+# Ключи уникальности uq_address и uq_manager_name (uq_engineer_name)
+ADDRESS_KEY = ("line1", "city", "region", "postal_code")
+PERSON_KEY = ("first_name", "last_name")
+CONFLICT_MODES = ("remap", "skip")
+EXPORT_FIELDS = ("id", "number", "base_number", "version", "status",
+                 "year", "month", "seq")
+RAW_FIELDS = ("created_at", "updated_at", "input_payload", "result_payload")
+# Серия с занятым номером, ожидающая перенумерации
+DEFERRED = object()
+# Пакетная вставка без обработки типов на строку: даты и JSON
+# сериализуются заранее в формате колонок DateTime и JSON
+CALC_COLUMNS = (
+    "engineer_id", "address_id", "base_number", "version", "number",
+    "year", "month", "seq", "created_at", "updated_at", "status",
+    "input_payload", "result_payload")
+_INSERT_CALC = text(
+    f"INSERT INTO calculations ({', '.join(CALC_COLUMNS)}) "
+    f"VALUES ({', '.join(':' + c for c in CALC_COLUMNS)})")
+_INSERT_LINK = text(
+    "INSERT INTO calculation_managers (calculation_id, manager_id) "
+    "VALUES (:calculation_id, :manager_id)")
+
+
+address_key = itemgetter(*ADDRESS_KEY)
+person_key = itemgetter(*PERSON_KEY)
+
+
+def _export_query(batch_size: int):
+    calc = Calculation.__table__
+    eng = Engineer.__table__
+    addr = Address.__table__
+    # Даты и JSON читаются как хранятся в SQLite, без разбора в объекты
+    columns = [calc.c[name] for name in EXPORT_FIELDS]
+    columns += [type_coerce(calc.c[name], String).label(name)
+                for name in RAW_FIELDS]
+    columns += [eng.c[name] for name in PERSON_FIELDS]
+    columns += [addr.c.id.label("address_id")]
+    columns += [addr.c[name] for name in ADDRESS_FIELDS]
+    return (select(*columns)
+            .join(eng, eng.c.id == calc.c.engineer_id)
+            .outerjoin(addr, addr.c.id == calc.c.address_id)
+            .order_by(calc.c.id)
+            .limit(batch_size))
+
+
+def _managers_by_calc(conn, ids: List[int]) -> Dict[int, List[dict]]:
+    link = calculation_managers
+    mgr = Manager.__table__
+    rows = conn.execute(
+        select(link.c.calculation_id, *(mgr.c[name] for name in PERSON_FIELDS))
+        .join(mgr, mgr.c.id == link.c.manager_id)
+        .where(link.c.calculation_id.in_(ids))
+        .order_by(link.c.calculation_id, mgr.c.last_name, mgr.c.first_name)
+    ).all()
+    managers = defaultdict(list)
+    for calc_id, *person in rows:
+        managers[calc_id].append(dict(zip(PERSON_FIELDS, person)))
+    return managers
+
+
+def _iso(value: str) -> str:
+    """Дата SQLite "YYYY-MM-DD HH:MM:SS.ffffff" в формате ISO 8601."""
+    return value.replace(" ", "T", 1)
+
+
+def iter_export_lines(conn, batch_size: int = CALC_TRANSFER_BATCH_SIZE
+                      ) -> Iterator[str]:
+    """
+    Строки JSONL выгрузки расчетов, порциями по batch_size.
+
+    Порции выбираются по возрастанию id (WHERE id > последний),
+    инженер и адрес — одним JOIN, менеджеры — одним запросом на порцию.
+    input и result переносятся в строку готовым текстом JSON из БД.
+    """
+    query = _export_query(batch_size)
+    calc_id = Calculation.__table__.c.id
+    fields = len(EXPORT_FIELDS)
+    people = fields + len(RAW_FIELDS)
+    address = people + len(PERSON_FIELDS)
+    last_id = 0
+    while True:
+        rows = conn.execute(query.where(calc_id > last_id)).all()
+        if not rows:
+            return
+        managers = _managers_by_calc(conn, [row[0] for row in rows])
+        for row in rows:
+            record = dict(zip(EXPORT_FIELDS[1:], row[1:fields]))
+            created_at, updated_at, payload_in, payload_out = \
+                row[fields:people]
+            record["created_at"] = _iso(created_at)
+            record["updated_at"] = _iso(updated_at)
+            record["engineer"] = dict(
+                zip(PERSON_FIELDS, row[people:address]))
+            record["address"] = None if row[address] is None else dict(
+                zip(ADDRESS_FIELDS, row[address + 1:]))
+            record["managers"] = managers.get(row[0], [])
+            head = json.dumps(record, ensure_ascii=False)
+            yield (f'{head[:-1]}, "input": {payload_in}, '
+                   f'"result": {payload_out}}}')
+        last_id = rows[-1][0]
+
+
+def export_calculations(path: str, db_url: str = DB_URL,
+                        batch_size: int = CALC_TRANSFER_BATCH_SIZE,
+                        progress: Optional[Callable[[int], None]] = None
+                        ) -> int:
+    """Выгружает все расчеты в JSONL, одна строка — один расчет."""
+    count = 0
+    with get_engine(db_url).connect() as conn, \
+            open(path, "w", encoding="utf-8") as file:
+        lines = iter_export_lines(conn, batch_size)
+        while True:
+            batch = list(islice(lines, batch_size))
+            if not batch:
+                break
+            file.write("\n".join(batch) + "\n")
+            count += len(batch)
+            if progress:
+                progress(count)
+    logger.info(f"Выгружено расчетов: {count} в {path}")
+    return count
+
+
+def _parse_datetime(value) -> datetime:
+    return datetime.fromisoformat(value) if value else datetime.utcnow()
+
+
+def _sqlite_datetime(value: datetime) -> str:
+    """Дата в формате, в котором ее хранит тип DateTime для SQLite."""
+    return value.isoformat(" ", "microseconds")
+
+
+def parse_record(record: dict) -> dict:
+    """Проверяет строку выгрузки и приводит поля к типам модели."""
+    try:
+        engineer = record["engineer"]
+        parsed = {
+            "engineer": {name: engineer.get(name) for name in PERSON_FIELDS},
+            "address": None,
+            "managers": [
+                {name: m.get(name) for name in PERSON_FIELDS}
+                for m in record.get("managers") or []
+            ],
+            "base_number": str(record["base_number"]),
+            "version": int(record.get("version") or 0),
+            "year": int(record["year"]),
+            "month": int(record["month"]),
+            "seq": int(record["seq"]),
+            "status": record.get("status") or "draft",
+            "created_at": _parse_datetime(record.get("created_at")),
+            "updated_at": _parse_datetime(record.get("updated_at")),
+            "input_payload": record["input"],
+            "result_payload": record["result"],
+        }
+    except KeyError as e:
+        raise ValueError(f"нет поля {e}")
+    except (AttributeError, TypeError) as e:
+        raise ValueError(f"некорректная структура: {e}")
+    parsed["number"] = record.get("number") or make_number(
+        parsed["base_number"], parsed["version"])
+    if record.get("address"):
+        parsed["address"] = {
+            name: record["address"].get(name) for name in ADDRESS_FIELDS}
+        if not parsed["address"]["line1"]:
+            raise ValueError("у адреса нет line1")
+    for person in [parsed["engineer"], *parsed["managers"]]:
+        if not person["first_name"] or not person["last_name"]:
+            raise ValueError("не указаны имя и фамилия")
+    if not 1 <= parsed["month"] <= 12:
+        raise ValueError(f"некорректный месяц {parsed['month']}")
+    parsed["engineer_key"] = person_key(parsed["engineer"])
+    parsed["address_key"] = parsed["address"] and address_key(
+        parsed["address"])
+    parsed["manager_keys"] = [person_key(m) for m in parsed["managers"]]
+    return parsed
+
+
+def parse_lines(lines: Iterable[str], source: str,
+                stats: Dict[str, int]) -> Iterator[dict]:
+    """
+    Разобранные строки JSONL по одной, исходный текст — в ключе "line".
+
+    Ошибочные строки пропускаются и считаются в stats['errors'].
+    """
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        stats["total"] += 1
+        try:
+            parsed = parse_record(json.loads(line))
+        except (ValueError, AttributeError) as e:
+            stats["errors"] += 1
+            logger.warning(f"{source}:{line_no}: строка пропущена: {e}")
+            continue
+        parsed["line"] = line
+        yield parsed
+
+
+class CalcImporter:
+    """
+    Пакетный импорт расчетов из выгрузки export_calculations.
+
+    Инженеры, адреса и менеджеры сопоставляются с БД по ключам
+    uq_engineer_name, uq_address и uq_manager_name через словари
+    в памяти: существующие читаются один раз, недостающие
+    добавляются одним INSERT на порцию. Так же в памяти держатся
+    занятые base_number, номера и ключи серий (инженер, год, месяц,
+    seq). Серия (все версии одного base_number) сохраняет исходный
+    номер, если он не занят. Серия, которая уже есть в БД — строка
+    с тем же инженером, версией и created_at, в том числе под
+    номером, выданным прошлым импортом, — не считается конфликтом:
+    ее сохраненные версии пропускаются, недостающие дописываются,
+    поэтому прерванный перенос можно просто запустить снова.
+    Конфликтующие серии при on_conflict="skip" пропускаются, а при
+    "remap" откладываются во временный файл и после основного прохода
+    получают новые seq из счетчика calc_sequences — к этому моменту
+    счетчик уже выше всех сохраненных исходных номеров, и новые номера
+    не отнимают их у еще не прочитанных серий. Каждая порция пишется
+    в своей транзакции.
+    """
+
+    def __init__(self, db_url: str = DB_URL,
+                 batch_size: int = CALC_TRANSFER_BATCH_SIZE,
+                 on_conflict: str = "remap"):
+        if on_conflict not in CONFLICT_MODES:
+            raise ValueError(f"Неизвестный режим конфликтов: {on_conflict}")
+        self.engine = get_engine(db_url)
+        self.batch_size = batch_size
+        self.on_conflict = on_conflict
+        Base.metadata.create_all(self.engine)
+        ensure_unique_constraints(self.engine, Base.metadata)
+        ensure_indexes(self.engine, Base.metadata)
+
+        self.engineers: Dict[tuple, int] = {}
+        self.initials: Dict[int, str] = {}
+        self.addresses: Dict[tuple, int] = {}
+        self.managers: Dict[tuple, int] = {}
+        self.taken_bases = set()
+        self.taken_numbers = set()
+        self.taken_keys = set()
+        # (инженер, версия, created_at) -> (base_number, seq) строк БД
+        self.stored: Dict[tuple, tuple] = {}
+        # исходный base_number -> (base_number, seq) в БД;
+        # None — серия пропущена, DEFERRED — ждет нового номера
+        self.series: Dict[str, object] = {}
+        self.versions = set()
+        self.remapped: Dict[str, str] = {}
+        self._load_indexes()
+
+    def _load_indexes(self):
+        calc = Calculation.__table__
+        with self.engine.connect() as conn:
+            for row in conn.execute(select(Engineer.__table__)):
+                self.engineers[(row.first_name, row.last_name)] = row.id
+                self.initials[row.id] = self._initials(
+                    row.first_name, row.last_name)
+            for row in conn.execute(select(Address.__table__)):
+                self.addresses[address_key(row._mapping)] = row.id
+            for row in conn.execute(select(Manager.__table__)):
+                self.managers[(row.first_name, row.last_name)] = row.id
+            for base, number, version, created_at, *key in conn.execute(
+                    select(calc.c.base_number, calc.c.number,
+                           calc.c.version,
+                           type_coerce(calc.c.created_at, String),
+                           calc.c.engineer_id, calc.c.year, calc.c.month,
+                           calc.c.seq)):
+                self.taken_bases.add(base)
+                self.taken_numbers.add(number)
+                self.taken_keys.add(tuple(key))
+                self.versions.add((base, version))
+                self.stored[(key[0], version, created_at)] = (base, key[3])
+
+    @staticmethod
+    def _initials(first_name: str, last_name: str) -> str:
+        return Engineer(first_name=first_name, last_name=last_name).initials
+
+    @staticmethod
+    def _insert_missing(conn, table, index: dict, rows: Dict[tuple, dict],
+                        key_fields) -> List[tuple]:
+        """Добавляет строки, ключей которых нет в index; возвращает ключи."""
+        missing = [row for key, row in rows.items() if key not in index]
+        if not missing:
+            return []
+        result = conn.execute(
+            insert(table).returning(
+                table.c.id, *(table.c[name] for name in key_fields),
+                sort_by_parameter_order=True),
+            missing)
+        added = []
+        for row in result:
+            key = tuple(row[1:])
+            index[key] = row.id
+            added.append(key)
+        return added
+
+    def _resolve_people(self, conn, records: List[dict]):
+        engineers, addresses, managers = {}, {}, {}
+        for record in records:
+            engineers.setdefault(record["engineer_key"], record["engineer"])
+            if record["address"]:
+                addresses.setdefault(record["address_key"], record["address"])
+            for key, manager in zip(record["manager_keys"],
+                                    record["managers"]):
+                managers.setdefault(key, manager)
+
+        for key in self._insert_missing(conn, Engineer.__table__,
+                                        self.engineers, engineers, PERSON_KEY):
+            self.initials[self.engineers[key]] = self._initials(*key)
+        self._insert_missing(
+            conn, Address.__table__, self.addresses, addresses, ADDRESS_KEY)
+        self._insert_missing(
+            conn, Manager.__table__, self.managers, managers, PERSON_KEY)
+
+    def _assign_series(self, conn, records: List[dict], remap: bool):
+        """Решает по новым сериям порции: оставить номер, сменить или пропустить."""
+        new = {}
+        for record in records:
+            base = record["base_number"]
+            if base not in self.series or (
+                    remap and self.series[base] is DEFERRED):
+                new.setdefault(base, record)
+        kept = defaultdict(int)
+        conflicts = defaultdict(list)
+        for base, record in new.items():
+            stored = self.stored.get((
+                record["engineer_id"], record["version"],
+                _sqlite_datetime(record["created_at"])))
+            if stored is not None:
+                # серия уже перенесена: дописываются только новые версии
+                self.series[base] = stored
+                continue
+            key = (record["engineer_id"], record["year"], record["month"],
+                   record["seq"])
+            if (base in self.taken_bases or key in self.taken_keys
+                    or record["number"] in self.taken_numbers):
+                if self.on_conflict == "skip":
+                    self.series[base] = None
+                elif remap:
+                    conflicts[key[:3]].append(base)
+                else:
+                    self.series[base] = DEFERRED
+                continue
+            self.series[base] = (base, record["seq"])
+            self.taken_bases.add(base)
+            self.taken_keys.add(key)
+            kept[key[:3]] = max(kept[key[:3]], record["seq"])
+
+        if kept:
+            advance_seqs(conn, [key + (seq,) for key, seq in kept.items()])
+        for (engineer_id, year, month), bases in conflicts.items():
+            dt = datetime(year, month, 1)
+            first = reserve_seq(conn, engineer_id, dt, len(bases))
+            for seq, base in enumerate(bases, first):
+                new_base = make_base_number(
+                    self.initials[engineer_id], seq, dt)
+                self.series[base] = (new_base, seq)
+                self.remapped[base] = new_base
+                self.taken_bases.add(new_base)
+                self.taken_keys.add((engineer_id, year, month, seq))
+
+    def _import_batch(self, records: List[dict], stats: Dict[str, int],
+                      deferred: Optional[IO[str]] = None):
+        calc = Calculation.__table__
+        with self.engine.begin() as conn:
+            self._resolve_people(conn, records)
+            for record in records:
+                record["engineer_id"] = self.engineers[record["engineer_key"]]
+            self._assign_series(conn, records, remap=deferred is None)
+
+            rows, links = [], []
+            for record in records:
+                source = record["base_number"]
+                target = self.series[source]
+                if target is DEFERRED:
+                    deferred.write(record["line"])
+                    continue
+                if target is None or (
+                        target[0], record["version"]) in self.versions:
+                    stats["skipped"] += 1
+                    continue
+                base, seq = target
+                self.versions.add((base, record["version"]))
+                number = record["number"] if base == source \
+                    else make_number(base, record["version"])
+                self.taken_numbers.add(number)
+                rows.append({
+                    "engineer_id": record["engineer_id"],
+                    "address_id": record["address"] and self.addresses[
+                        record["address_key"]],
+                    "base_number": base,
+                    "version": record["version"],
+                    "number": number,
+                    "year": record["year"],
+                    "month": record["month"],
+                    "seq": seq,
+                    "created_at": _sqlite_datetime(record["created_at"]),
+                    "updated_at": _sqlite_datetime(record["updated_at"]),
+                    "status": record["status"],
+                    "input_payload": json.dumps(record["input_payload"]),
+                    "result_payload": json.dumps(record["result_payload"]),
+                })
+                links.append((number, {
+                    self.managers[key] for key in record["manager_keys"]}))
+            if not rows:
+                return
+            conn.execute(_INSERT_CALC, rows)
+            link_rows = [
+                {"number": number, "manager_id": manager_id}
+                for number, managers in links for manager_id in managers
+            ]
+            if link_rows:
+                ids = dict(conn.execute(
+                    select(calc.c.number, calc.c.id).where(calc.c.number.in_(
+                        {row["number"] for row in link_rows}))
+                ).tuples().all())
+                conn.execute(_INSERT_LINK, [
+                    {"calculation_id": ids[row["number"]],
+                     "manager_id": row["manager_id"]} for row in link_rows])
+        stats["imported"] += len(rows)
+
+    def _import_stream(self, records: Iterator[dict], stats: Dict[str, int],
+                       deferred: Optional[IO[str]], progress):
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                return
+            self._import_batch(batch, stats, deferred)
+            stats["remapped"] = len(self.remapped)
+            if progress:
+                progress(stats)
+
+    def run(self, path: str,
+            progress: Optional[Callable[[Dict[str, int]], None]] = None
+            ) -> Dict[str, int]:
+        """
+        Импортирует файл JSONL.
+
+        Возвращает счетчики {'total', 'imported', 'remapped', 'skipped',
+        'errors'}; remapped — число серий с новым номером, соответствие
+        старых и новых base_number остается в self.remapped.
+        """
+        stats = {"total": 0, "imported": 0, "remapped": 0,
+                 "skipped": 0, "errors": 0}
+        with open(path, encoding="utf-8") as file, \
+                tempfile.TemporaryFile("w+", encoding="utf-8") as deferred:
+            self._import_stream(
+                parse_lines(file, path, stats), stats, deferred, progress)
+            deferred.seek(0)
+            self._import_stream(
+                parse_lines(deferred, path, {"total": 0, "errors": 0}),
+                stats, None, progress)
+        logger.info(
+            f"Импорт {path}: {stats['imported']} из {stats['total']} "
+            f"расчетов, новых номеров серий {stats['remapped']}, "
+            f"пропущено {stats['skipped']}, ошибок {stats['errors']}"
+        )
+        return stats
+
+
+def import_calculations(path: str, db_url: str = DB_URL,
+                        batch_size: int = CALC_TRANSFER_BATCH_SIZE,
+                        on_conflict: str = "remap",
+                        progress: Optional[Callable[[Dict[str, int]], None]]
+                        = None) -> Dict[str, int]:
+    """Импортирует выгрузку расчетов в БД (см. CalcImporter)."""
+    return CalcImporter(db_url, batch_size, on_conflict).run(path, progress)
@@ -0,0 +1,326 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from config import CATALOG_VERSION_MAX_AGE, DB_URL
+
+logger = logging.getLogger('insulation.catalog')
+
+
+@dataclass(frozen=True)
+class CatalogSize:
+    """Размер плиты в каталоге."""
+    length_mm: int
+    width_mm: int
+
+
+@dataclass(frozen=True)
+class CatalogThickness:
+    """Толщина плиты в каталоге."""
+    thickness_mm: int
+
+
+@dataclass(frozen=True)
+class CatalogProduct:
+    """
+    Неизменяемая запись каталога.
+
+    Повторяет атрибуты Product, которые использует калькулятор,
+    поэтому может передаваться вместо ORM-объекта.
+    """
+    product_name_ru: str
+    product_name_en: str
+    volume_m3: Optional[float]
+    construction_name: Optional[str]
+    material_type_name: Optional[str]
+    size: Optional[CatalogSize]
+    thickness: Optional[CatalogThickness]
+    thermal_conductivity: Optional[float] = None
+
+    def to_row(self) -> dict:
+        """Запись в формате GetInsulationMaterials.get_all_materials()."""
+        return {
+            'product_name_ru': self.product_name_ru,
+            'volume_m3': self.volume_m3,
+            'thermal_conductivity': self.thermal_conductivity,
+            'construction_name': self.construction_name,
+            'material_type_name': self.material_type_name,
+            'size_length_mm': self.size.length_mm if self.size else None,
+            'size_width_mm': self.size.width_mm if self.size else None,
+            'thickness_mm': (
+                self.thickness.thickness_mm if self.thickness else None),
+        }
+
+
+class MaterialCatalog:
+    """
+    Каталог материалов в памяти с индексом по русскому названию.
+
+    Реализует интерфейс чтения GetInsulationMaterials,
+    поэтому может использоваться как repo калькулятора.
+    version — метка версии каталога, для которой он загружен.
+    """
+
+    def __init__(self, products: List[CatalogProduct], version: str = ''):
+        self.products: Tuple[CatalogProduct, ...] = tuple(products)
+        self.version = version
+        index: Dict[str, List[CatalogProduct]] = {}
+        for product in self.products:
+            index.setdefault(product.product_name_ru, []).append(product)
+        self._by_name = {name: tuple(items) for name, items in index.items()}
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def __contains__(self, product_name_ru: str) -> bool:
+        return product_name_ru in self._by_name
+
+    def get(self, product_name_ru: str) -> Optional[CatalogProduct]:
+        """Первый материал с указанным названием или None."""
+        items = self._by_name.get(product_name_ru)
+        return items[0] if items else None
+
+    def get_materials_by_ru_name(self, product_name_ru):
+        """Возвращает все материалы по названию."""
+        return list(self._by_name.get(product_name_ru, ()))
+
+    def get_all_ru_names(self):
+        """Возвращает все уникальные русские названия материалов."""
+        return list(self._by_name)
+
+    def get_all_materials(self):
+        """Возвращает все записи каталога в виде словарей."""
+        return [product.to_row() for product in self.products]
+
+
+def load_catalog(db_url=DB_URL, version: str = '') -> MaterialCatalog:
+    """
+    Загружает каталог из БД одним запросом.
+
+    Как и GetInsulationMaterials.get_all_materials(), берет только
+    материалы с заполненными конструкцией, типом, размером и толщиной:
+    неполные записи калькулятор посчитать не может.
+    """
+    # SQLAlchemy нужна только здесь: чтение снимка обходится без нее
+    from .db import get_sessionmaker
+    from .models import (
+        Product, ConstructionType, MaterialType, Size, Thickness)
+
+    Session = get_sessionmaker(db_url)
+    with Session() as session:
+        rows = session.query(
+            Product.product_name_ru,
+            Product.product_name_en,
+            Product.volume_m3,
+            Product.thermal_conductivity,
+            ConstructionType.name.label('construction_name'),
+            MaterialType.type.label('material_type_name'),
+            Size.length_mm,
+            Size.width_mm,
+            Thickness.thickness_mm,
+        ).join(
+            ConstructionType, Product.construction_id == ConstructionType.id
+        ).join(
+            MaterialType, Product.material_type_id == MaterialType.id
+        ).join(
+            Size, Product.size_id == Size.id
+        ).join(
+            Thickness, Product.thickness_id == Thickness.id
+        ).order_by(Product.id).all()
+
+    products = [CatalogProduct(
+        product_name_ru=row.product_name_ru,
+        product_name_en=row.product_name_en,
+        volume_m3=row.volume_m3,
+        construction_name=row.construction_name,
+        material_type_name=row.material_type_name,
+        size=(
+            CatalogSize(row.length_mm, row.width_mm)
+            if row.length_mm is not None and row.width_mm is not None
+            else None
+        ),
+        thickness=(
+            CatalogThickness(row.thickness_mm)
+            if row.thickness_mm is not None else None
+        ),
+        thermal_conductivity=row.thermal_conductivity,
+    ) for row in rows]
+    logger.info(f'Каталог материалов загружен: {len(products)} записей')
+    return MaterialCatalog(products, version)
+
+
+def sqlite_file_for(db_url) -> Optional[str]:
+    """Путь к файлу SQLite из URL или None для прочих БД."""
+    prefix = 'sqlite:///'
+    if not db_url.startswith(prefix):
+        return None
+    database = db_url[len(prefix):]
+    if not database or database == ':memory:':
+        return None
+    return database
+
+
+def read_catalog_version(db_url=DB_URL) -> str:
+    """
+    Метка версии каталога, прочитанная из манифеста синхронизации.
+
+    Файл SQLite читается модулем sqlite3 напрямую: запрос одной
+    строки не загружает SQLAlchemy. Для БД, которая еще
+    не синхронизировалась, — пустая строка.
+    """
+    path = sqlite_file_for(db_url)
+    if path is None:
+        from sqlalchemy import select
+        from sqlalchemy.exc import SQLAlchemyError
+        from .db import get_engine
+        from .models import SyncManifest
+
+        table = SyncManifest.__table__
+        try:
+            with get_engine(db_url).connect() as conn:
+                version = conn.execute(
+                    select(table.c.catalog_version).where(table.c.id == 1)
+                ).scalar()
+        except SQLAlchemyError as e:
+            logger.warning(f'Версия каталога не прочитана: {e}')
+            return ''
+        return version or ''
+
+    if not os.path.exists(path):
+        return ''
+    try:
+        conn = sqlite3.connect(path, timeout=5)
+        try:
+            row = conn.execute(
+                'SELECT catalog_version FROM sync_manifest WHERE id = 1'
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        if 'no such table' not in str(e):
+            logger.warning(f'Версия каталога не прочитана: {e}')
+        return ''
+    return (row[0] if row else None) or ''
+
+
+# db_url -> (подпись файлов БД, время чтения, метка версии)
+_versions: Dict[str, Tuple[tuple, float, str]] = {}
+
+
+def _file_signature(path) -> tuple:
+    """Размер и mtime файла SQLite и его WAL: меняются при записи."""
+    signature = []
+    for name in (path, path + '-wal'):
+        try:
+            stat = os.stat(name)
+        except OSError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def get_catalog_version(db_url=DB_URL) -> str:
+    """
+    Текущая метка версии каталога.
+
+    Манифест перечитывается, только если с прошлого чтения изменились
+    файлы БД (запись из любого процесса, в том числе синхронизация)
+    или прошло больше CATALOG_VERSION_MAX_AGE секунд; в остальных
+    случаях метка берется из памяти за два вызова stat.
+    """
+    path = sqlite_file_for(db_url)
+    if path is None:
+        return read_catalog_version(db_url)
+    # Подпись снимается до чтения: запись между ними лишь вызовет
+    # повторное чтение при следующем обращении
+    signature = _file_signature(path)
+    now = time.monotonic()
+    cached = _versions.get(db_url)
+    if (cached is not None and cached[0] == signature
+            and now - cached[1] < CATALOG_VERSION_MAX_AGE):
+        return cached[2]
+    version = read_catalog_version(db_url)
+    _versions[db_url] = (signature, now, version)
+    return version
+
+
+_catalogs: Dict[str, MaterialCatalog] = {}
+_catalog_lock = threading.Lock()
+
+
+def _load_or_build(db_url, version: str) -> MaterialCatalog:
+    from .snapshot import (
+        SnapshotError, read_snapshot, snapshot_path_for, write_snapshot)
+
+    path = snapshot_path_for(db_url)
+    if path and os.path.exists(path):
+        try:
+            return read_snapshot(path, version)
+        except (OSError, SnapshotError) as e:
+            logger.warning(f'Снимок каталога не прочитан ({e}), читаем БД')
+    catalog = load_catalog(db_url, version)
+    if path:
+        try:
+            write_snapshot(catalog, path, version)
+        except OSError as e:
+            logger.warning(f'Не удалось записать снимок каталога: {e}')
+    return catalog
+
+
+def get_catalog(db_url=DB_URL) -> MaterialCatalog:
+    """
+    Общий каталог процесса.
+
+    При каждом обращении сверяется метка версии (get_catalog_version,
+    без запроса к БД, пока файлы БД не менялись): если БД
+    синхронизировал другой процесс, каталог перечитывается.
+    Читается снимок каталога, а если его нет или он записан для
+    другой версии — БД (снимок при этом перезаписывается).
+    """
+    version = get_catalog_version(db_url)
+    catalog = _catalogs.get(db_url)
+    if catalog is not None and catalog.version == version:
+        return catalog
+    with _catalog_lock:
+        catalog = _catalogs.get(db_url)
+        if catalog is None or catalog.version != version:
+            if catalog is not None:
+                logger.info('Каталог изменился в БД, перечитываем')
+            catalog = _load_or_build(db_url, version)
+            _catalogs[db_url] = catalog
+        return catalog
+
+
+def rebuild_catalog(db_url=DB_URL) -> MaterialCatalog:
+    """Перечитывает каталог из БД и перезаписывает его снимок."""
+    from .snapshot import snapshot_path_for, write_snapshot
+
+    _versions.pop(db_url, None)
+    version = get_catalog_version(db_url)
+    catalog = load_catalog(db_url, version)
+    path = snapshot_path_for(db_url)
+    if path:
+        try:
+            write_snapshot(catalog, path, version)
+        except OSError as e:
+            logger.warning(f'Не удалось записать снимок каталога: {e}')
+    with _catalog_lock:
+        _catalogs[db_url] = catalog
+    return catalog
+
+
+def invalidate_catalog(db_url=None):
+    """Сбрасывает каталог; следующий get_catalog() перечитает БД."""
+    with _catalog_lock:
+        if db_url is None:
+            _catalogs.clear()
+            _versions.clear()
+        else:
+            _catalogs.pop(db_url, None)
+            _versions.pop(db_url, None)
+    logger.debug('Каталог материалов сброшен')
@@ -0,0 +1,312 @@
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, TypeVar
+
+from sqlalchemy import (
+    MetaData, UniqueConstraint, create_engine, event, inspect, text)
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.schema import CreateTable
+
+from config import (
+    DB_URL, SQLITE_BUSY_BACKOFF, SQLITE_BUSY_RETRIES, SQLITE_PRAGMAS)
+
+logger = logging.getLogger('insulation.db')
+
+_engines: Dict[str, Engine] = {}
+_session_factories: Dict[str, sessionmaker] = {}
+_scoped_sessions: Dict[str, scoped_session] = {}
+_lock = threading.Lock()
+
+_SYNCHRONOUS_LEVELS = {'OFF': 0, 'NORMAL': 1, 'FULL': 2, 'EXTRA': 3}
+
+T = TypeVar('T')
+
+
+def _is_sqlite_file(db_url) -> bool:
+    url = make_url(db_url)
+    return (
+        url.get_backend_name() == 'sqlite'
+        and url.database not in (None, '', ':memory:')
+    )
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Применяет SQLITE_PRAGMAS к новому соединению."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def _casefold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    """
+    Регистрирует SQL-функцию casefold() для нового соединения.
+
+    Встроенные lower() и LIKE в SQLite меняют регистр только у ASCII,
+    поэтому поиск без учета регистра по кириллице идет через casefold.
+    """
+    dbapi_connection.create_function(
+        'casefold', 1, _casefold, deterministic=True)
+
+
+def get_engine(db_url=DB_URL) -> Engine:
+    """
+    Общий движок процесса для указанной БД.
+
+    Движок и пул соединений создаются один раз
+    при первом обращении, далее переиспользуются.
+    """
+    engine = _engines.get(db_url)
+    if engine is not None:
+        return engine
+    with _lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            engine = create_engine(db_url, future=True, pool_pre_ping=True)
+            if make_url(db_url).get_backend_name() == 'sqlite':
+                event.listen(engine, 'connect', _register_sqlite_functions)
+            if _is_sqlite_file(db_url):
+                event.listen(engine, 'connect', _set_sqlite_pragmas)
+            _engines[db_url] = engine
+            logger.info(f'Создан движок БД: {db_url}')
+        return engine
+
+
+def get_sessionmaker(db_url=DB_URL) -> sessionmaker:
+    """Фабрика сессий, привязанная к общему движку."""
+    factory = _session_factories.get(db_url)
+    if factory is not None:
+        return factory
+    engine = get_engine(db_url)
+    with _lock:
+        factory = _session_factories.get(db_url)
+        if factory is None:
+            factory = sessionmaker(bind=engine, future=True)
+            _session_factories[db_url] = factory
+        return factory
+
+
+def get_scoped_session(db_url=DB_URL) -> scoped_session:
+    """Потокобезопасный реестр сессий: одна сессия на поток."""
+    registry = _scoped_sessions.get(db_url)
+    if registry is not None:
+        return registry
+    factory = get_sessionmaker(db_url)
+    with _lock:
+        registry = _scoped_sessions.get(db_url)
+        if registry is None:
+            registry = scoped_session(factory)
+            _scoped_sessions[db_url] = registry
+        return registry
+
+
+def dispose_engines(close: bool = True):
+    """
+    Закрывает пулы всех движков.
+
+    Вызывается при завершении работы и в дочерних процессах,
+    унаследовавших соединения родителя (там с close=False,
+    чтобы не закрыть чужие соединения).
+    """
+    with _lock:
+        for registry in _scoped_sessions.values():
+            registry.remove()
+        for engine in _engines.values():
+            engine.dispose(close=close)
+        _scoped_sessions.clear()
+        _session_factories.clear()
+        _engines.clear()
+
+
+def is_busy_error(error: BaseException) -> bool:
+    """Ошибка SQLite «БД занята другим соединением»."""
+    if not isinstance(error, OperationalError):
+        return False
+    message = str(error.orig).lower()
+    return 'database is locked' in message or 'busy' in message
+
+
+def retry_on_busy(fn: Callable[..., T], *args,
+                  retries: int = SQLITE_BUSY_RETRIES,
+                  backoff: float = SQLITE_BUSY_BACKOFF, **kwargs) -> T:
+    """
+    Выполняет fn, повторяя ее, пока SQLite занята другим писателем.
+
+    fn должна быть целой единицей работы (открыть сессию, записать,
+    зафиксировать): после отказа транзакция откатывается, и повтор
+    начинается заново. Пауза растет экспоненциально со случайной
+    добавкой, чтобы конкурирующие процессы не совпадали по времени.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except OperationalError as e:
+            if attempt == retries or not is_busy_error(e):
+                raise
+            delay = backoff * (2 ** attempt) * (1 + random.random())
+            logger.warning(
+                f'БД занята, повтор {attempt + 1} из {retries} '
+                f'через {delay:.2f} с'
+            )
+            time.sleep(delay)
+
+
+def _expected_pragma(name, value):
+    if name == 'journal_mode':
+        return str(value).lower()
+    if name == 'synchronous':
+        return _SYNCHRONOUS_LEVELS.get(str(value).upper(), value)
+    return value
+
+
+def verify_db_profile(engine: Engine) -> dict:
+    """
+    Сверяет фактические PRAGMA соединения с профилем.
+
+    Возвращает словарь расхождений {pragma: (ожидалось, получено)}.
+    mmap_size может быть урезан сборкой SQLite, поэтому не считается
+    расхождением, если он включен.
+    """
+    if not _is_sqlite_file(engine.url):
+        return {}
+    mismatches = {}
+    with engine.connect() as conn:
+        for name, value in SQLITE_PRAGMAS.items():
+            actual = conn.execute(text(f'PRAGMA {name}')).scalar()
+            expected = _expected_pragma(name, value)
+            if isinstance(actual, str):
+                actual = actual.lower()
+            if name == 'mmap_size' and actual:
+                continue
+            if actual != expected:
+                mismatches[name] = (expected, actual)
+        conn.execute(text('PRAGMA optimize'))
+    for name, (expected, actual) in mismatches.items():
+        logger.warning(
+            f'PRAGMA {name}: ожидалось {expected}, получено {actual}')
+    return mismatches
+
+
+def ensure_columns(engine: Engine, *metadatas) -> list:
+    """
+    Добавляет в существующие таблицы недостающие колонки моделей.
+
+    create_all() не меняет уже созданные таблицы. Досоздаются только
+    колонки, допускающие NULL, через ALTER TABLE ... ADD COLUMN.
+    Возвращает список добавленных колонок вида "таблица.колонка".
+    """
+    added = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for metadata in metadatas:
+            for table in metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                existing = {
+                    c['name'] for c in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing:
+                        continue
+                    if not column.nullable:
+                        raise RuntimeError(
+                            f'Колонку {table.name}.{column.name} без NULL '
+                            f'нельзя добавить автоматически'
+                        )
+                    column_type = column.type.compile(dialect=conn.dialect)
+                    conn.execute(text(
+                        f'ALTER TABLE {table.name} '
+                        f'ADD COLUMN {column.name} {column_type}'
+                    ))
+                    added.append(f'{table.name}.{column.name}')
+    for name in added:
+        logger.info(f'Добавлена колонка {name}')
+    return added
+
+
+def ensure_indexes(engine: Engine, *metadatas) -> list:
+    """
+    Создает индексы моделей, отсутствующие в существующей БД.
+
+    create_all() добавляет индексы только вместе с новыми таблицами,
+    поэтому для уже созданной БД их нужно досоздать отдельно.
+    """
+    created = []
+    with engine.begin() as conn:
+        for metadata in metadatas:
+            for table in metadata.sorted_tables:
+                existing = {
+                    ix['name'] for ix in inspect(conn).get_indexes(table.name)
+                }
+                for index in table.indexes:
+                    if index.name not in existing:
+                        index.create(conn)
+                        created.append(index.name)
+    for name in created:
+        logger.info(f'Создан индекс {name}')
+    return created
+
+
+def ensure_unique_constraints(engine: Engine, *metadatas) -> list:
+    """
+    Пересоздает таблицы, в которых именованное UNIQUE-ограничение
+    модели расходится по колонкам с существующей БД.
+
+    SQLite не изменяет ограничения через ALTER TABLE, поэтому таблица
+    пересобирается: создается копия с новой схемой, в нее переносятся
+    строки, старая удаляется, копия переименовывается, индексы модели
+    создаются заново. Возвращает список пересозданных таблиц.
+    """
+    rebuilt = []
+    with engine.begin() as conn:
+        for metadata in metadatas:
+            for table in metadata.sorted_tables:
+                inspector = inspect(conn)
+                if not inspector.has_table(table.name):
+                    continue
+                existing = {
+                    uc['name']: tuple(uc['column_names'])
+                    for uc in inspector.get_unique_constraints(table.name)
+                    if uc.get('name')
+                }
+                changed = [
+                    uc.name for uc in table.constraints
+                    if isinstance(uc, UniqueConstraint)
+                    and uc.name in existing
+                    and existing[uc.name] != tuple(c.name for c in uc.columns)
+                ]
+                if not changed:
+                    continue
+                columns = ', '.join(
+                    c['name'] for c in inspector.get_columns(table.name)
+                    if c['name'] in table.columns)
+                scratch = MetaData()
+                for other in metadata.sorted_tables:
+                    other.to_metadata(scratch)
+                temp = table.to_metadata(
+                    scratch, name=f'_rebuild_{table.name}')
+                conn.execute(CreateTable(temp))
+                conn.execute(text(
+                    f'INSERT INTO {temp.name} ({columns}) '
+                    f'SELECT {columns} FROM {table.name}'
+                ))
+                conn.execute(text(f'DROP TABLE {table.name}'))
+                conn.execute(text(
+                    f'ALTER TABLE {temp.name} RENAME TO {table.name}'))
+                for index in table.indexes:
+                    index.create(conn)
+                rebuilt.append(table.name)
+                logger.info(
+                    f'Таблица {table.name} пересоздана, изменены '
+                    f'ограничения: {", ".join(changed)}'
+                )
+    return rebuilt
@@ -0,0 +1,129 @@
+import json
+import logging
+
+logger = logging.getLogger('insulation.sync')
+
+_WHITESPACE = ' \t\n\r'
+_VALUE_END = _WHITESPACE + ',]}:'
+_decoder = json.JSONDecoder()
+# Предел размера одной записи: дальше буфер не растет
+MAX_VALUE_SIZE = 1 << 24
+# Ошибка ближе к концу буфера может быть обрывом значения на границе
+# блока: недочитанные литерал, число или escape \uXXXX
+_TAIL = 6
+
+
+class _StreamReader:
+    """Буфер поверх файла, читающий JSON по одному значению."""
+
+    def __init__(self, file, chunk_size, max_value_size=MAX_VALUE_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.max_value_size = max_value_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Дочитывает следующий блок, отбрасывая разобранную часть."""
+        pending = len(self.buf) - self.pos
+        if pending >= self.max_value_size:
+            raise self._error(
+                f'Запись фикстуры длиннее {self.max_value_size} символов')
+        # Недочитанная запись растет вдвое, а не на блок: повторный
+        # разбор длинной записи остается линейным
+        chunk = self.file.read(max(self.chunk_size, pending))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _error(self, message):
+        return json.JSONDecodeError(message, self.buf, self.pos)
+
+    def peek(self):
+        """Следующий значимый символ без сдвига позиции ('' в конце)."""
+        while True:
+            while (self.pos < len(self.buf)
+                   and self.buf[self.pos] in _WHITESPACE):
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        """Считывает один из ожидаемых символов-разделителей."""
+        ch = self.peek()
+        if not ch or ch not in chars:
+            raise self._error(f'Ожидался один из символов {chars!r}')
+        self.pos += 1
+        return ch
+
+    def _truncated(self, error):
+        """Ошибка разбора вызвана концом буфера, а не самими данными."""
+        # Строка без закрывающей кавычки: в JSON-строке нет переводов
+        # строк, поэтому в файле с отступами она обрывается на блоке
+        return (error.pos >= len(self.buf) - _TAIL
+                or error.msg.startswith('Unterminated string'))
+
+    def value(self):
+        """
+        Разбирает одно JSON-значение, дочитывая файл при необходимости.
+
+        Файл дочитывается, только если значение не закончилось
+        в буфере; ошибка внутри буфера сразу выбрасывается.
+        """
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+                # Число на границе блока может продолжаться в следующем
+                if self.eof or (
+                        end < len(self.buf) and self.buf[end] in _VALUE_END):
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError as e:
+                if self.eof or not self._truncated(e):
+                    raise
+            self._fill()
+
+
+def iter_fixture(path, chunk_size=1 << 16, sections=None,
+                 max_value_size=MAX_VALUE_SIZE):
+    """
+    Потоковое чтение фикстуры.
+
+    Выдает пары (секция, запись) для каждого элемента массивов
+    верхнего уровня, не загружая файл целиком. Память ограничена
+    размером блока и одной записи; запись длиннее max_value_size
+    символов — ошибка JSONDecodeError. Если передан список sections,
+    в него добавляются названия всех встреченных секций,
+    включая пустые.
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        reader = _StreamReader(file, chunk_size, max_value_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            section = reader.value()
+            if not isinstance(section, str):
+                raise reader._error('Ожидалось название секции')
+            reader.expect(':')
+            reader.expect('[')
+            if sections is not None:
+                sections.append(section)
+            if reader.peek() == ']':
+                reader.pos += 1
+            else:
+                while True:
+                    yield section, reader.value()
+                    if reader.expect(',]') == ']':
+                        break
+            if reader.expect(',}') == '}':
+                break
+        if reader.peek():
+            raise reader._error('Лишние данные после конца фикстуры')
@@ -0,0 +1,224 @@
+import logging
+import numbers
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .fixture_stream import iter_fixture
+
+logger = logging.getLogger('insulation.sync')
+
+LOOKUP_SECTIONS = {
+    'ConstructionType': ['id', 'name'],
+    'MaterialType': ['id', 'type'],
+    'Size': ['id', 'length_mm', 'width_mm'],
+    'Thickness': ['id', 'thickness_mm'],
+}
+LOOKUP_NUMERIC_FIELDS = {
+    'Size': ['length_mm', 'width_mm'],
+    'Thickness': ['thickness_mm'],
+}
+PRODUCT_FOREIGN_KEYS = {
+    'construction_id': 'ConstructionType',
+    'material_type_id': 'MaterialType',
+    'size_id': 'Size',
+    'thickness_id': 'Thickness',
+}
+PRODUCT_REQUIRED_KEYS = [
+    'product_name_ru', 'product_name_en',
+    'construction_id', 'material_type_id', 'size_id', 'thickness_id'
+]
+PRODUCT_NUMERIC_FIELDS = ['volume_m3']
+# Необязательные поля продукта: если заданы, должны быть больше нуля
+PRODUCT_POSITIVE_FIELDS = ['thermal_conductivity']
+FIXTURE_SECTIONS = list(LOOKUP_SECTIONS) + ['products']
+
+
+class FixtureValidationError(Exception):
+    """Фикстура не прошла проверку и не может быть загружена."""
+
+    def __init__(self, report):
+        self.report = report
+        super().__init__(report.format())
+
+
+@dataclass
+class FixtureIssue:
+    """Найденная в фикстуре проблема."""
+    section: str
+    index: Optional[int]
+    message: str
+
+    def __str__(self):
+        where = self.section if self.index is None else (
+            f'{self.section}[{self.index}]')
+        return f'{where}: {self.message}'
+
+
+@dataclass
+class FixtureReport:
+    """
+    Результат проверки фикстуры.
+
+    errors — нарушения, из-за которых фикстуру нельзя загружать;
+    warnings — продукты без обязательных ключей, которые синхронизация
+    пропускает.
+    """
+    path: str
+    errors: List[FixtureIssue] = field(default_factory=list)
+    warnings: List[FixtureIssue] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def format(self, limit: int = 20) -> str:
+        """Текстовый отчет с не более чем limit строками на список."""
+        lines = [
+            f'Фикстура {self.path}: ошибок {len(self.errors)}, '
+            f'предупреждений {len(self.warnings)}'
+        ]
+        for title, issues in (('Ошибки', self.errors),
+                              ('Предупреждения', self.warnings)):
+            if not issues:
+                continue
+            lines.append(f'{title}:')
+            lines.extend(f'  {issue}' for issue in issues[:limit])
+            if len(issues) > limit:
+                lines.append(f'  ... и еще {len(issues) - limit}')
+        return '\n'.join(lines)
+
+
+def _is_number(value) -> bool:
+    return (isinstance(value, numbers.Real)
+            and not isinstance(value, bool))
+
+
+def _is_key(value) -> bool:
+    """Значение годится как id: целое число или строка."""
+    return isinstance(value, (int, str)) and not isinstance(value, bool)
+
+
+def validate_fixture(path) -> FixtureReport:
+    """
+    Проверяет фикстуру за один потоковый проход, ничего не записывая.
+
+    Собирает множества id справочников и сверяет с ними внешние ключи
+    продуктов. Ссылки продуктов, прочитанных раньше справочника,
+    откладываются и сверяются в конце прохода. id, названия и внешние
+    ключи проверяются по типу до того, как попадут в множества.
+    Ошибка синтаксиса JSON выбрасывается как JSONDecodeError сразу
+    на месте ошибки.
+    """
+    report = FixtureReport(path=path)
+    ids = {section: set() for section in LOOKUP_SECTIONS}
+    deferred = []
+    product_names = set()
+    seen = []
+
+    def check_reference(index, key, value):
+        section = PRODUCT_FOREIGN_KEYS[key]
+        if value not in ids[section]:
+            report.errors.append(FixtureIssue(
+                'products', index,
+                f'{key}={value!r} не найден в секции {section}'
+            ))
+
+    for section, item in iter_fixture(path, sections=seen):
+        index = report.counts.get(section, 0)
+        report.counts[section] = index + 1
+
+        if not isinstance(item, dict):
+            report.errors.append(FixtureIssue(
+                section, index, 'запись должна быть объектом'))
+            continue
+
+        if section in LOOKUP_SECTIONS:
+            missing = [k for k in LOOKUP_SECTIONS[section] if k not in item]
+            if missing:
+                report.errors.append(FixtureIssue(
+                    section, index, f'нет обязательных ключей {missing}'))
+            for key in LOOKUP_NUMERIC_FIELDS.get(section, []):
+                if key in item and not (
+                        _is_number(item[key]) and item[key] > 0):
+                    report.errors.append(FixtureIssue(
+                        section, index,
+                        f'{key}={item[key]!r} должно быть положительным '
+                        f'числом'
+                    ))
+            if 'id' in item and not _is_key(item['id']):
+                report.errors.append(FixtureIssue(
+                    section, index,
+                    f'id={item["id"]!r} должен быть числом или строкой'))
+            elif 'id' in item:
+                if item['id'] in ids[section]:
+                    report.errors.append(FixtureIssue(
+                        section, index, f'повторный id={item["id"]!r}'))
+                ids[section].add(item['id'])
+
+        elif section == 'products':
+            missing = [k for k in PRODUCT_REQUIRED_KEYS if k not in item]
+            if missing:
+                report.warnings.append(FixtureIssue(
+                    section, index,
+                    f'«{item.get("product_name_ru")}»: нет обязательных '
+                    f'ключей {missing}, продукт будет пропущен'
+                ))
+                continue
+            name = item['product_name_ru']
+            if not isinstance(name, str):
+                report.errors.append(FixtureIssue(
+                    section, index,
+                    f'product_name_ru={name!r} должно быть строкой'))
+            elif name in product_names:
+                report.errors.append(FixtureIssue(
+                    section, index, f'повторное название «{name}»'))
+            else:
+                product_names.add(name)
+            for key in PRODUCT_NUMERIC_FIELDS:
+                value = item.get(key)
+                if value is not None and not (
+                        _is_number(value) and value >= 0):
+                    report.errors.append(FixtureIssue(
+                        section, index,
+                        f'«{name}»: {key}={value!r} должно быть '
+                        f'неотрицательным числом'
+                    ))
+            for key in PRODUCT_POSITIVE_FIELDS:
+                value = item.get(key)
+                if value is not None and not (
+                        _is_number(value) and value > 0):
+                    report.errors.append(FixtureIssue(
+                        section, index,
+                        f'«{name}»: {key}={value!r} должно быть '
+                        f'положительным числом'
+                    ))
+            for key in PRODUCT_FOREIGN_KEYS:
+                value = item[key]
+                if value is None:
+                    continue
+                if not _is_key(value):
+                    report.errors.append(FixtureIssue(
+                        section, index,
+                        f'«{name}»: {key}={value!r} должен быть числом '
+                        f'или строкой'
+                    ))
+                    continue
+                # Справочник, начатый раньше продуктов, уже прочитан целиком
+                if PRODUCT_FOREIGN_KEYS[key] in seen:
+                    check_reference(index, key, value)
+                else:
+                    deferred.append((index, key, value))
+
+    for index, key, value in deferred:
+        check_reference(index, key, value)
+    for section in FIXTURE_SECTIONS:
+        if section not in seen:
+            report.errors.append(FixtureIssue(
+                section, None, 'секция отсутствует'))
+
+    logger.info(
+        f'Проверка фикстуры: ошибок {len(report.errors)}, '
+        f'предупреждений {len(report.warnings)}'
+    )
+    return report
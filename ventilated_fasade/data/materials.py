@@ -1,19 +1,16 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, joinedload
+from sqlalchemy.orm import joinedload
 
+from .db import get_engine, get_sessionmaker
 from .models import Product, ConstructionType, MaterialType, Size, Thickness
-from config import INSUL_DB_NAME
-
-
-DB_URL = f'sqlite:///{INSUL_DB_NAME}'
+from config import DB_URL
 
 
 class GetInsulationMaterials:
     """Класс для получения материалов из базы данных."""
 
     def __init__(self):
-        self.engine = create_engine(DB_URL)
-        self.Session = sessionmaker(bind=self.engine)
+        self.engine = get_engine(DB_URL)
+        self.Session = get_sessionmaker(DB_URL)
 
     def get_all_materials(self):
         """Возвращает все записи из БД."""
@@ -21,6 +18,7 @@ class GetInsulationMaterials:
             query = session.query(
                 Product.product_name_ru,
                 Product.volume_m3,
+                Product.thermal_conductivity,
                 ConstructionType.name.label('construction_name'),
                 MaterialType.type.label('material_type_name'),
                 Size.length_mm.label('size_length_mm'),
@@ -39,6 +37,7 @@ class GetInsulationMaterials:
             results = [{
                 'product_name_ru': row.product_name_ru,
                 'volume_m3': row.volume_m3,
+                'thermal_conductivity': row.thermal_conductivity,
                 'construction_name': row.construction_name,
                 'material_type_name': row.material_type_name,
                 'size_length_mm': row.size_length_mm,
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Float, Integer, String, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import (
+    Column, DateTime, Float, Integer, JSON, String, ForeignKey, Index)
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -49,6 +52,8 @@ class Product(Base):
     product_name_ru = Column(String, nullable=False)
     product_name_en = Column(String, nullable=False)
     volume_m3 = Column(Float, nullable=True)
+    # Расчетная теплопроводность λ, Вт/(м·К)
+    thermal_conductivity = Column(Float, nullable=True)
 
     construction_id = Column(
         Integer, ForeignKey('construction_types.id'), nullable=True
@@ -67,13 +72,47 @@ class Product(Base):
     size = relationship('Size')
     thickness = relationship('Thickness')
 
+    __table_args__ = (
+        Index('ix_products_product_name_ru', 'product_name_ru'),
+    )
+
     def to_dict(self):
         return {
             'product_name_ru': self.product_name_ru,
             'product_name_en': self.product_name_en,
             'volume_m3': self.volume_m3,
+            'thermal_conductivity': self.thermal_conductivity,
             'construction_id': self.construction_id,
             'material_type_id': self.material_type_id,
             'size_id': self.size_id,
             'thickness_id': self.thickness_id,
         }
+
+
+class SyncManifest(Base):
+    """Сведения о последней примененной к БД фикстуре."""
+    __tablename__ = 'sync_manifest'
+
+    id = Column(Integer, primary_key=True)
+    fixture_path = Column(String, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    mtime_ns = Column(Integer, nullable=False)
+    content_hash = Column(String, nullable=False)
+    section_hashes = Column(JSON, nullable=False)
+    synced_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Метка версии каталога, меняется при каждом изменении данных
+    catalog_version = Column(String, nullable=True)
+
+
+class ResultCacheEntry(Base):
+    """Сохраненный результат расчета для версии каталога."""
+    __tablename__ = 'result_cache'
+
+    key = Column(String, primary_key=True)
+    catalog_version = Column(String, nullable=False)
+    result = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_result_cache_catalog_version', 'catalog_version'),
+    )
@@ -1,7 +1,7 @@
 from sqlalchemy import (
     Column, Integer, String,
     DateTime, ForeignKey, UniqueConstraint,
-    JSON, Table
+    JSON, Table, Index
 )
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
@@ -60,6 +60,15 @@ calculation_managers = Table(
 )
 
 
+class CalcSequence(Base):
+    """Последний выданный порядковый номер инженера за месяц."""
+    __tablename__ = "calc_sequences"
+    engineer_id = Column(Integer, ForeignKey("engineers.id"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    last_seq = Column(Integer, nullable=False, default=0)
+
+
 class Calculation(Base):
     __tablename__ = "calculations"
     id = Column(Integer, primary_key=True)
@@ -89,7 +98,10 @@ class Calculation(Base):
 
     __table_args__ = (
         UniqueConstraint("engineer_id", "year", "month",
-                         "seq", name="uq_calc_series"),
+                         "seq", "version", name="uq_calc_series"),
         UniqueConstraint("base_number", "version", name="uq_calc_version"),
         UniqueConstraint("number", name="uq_calc_number"),
+        # Архив: страницы по (created_at, id), в том числе по инженеру
+        Index("ix_calc_created", "created_at", "id"),
+        Index("ix_calc_engineer_created", "engineer_id", "created_at", "id"),
     )
@@ -1,15 +1,12 @@
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select
 from config import DB_URL
+from .db import get_scoped_session
 from .models_calc import Engineer, Manager, Address
 from typing import Optional, List
 
-_engine = create_engine(DB_URL, future=True)
-_Session = sessionmaker(bind=_engine, future=True)
-
 
 def get_session():
-    return _Session()
+    return get_scoped_session(DB_URL)()
 
 # --- Engineer (одна запись) ---
 
@@ -1,8 +1,9 @@
 # data/services_calc.py
 from datetime import datetime
-from typing import Optional
-from sqlalchemy import select, func
-from .models_calc import Calculation, Engineer
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import bindparam, select, func, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from .models_calc import CalcSequence, Calculation, Engineer
 
 
 def _mmYY(dt: datetime) -> str:
@@ -17,20 +18,81 @@ def make_number(base: str, version: int) -> str:
     return base if version == 0 else f"{base}-{version}"
 
 
-def next_seq_for_engineer_month(session, engineer_id: int, dt: datetime) -> int:
-    q = (select(func.max(Calculation.seq))
-         .where(Calculation.engineer_id == engineer_id,
-                Calculation.year == dt.year,
-                Calculation.month == dt.month))
-    last = session.execute(q).scalar()
-    return 1 if last is None else int(last)+1
+def reserve_seq(session, engineer_id: int, dt: datetime, count: int = 1) -> int:
+    """
+    Резервирует count номеров подряд, возвращает первый из них.
+
+    Счетчик в calc_sequences увеличивается одним атомарным
+    UPDATE ... RETURNING в транзакции сессии, поэтому номера
+    не совпадают у параллельных писателей и выдаются за O(1).
+    Строка счетчика создается при первом номере месяца и засевается
+    максимальным seq уже сохраненных расчетов.
+    """
+    if count < 1:
+        raise ValueError("Число резервируемых номеров должно быть больше нуля")
+    table = CalcSequence.__table__
+    key = (table.c.engineer_id == engineer_id) & (table.c.year == dt.year) \
+        & (table.c.month == dt.month)
+    last = session.execute(
+        update(table).where(key)
+        .values(last_seq=table.c.last_seq + count)
+        .returning(table.c.last_seq)
+    ).scalar()
+    if last is None:
+        existing = (select(func.coalesce(func.max(Calculation.seq), 0))
+                    .where(Calculation.engineer_id == engineer_id,
+                           Calculation.year == dt.year,
+                           Calculation.month == dt.month)
+                    .scalar_subquery())
+        stmt = sqlite_insert(table).values(
+            engineer_id=engineer_id, year=dt.year, month=dt.month,
+            last_seq=existing + count)
+        last = session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.engineer_id, table.c.year,
+                                table.c.month],
+                set_={"last_seq": table.c.last_seq + count})
+            .returning(table.c.last_seq)
+        ).scalar()
+    return int(last) - count + 1
+
+
+def advance_seqs(session, targets: Iterable[Tuple[int, int, int, int]]):
+    """
+    Сдвигает счетчики месяцев не ниже заданных номеров.
+
+    targets — кортежи (engineer_id, year, month, seq). Нужен, когда
+    номера заняты не через reserve_seq (например, при импорте
+    расчетов с исходными номерами): следующий выданный номер будет
+    больше уже сохраненных. Все счетчики обновляются одним executemany.
+    """
+    table = CalcSequence.__table__
+    engineer_id, year, month = (
+        bindparam("target_engineer"), bindparam("target_year"),
+        bindparam("target_month"))
+    existing = (select(func.coalesce(func.max(Calculation.seq), 0))
+                .where(Calculation.engineer_id == engineer_id,
+                       Calculation.year == year,
+                       Calculation.month == month)
+                .scalar_subquery())
+    stmt = sqlite_insert(table).values(
+        engineer_id=engineer_id, year=year, month=month,
+        last_seq=func.max(existing, bindparam("target_seq")))
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[table.c.engineer_id, table.c.year,
+                            table.c.month],
+            set_={"last_seq": func.max(table.c.last_seq,
+                                       stmt.excluded.last_seq)}),
+        [{"target_engineer": e, "target_year": y, "target_month": m,
+          "target_seq": seq} for e, y, m, seq in targets])
 
 
 def create_calc(session, engineer: Engineer, address_id: Optional[int],
                 input_payload: dict, result_payload: dict, dt: Optional[datetime] = None) -> Calculation:
 
     dt = dt or datetime.utcnow()
-    seq = next_seq_for_engineer_month(session, engineer.id, dt)
+    seq = reserve_seq(session, engineer.id, dt)
     base = make_base_number(engineer.initials, seq, dt)
     number = make_number(base, 0)
     calc = Calculation(
@@ -64,3 +126,25 @@ def create_revision(session, base_number: str,
     session.add(rev)
     session.flush()
     return rev
+
+
+def get_calc_by_number(session, number: str) -> Optional[Calculation]:
+    return session.execute(
+        select(Calculation).where(Calculation.number == number)
+    ).scalar_one_or_none()
+
+
+def calc_to_dict(calc: Calculation) -> dict:
+    return {
+        "number": calc.number,
+        "base_number": calc.base_number,
+        "version": calc.version,
+        "status": calc.status,
+        "created_at": calc.created_at.isoformat(),
+        "updated_at": calc.updated_at.isoformat(),
+        "engineer": f"{calc.engineer.last_name} {calc.engineer.first_name}",
+        "address": calc.address.line1 if calc.address else None,
+        "managers": [f"{m.last_name} {m.first_name}" for m in calc.managers],
+        "input": calc.input_payload,
+        "result": calc.result_payload,
+    }
@@ -0,0 +1,248 @@
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, List, Optional
+
+from .catalog import (
+    CatalogProduct, CatalogSize, CatalogThickness, MaterialCatalog,
+    sqlite_file_for)
+
+logger = logging.getLogger('insulation.catalog')
+
+SNAPSHOT_MAGIC = b'NFSCAT\x00\x01'
+SNAPSHOT_VERSION = 3
+_HEADER = struct.Struct('<8sHBxIIII')
+_BYTEORDER = 1 if sys.byteorder == 'little' else 2
+
+# Колонки снимка в порядке записи: (имя, формат memoryview, размер)
+_FLOAT_COLUMNS = [('volume_m3', 'd', 8), ('thermal_conductivity', 'd', 8)]
+_INT_COLUMNS = [
+    ('name_ru', 'i', 4), ('name_en', 'i', 4),
+    ('construction', 'i', 4), ('material_type', 'i', 4),
+    ('length_mm', 'i', 4), ('width_mm', 'i', 4), ('thickness_mm', 'i', 4),
+]
+
+
+class SnapshotError(Exception):
+    """Снимок каталога отсутствует, поврежден или несовместим."""
+
+    pass
+
+
+def snapshot_path_for(db_url) -> Optional[str]:
+    """Путь к снимку рядом с файлом SQLite или None для прочих БД."""
+    database = sqlite_file_for(db_url)
+    return f'{database}.catalog' if database else None
+
+
+def _pad(size: int) -> int:
+    return (-size) % 8
+
+
+def write_snapshot(catalog: MaterialCatalog, path: str,
+                   catalog_version: str = ''):
+    """
+    Записывает каталог в компактный колоночный файл.
+
+    В заголовке — метка версии каталога из манифеста синхронизации.
+    Строки хранятся один раз в общем UTF-8 блоке со смещениями,
+    числовые поля — массивами фиксированной ширины (None = -1/NaN).
+    Запись атомарная: через временный файл и os.replace.
+    """
+    strings: List[bytes] = []
+    string_ids: Dict[str, int] = {}
+
+    def ref(value):
+        if value is None:
+            return -1
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value.encode('utf-8'))
+        return string_ids[value]
+
+    columns = {name: [] for name, _, _ in _FLOAT_COLUMNS + _INT_COLUMNS}
+    for product in catalog.products:
+        columns['name_ru'].append(ref(product.product_name_ru))
+        columns['name_en'].append(ref(product.product_name_en))
+        columns['construction'].append(ref(product.construction_name))
+        columns['material_type'].append(ref(product.material_type_name))
+        columns['volume_m3'].append(
+            math.nan if product.volume_m3 is None else product.volume_m3)
+        columns['thermal_conductivity'].append(
+            math.nan if product.thermal_conductivity is None
+            else product.thermal_conductivity)
+        columns['length_mm'].append(
+            product.size.length_mm if product.size else -1)
+        columns['width_mm'].append(
+            product.size.width_mm if product.size else -1)
+        columns['thickness_mm'].append(
+            product.thickness.thickness_mm if product.thickness else -1)
+
+    offsets = [0]
+    for data in strings:
+        offsets.append(offsets[-1] + len(data))
+    blob = b''.join(strings)
+    count = len(catalog.products)
+    version = catalog_version.encode('utf-8')
+
+    chunks = [
+        _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, _BYTEORDER,
+                     count, len(strings), len(blob), len(version)),
+    ]
+    chunks.append(version)
+    chunks.append(b'\x00' * _pad(_HEADER.size + len(version)))
+    chunks.append(struct.pack(f'={len(offsets)}I', *offsets))
+    chunks.append(blob)
+    chunks.append(b'\x00' * _pad(4 * len(offsets) + len(blob)))
+    for name, fmt, _ in _FLOAT_COLUMNS + _INT_COLUMNS:
+        chunks.append(struct.pack(f'={count}{fmt}', *columns[name]))
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        for chunk in chunks:
+            file.write(chunk)
+    os.replace(tmp_path, path)
+    logger.info(f'Записан снимок каталога: {path} ({count} записей)')
+
+
+class CatalogSnapshot:
+    """
+    Снимок каталога, отображенный в память.
+
+    Колонки доступны как memoryview без копирования
+    (например, для numpy.frombuffer).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            try:
+                self._mmap = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise SnapshotError(f'Пустой снимок каталога: {path}') from e
+        try:
+            self._map_columns()
+        except Exception:
+            self.close()
+            raise
+
+    def _map_columns(self):
+        self._view = view = memoryview(self._mmap)
+        if len(view) < _HEADER.size:
+            raise SnapshotError('Снимок каталога поврежден')
+        (magic, version, byteorder, count, n_strings, blob_size,
+         version_size) = _HEADER.unpack_from(view)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise SnapshotError('Неизвестный формат снимка каталога')
+        if byteorder != _BYTEORDER:
+            raise SnapshotError('Снимок записан с другим порядком байт')
+
+        pos = _HEADER.size + version_size
+        if len(view) < pos:
+            raise SnapshotError('Снимок каталога поврежден')
+        try:
+            self.catalog_version = bytes(
+                view[_HEADER.size:pos]).decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise SnapshotError('Снимок каталога поврежден') from e
+        pos += _pad(pos)
+        offsets_size = 4 * (n_strings + 1)
+        expected = (
+            pos + offsets_size + blob_size
+            + _pad(offsets_size + blob_size)
+            + sum(size for _, _, size in _FLOAT_COLUMNS + _INT_COLUMNS)
+            * count
+        )
+        if len(view) != expected:
+            raise SnapshotError('Снимок каталога поврежден')
+
+        self.count = count
+        self._offsets = view[pos:pos + offsets_size].cast('I')
+        pos += offsets_size
+        self._blob = view[pos:pos + blob_size]
+        pos += blob_size + _pad(offsets_size + blob_size)
+        self.columns = {}
+        for name, fmt, size in _FLOAT_COLUMNS + _INT_COLUMNS:
+            self.columns[name] = view[pos:pos + size * count].cast(fmt)
+            pos += size * count
+
+    def string(self, index: int) -> Optional[str]:
+        """Строка из общего блока по индексу (-1 = None)."""
+        if index < 0:
+            return None
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return bytes(self._blob[start:end]).decode('utf-8')
+
+    def to_catalog(self) -> MaterialCatalog:
+        """Собирает MaterialCatalog из колонок снимка."""
+        c = self.columns
+        strings = [self.string(i) for i in range(len(self._offsets) - 1)]
+
+        def text(index):
+            return None if index < 0 else strings[index]
+
+        products = []
+        for i in range(self.count):
+            length, width = c['length_mm'][i], c['width_mm'][i]
+            thickness = c['thickness_mm'][i]
+            volume = c['volume_m3'][i]
+            conductivity = c['thermal_conductivity'][i]
+            products.append(CatalogProduct(
+                product_name_ru=text(c['name_ru'][i]),
+                product_name_en=text(c['name_en'][i]),
+                volume_m3=None if math.isnan(volume) else volume,
+                construction_name=text(c['construction'][i]),
+                material_type_name=text(c['material_type'][i]),
+                size=(
+                    CatalogSize(length, width)
+                    if length >= 0 and width >= 0 else None
+                ),
+                thickness=(
+                    CatalogThickness(thickness) if thickness >= 0 else None
+                ),
+                thermal_conductivity=(
+                    None if math.isnan(conductivity) else conductivity),
+            ))
+        return MaterialCatalog(products, self.catalog_version)
+
+    def close(self):
+        """Освобождает отображение файла."""
+        for column in getattr(self, 'columns', {}).values():
+            column.release()
+        for name in ('_offsets', '_blob', '_view'):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        self.columns = {}
+        self._offsets = self._blob = self._view = None
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_snapshot(path: str,
+                  catalog_version: Optional[str] = None) -> MaterialCatalog:
+    """
+    Читает каталог из снимка без обращения к БД.
+
+    Если указана catalog_version, а снимок записан для другой версии
+    (например, БД синхронизировал другой процесс), — SnapshotError.
+    """
+    with CatalogSnapshot(path) as snapshot:
+        if (catalog_version is not None
+                and snapshot.catalog_version != catalog_version):
+            raise SnapshotError(
+                f'Снимок каталога устарел: версия '
+                f'{snapshot.catalog_version or "—"}, '
+                f'в БД {catalog_version or "—"}')
+        catalog = snapshot.to_catalog()
+    logger.info(f'Каталог загружен из снимка: {path} ({len(catalog)})')
+    return catalog
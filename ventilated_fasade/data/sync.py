@@ -1,44 +1,304 @@
+import hashlib
 import json
 import logging
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import os
+import uuid
+from datetime import datetime
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
 from .models import (
-    Base, ConstructionType, MaterialType, Size, Thickness, Product)
-from config import STRICT_FIXTURE
+    Base, ConstructionType, MaterialType, Size, Thickness, Product,
+    SyncManifest)
+from .catalog import invalidate_catalog, rebuild_catalog
+from .db import ensure_columns, get_engine
+from .fixture_stream import iter_fixture
+from .fixture_validator import (
+    FixtureValidationError, PRODUCT_REQUIRED_KEYS, validate_fixture)
+from config import FIXTURE_BATCH_SIZE, STRICT_FIXTURE
 
 logger = logging.getLogger('insulation.sync')
 
+LOOKUP_MODELS = [ConstructionType, MaterialType, Size, Thickness]
+SECTIONS = [model.__name__ for model in LOOKUP_MODELS] + ['products']
+MANIFEST_ID = 1
 
-def load_fixture_data(path):
-    """Загрузка данных из фикстур."""
-    logger.info(f'Загрузка даных из фикстуры: {path}')
+PRODUCT_COLUMNS = [
+    'product_name_ru', 'product_name_en', 'volume_m3',
+    'thermal_conductivity', 'construction_id', 'material_type_id', 'size_id', 'thickness_id'
+]
+
+
+def update_section_hash(digest, item):
+    """Добавляет запись к хэшу секции независимо от порядка ее ключей."""
+    digest.update(json.dumps(
+        item, sort_keys=True, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8'))
+    digest.update(b'\n')
+
+
+def section_hash(items):
+    """Хэш секции фикстуры."""
+    digest = hashlib.sha256()
+    for item in items:
+        update_section_hash(digest, item)
+    return digest.hexdigest()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 содержимого файла, читаемого блоками."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(conn):
+    """Манифест последней синхронизации или None."""
+    table = SyncManifest.__table__
+    return conn.execute(
+        select(table).where(table.c.id == MANIFEST_ID)).first()
+
+
+def write_manifest(conn, fixture_path, stat, content_hash, section_hashes,
+                   catalog_version):
+    """Сохраняет манифест синхронизации."""
+    table = SyncManifest.__table__
+    values = {
+        'id': MANIFEST_ID,
+        'fixture_path': os.path.abspath(fixture_path),
+        'size_bytes': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'content_hash': content_hash,
+        'section_hashes': section_hashes,
+        'synced_at': datetime.utcnow(),
+        'catalog_version': catalog_version,
+    }
+    stmt = sqlite_insert(table).values(**values)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={k: v for k, v in values.items() if k != 'id'}
+    ))
+
+
+def new_catalog_version():
+    """
+    Новая метка версии каталога.
+
+    Случайная, а не счетчик: после сброса манифеста метки
+    не повторяются, и старые записи кэша не оживают.
+    """
+    return uuid.uuid4().hex
+
+
+def upgrade_schema(engine):
+    """
+    Создает таблицы материалов и досоздает новые колонки.
+
+    Новые колонки в существующей БД пусты, поэтому манифест
+    сбрасывается и следующая синхронизация перезапишет все секции
+    из фикстуры. Возвращает список добавленных колонок.
+    """
+    Base.metadata.create_all(engine)
+    added = ensure_columns(engine, Base.metadata)
+    if added:
+        with engine.begin() as conn:
+            conn.execute(delete(SyncManifest.__table__))
+        logger.info('Схема БД обновлена, манифест синхронизации сброшен')
+    return added
+
+
+def safe_float(value, default=0.0):
+    """Преобразует значение в float, возвращает default при ошибке."""
     try:
-        with open(path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-        logger.info(f'Загружено {len(data)} записей из фикстуры')
-        return data
-    except FileNotFoundError:
-        logger.error(f'Файл фикстуры не найден: {path}')
-        raise
-    except json.JSONDecodeError as e:
-        logger.error(f'Ошибка чтения JSON: {e}')
-        raise
-    except Exception as e:
-        logger.error(f'Неизвестная ошибка при загрузке фикстуры: {e}')
-        raise
+        return float(value) if value is not None else default
+    except (ValueError, TypeError):
+        return default
+
+
+def optional_float(value):
+    """float для необязательного поля, None — если значения нет."""
+    value = safe_float(value, None)
+    return value if value is None or value > 0 else None
+
+
+def product_row(item):
+    """
+    Строка продукта для записи в БД.
+
+    Возвращает None, если в продукте нет обязательных ключей.
+    """
+    missing = [key for key in PRODUCT_REQUIRED_KEYS if key not in item]
+    if missing:
+        logger.error(
+            f'Пропущены обязательные ключи в продукте: {missing}\n'
+            f'Продукт: {item.get("product_name_ru")}'
+        )
+        return None
+    return {
+        'product_name_ru': item['product_name_ru'],
+        'product_name_en': item['product_name_en'],
+        'volume_m3': safe_float(item.get('volume_m3', 0)),
+        'thermal_conductivity': optional_float(
+            item.get('thermal_conductivity')),
+        'construction_id': item.get('construction_id'),
+        'material_type_id': item.get('material_type_id'),
+        'size_id': item.get('size_id'),
+        'thickness_id': item.get('thickness_id')
+    }
+
+
+def _stage_name(table):
+    return f'_stage_{table}'
+
 
+def create_stage(conn, table, columns, key):
+    """Временная таблица для фикстуры с уникальным ключом key."""
+    stage = _stage_name(table)
+    conn.execute(text(f'DROP TABLE IF EXISTS temp.{stage}'))
+    conn.execute(text(
+        f'CREATE TEMP TABLE {stage} '
+        f'({", ".join(columns)}, PRIMARY KEY ({key}))'
+    ))
+    return stage
 
-def sync_db_with_fixture(fixture_path, db_url):
-    """Синхронизация БД с фикстурой."""
+
+def stage_rows(conn, stage, columns, rows):
+    """Пакетная вставка строк во временную таблицу (последняя побеждает)."""
+    if not rows:
+        return
+    conn.execute(text(
+        f'INSERT OR REPLACE INTO {stage} ({", ".join(columns)}) '
+        f'VALUES ({", ".join(":" + c for c in columns)})'
+    ), rows)
+
+
+def apply_stage(conn, table, stage, columns, key, delete_missing=False):
+    """
+    Переносит временную таблицу в целевую несколькими SQL-запросами.
+
+    Строки сопоставляются по key, изменения применяются через
+    INSERT ... ON CONFLICT(id) DO UPDATE. Возвращает (added, updated,
+    deleted).
+    """
+    data_columns = [c for c in columns if c != 'id']
+    changed = ' OR '.join(f't.{c} IS NOT s.{c}' for c in data_columns)
+
+    added = conn.execute(text(
+        f'SELECT count(*) FROM {stage} s WHERE NOT EXISTS '
+        f'(SELECT 1 FROM {table} t WHERE t.{key} = s.{key})'
+    )).scalar()
+    updated = conn.execute(text(
+        f'SELECT count(*) FROM {stage} s '
+        f'JOIN {table} t ON t.{key} = s.{key} WHERE {changed}'
+    )).scalar()
+    deleted = 0
+    if delete_missing:
+        deleted = conn.execute(text(
+            f'SELECT count(*) FROM {table} t WHERE NOT EXISTS '
+            f'(SELECT 1 FROM {stage} s WHERE s.{key} = t.{key})'
+        )).scalar()
+
+    id_source = 's.id' if key == 'id' else 't.id'
+    join = '' if key == 'id' else (
+        f'LEFT JOIN {table} t ON t.{key} = s.{key}')
+    excluded_changed = ' OR '.join(
+        f'{table}.{c} IS NOT excluded.{c}' for c in data_columns)
+    conn.execute(text(
+        f'INSERT INTO {table} (id, {", ".join(data_columns)}) '
+        f'SELECT {id_source}, '
+        f'{", ".join("s." + c for c in data_columns)} '
+        f'FROM {stage} s {join} WHERE true '
+        f'ON CONFLICT(id) DO UPDATE SET '
+        f'{", ".join(f"{c} = excluded.{c}" for c in data_columns)} '
+        f'WHERE {excluded_changed}'
+    ))
+    if delete_missing and deleted:
+        conn.execute(text(
+            f'DELETE FROM {table} WHERE NOT EXISTS '
+            f'(SELECT 1 FROM {stage} s WHERE s.{key} = {table}.{key})'
+        ))
+    conn.execute(text(f'DROP TABLE temp.{stage}'))
+    return added, updated, deleted
+
+
+def sync_lookup(conn, model_class, items):
+    """Синхронизация справочника, возвращает (added, updated)."""
+    table = model_class.__tablename__
+    columns = [c.name for c in model_class.__table__.columns]
+    stage = create_stage(conn, table, columns, 'id')
+    stage_rows(conn, stage, columns, [
+        {c: item.get(c) for c in columns} for item in items
+    ])
+    added, updated, _ = apply_stage(conn, table, stage, columns, 'id')
+    return added, updated
+
+
+def stream_fixture(conn, fixture_path, batch_size, progress=None):
+    """
+    Потоково читает фикстуру в одном проходе.
+
+    Продукты пачками по batch_size пишутся во временную таблицу,
+    справочники (небольшие) собираются в память, для всех секций
+    считаются хэши. После каждой пачки вызывается progress(count).
+    Возвращает (справочники, хэши секций).
+    """
+    lookups = {model.__name__: [] for model in LOOKUP_MODELS}
+    digests = {name: hashlib.sha256() for name in SECTIONS}
+    stage = create_stage(
+        conn, Product.__tablename__, PRODUCT_COLUMNS, 'product_name_ru')
+    batch, count, seen = [], 0, []
+    for section, item in iter_fixture(fixture_path, sections=seen):
+        if section not in digests:
+            continue
+        update_section_hash(digests[section], item)
+        if section != 'products':
+            lookups[section].append(item)
+            continue
+        count += 1
+        row = product_row(item)
+        if row is not None:
+            batch.append(row)
+        if len(batch) >= batch_size:
+            stage_rows(conn, stage, PRODUCT_COLUMNS, batch)
+            batch = []
+            if progress:
+                progress(count)
+    stage_rows(conn, stage, PRODUCT_COLUMNS, batch)
+    for name in SECTIONS:
+        if name not in seen:
+            raise KeyError(name)
+    logger.info(f'Прочитано {count} продуктов из фикстуры')
+    return lookups, {
+        name: digest.hexdigest() for name, digest in digests.items()}
+
+
+def sync_db_with_fixture(fixture_path, db_url, force=False,
+                         batch_size=FIXTURE_BATCH_SIZE,
+                         strict=STRICT_FIXTURE, progress=None):
+    """
+    Синхронизация БД с фикстурой.
+
+    Неизменившаяся фикстура (по размеру и mtime, затем по хэшу
+    содержимого) пропускается целиком; иначе применяются только
+    секции, хэш которых отличается от сохраненного в манифесте.
+    Фикстура читается потоково, поэтому память не зависит от ее
+    размера. При strict фикстура сначала целиком проверяется
+    validate_fixture и при ошибках отклоняется до любой записи
+    (FixtureValidationError). progress(count) вызывается по мере
+    чтения продуктов; исключение из него (например, отмена задачи)
+    откатывает транзакцию и выбрасывается дальше. Возвращает список
+    примененных секций, при ошибке записи — None.
+    """
     try:
         logger.info('Синхронизация базы данных с фикстурой...')
-        engine = create_engine(db_url)
-        Base.metadata.create_all(engine)
-        Session = sessionmaker(bind=engine)
-        session = Session()
+        engine = get_engine(db_url)
+        upgrade_schema(engine)
         logger.info('Соединение с базой данных установлено')
-        data = load_fixture_data(fixture_path)
+        stat = os.stat(fixture_path)
+        with engine.connect() as conn:
+            manifest = read_manifest(conn)
     except SQLAlchemyError as e:
         logger.error(f'Ошибка соединения с базой данных: {e}')
         raise
@@ -46,133 +306,114 @@ def sync_db_with_fixture(fixture_path, db_url):
         logger.error(f'Неизвестная ошибка при синхронизации: {e}')
         raise
 
-    def safe_float(value, default=0.0):
-        """Преобразует значение в float, возвращает default при ошибке."""
+    if (not force and manifest is not None
+            and manifest.fixture_path == os.path.abspath(fixture_path)
+            and manifest.size_bytes == stat.st_size
+            and manifest.mtime_ns == stat.st_mtime_ns):
+        logger.info('Фикстура не изменилась, синхронизация не требуется.')
+        return []
+
+    content_hash = file_hash(fixture_path)
+    if (not force and manifest is not None
+            and manifest.content_hash == content_hash):
+        with engine.begin() as conn:
+            write_manifest(conn, fixture_path, stat, content_hash,
+                           manifest.section_hashes,
+                           manifest.catalog_version or new_catalog_version())
+        logger.info('Содержимое фикстуры не изменилось, обновлен манифест.')
+        return []
+
+    if strict:
+        report = validate_fixture(fixture_path)
+        if not report.ok:
+            logger.error(report.format())
+            raise FixtureValidationError(report)
+
+    logger.info(f'Потоковое чтение фикстуры: {fixture_path}')
+    old_hashes = {} if force or manifest is None else dict(
+        manifest.section_hashes)
+    interrupted = []
+
+    def report(count):
         try:
-            return float(value) if value is not None else default
-        except (ValueError, TypeError):
-            return default
+            progress(count)
+        except BaseException as e:
+            interrupted.append(e)
+            raise
 
     try:
+        with engine.begin() as conn:
+            lookups, hashes = stream_fixture(
+                conn, fixture_path, batch_size, progress and report)
+            changed = [
+                name for name in SECTIONS
+                if old_hashes.get(name) != hashes[name]
+            ]
+            total_updated, total_added = 0, 0
 
-        def upsert(model_class, items, key='id'):
-            """
-            Логика обновления и добавления и удаления
-            в БД недостающих данных.
-            """
-            updated, added = 0, 0
-            for item in items:
-                obj = session.get(model_class, item[key])
-                if obj:
-                    changed = False
-                    for attr, value in item.items():
-                        if getattr(obj, attr) != value:
-                            setattr(obj, attr, value)
-                            changed = True
-                    if changed:
-                        logger.debug(
-                            f'Обновление: {model_class.__name__} {item[key]}'
-                        )
-                        updated += 1
-                else:
-                    logger.debug(
-                        f'Добавление: {model_class.__name__} {item[key]}'
-                    )
-                    session.add(model_class(**item))
-                    added += 1
-            return updated, added
-
-        total_updated, total_added = 0, 0
-
-        for model_class, key in [
-            (ConstructionType, 'id'),
-            (MaterialType, 'id'),
-            (Size, 'id'),
-            (Thickness, 'id'),
-        ]:
-            logger.info(f'Обработка {model_class.__name__}...')
-            added, updated = upsert(
-                model_class, data[model_class.__name__], key)
-            total_added += added
-            total_updated += updated
-            logger.info(
-                f'{model_class.__name__}: +{added}, ~{updated}'
-            )
-
-        logger.info('Обработка продуктов...')
-        existing_product = {
-            p.product_name_ru: p for p in session.query(Product).all()}
-        fixture_items = set()
-        product_added, product_updated = 0, 0
-
-        required_keys = [
-            'product_name_ru', 'product_name_en',
-            'construction_id', 'material_type_id', 'size_id', 'thickness_id'
-        ]
-
-        for item in data['products']:
-            missing = [key for key in required_keys if key not in item]
-            if missing:
-                logger.error(
-                    f'Пропущены обязательные ключи в продукте: {missing}\n'
-                    f'Продукт: {item["product_name_ru"]}'
+            for model_class in LOOKUP_MODELS:
+                if model_class.__name__ not in changed:
+                    continue
+                logger.info(f'Обработка {model_class.__name__}...')
+                added, updated = sync_lookup(
+                    conn, model_class, lookups[model_class.__name__])
+                total_added += added
+                total_updated += updated
+                logger.info(
+                    f'{model_class.__name__}: +{added}, ~{updated}'
                 )
-                continue
-            fixture_items.add(item['product_name_ru'])
-
-            product_data = {
-                'product_name_ru': item['product_name_ru'],
-                'product_name_en': item['product_name_en'],
-                'volume_m3': safe_float(item.get('volume_m3', 0)),
-                'construction_id': item.get('construction_id'),
-                'material_type_id': item.get('material_type_id'),
-                'size_id': item.get('size_id'),
-                'thickness_id': item.get('thickness_id')
-            }
-
-            if item['product_name_ru'] in existing_product:
-                product = existing_product[item['product_name_ru']]
-                changed = False
-                for key, value in product_data.items():
-                    if getattr(product, key) != value:
-                        setattr(product, key, value)
-                        changed = True
-                if changed:
-                    logger.debug(
-                        f'Обновление продукта: {item["product_name_ru"]}'
-                    )
-                    product_updated += 1
-            else:
-                logger.debug(
-                    f'Добавление продукта: {item["product_name_ru"]}'
-                )
-                session.add(Product(**product_data))
-                product_added += 1
 
-        to_delete = set(existing_product.keys()) - fixture_items
-        for name in to_delete:
-            logger.debug(f'Удаление продукта: {name}')
-            session.delete(existing_product[name])
-
-        session.commit()
+            product_added, product_updated, product_deleted = 0, 0, 0
+            stage = _stage_name(Product.__tablename__)
+            if 'products' in changed:
+                logger.info('Обработка продуктов...')
+                product_added, product_updated, product_deleted = (
+                    apply_stage(
+                        conn, Product.__tablename__, stage, PRODUCT_COLUMNS,
+                        'product_name_ru', delete_missing=True
+                    ))
+            else:
+                conn.execute(text(f'DROP TABLE temp.{stage}'))
 
-        logger.info(
-            f'✓ MaterialTypes, ConstructionTypes, Sizes & Thicknesses: '
-            f'+{total_added}, ~{total_updated}')
-        logger.info(
-            f'✓ Products: +{product_added}, ~{product_updated}, '
-            f' -{len(to_delete)}')
-        logger.info('Синхронизация завершена успешно.')
+            # Метка версии меняется вместе с данными в той же транзакции
+            version = (
+                new_catalog_version()
+                if changed or manifest is None or not manifest.catalog_version
+                else manifest.catalog_version
+            )
+            write_manifest(
+                conn, fixture_path, stat, content_hash, hashes, version)
 
     except SQLAlchemyError as e:
         logger.error(f'Ошибка при работе с БД: {e}')
-        session.rollback()
+        return None
+    except json.JSONDecodeError as e:
+        logger.error(f'Ошибка чтения JSON: {e}')
+        return None
     except KeyError as e:
         logger.error(f'Ошибка в структуре данных: отсутствует ключ {e}')
-        session.rollback()
+        return None
     except Exception as e:
+        if interrupted and e is interrupted[0]:
+            logger.info('Синхронизация прервана, изменения отменены')
+            raise
         logger.exception(f'Неожиданная ошибка при синхронизации: {e}')
-        session.rollback()
-    finally:
-        session.close()
-        logger.info('Сессия закрыта.')
+        return None
+
+    logger.info(f'Измененные секции: {", ".join(changed) or "нет"}')
+    logger.info(
+        f'✓ MaterialTypes, ConstructionTypes, Sizes & Thicknesses: '
+        f'+{total_added}, ~{total_updated}')
+    logger.info(
+        f'✓ Products: +{product_added}, ~{product_updated}, '
+        f' -{product_deleted}')
+
+    # Данные и манифест уже зафиксированы: ошибка снимка не отменяет
+    # синхронизацию, каталог перечитается при следующем обращении
+    try:
+        rebuild_catalog(db_url)
+    except Exception as e:
+        logger.exception(f'Не удалось пересобрать каталог: {e}')
+        invalidate_catalog(db_url)
+    logger.info('Синхронизация завершена успешно.')
+    return changed
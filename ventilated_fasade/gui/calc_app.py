@@ -1,58 +1,266 @@
 # from reports.report_generator import ReportGenerator
 from logic.validators import InputValidator, ValidationError
-from data.materials import GetInsulationMaterials
-from data.people import get_session, get_engineer, upsert_engineer, list_managers, add_manager, upsert_address
-from data.sync import sync_db_with_fixture
-from logic.calculator import InsulationCalculator
-from data.services_calc import create_calc, create_revision
-from data.models_calc import Calculation
+from data.catalog import get_catalog
+from gui.tasks import TaskExecutor, TaskCancelled
 from config import DB_URL
 import tkinter as tk
-from tkinter import ttk, messagebox, Menu, filedialog
+from tkinter import ttk, messagebox, Menu, filedialog, simpledialog
 import os
 import logging
 import sys
+import threading
 
 logger = logging.getLogger(__name__)
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# SQLAlchemy и numpy импортируются внутри фоновых задач и диалогов:
+# окно рисуется по снимку каталога, не загружая их.
+
+# Сброшено, пока при запуске проверяется схема БД
+_database_ready = threading.Event()
+_database_ready.set()
+
+
+def get_session():
+    """Сессия БД расчетов; ждет окончания проверки схемы при запуске."""
+    _database_ready.wait()
+    from data.people import get_session as people_session
+
+    return people_session()
+
+
+def prepare_database(initialize):
+    """Фоновая задача: проверка и обновление схемы БД при запуске."""
+    try:
+        initialize()
+    finally:
+        _database_ready.set()
+
+
+def run_calculation(outer_material, inner_material, validated_data,
+                    use_layout=False, reveal_area_m2=0, zoned_fasteners=False):
+    """
+    Фоновая задача: расчет и отчет калькулятора.
+
+    Отчет берется из кэша результатов, если такой расчет
+    с текущей версией каталога уже выполнялся.
+    """
+    from logic.calculator import InsulationCalculator
+    from logic.result_cache import canonical_payload, get_result_cache
+
+    repo = get_catalog()
+    calc = InsulationCalculator(
+        outer_material_ru_name=outer_material,
+        inner_material_ru_name=inner_material,
+        repo=repo,
+        use_layout=use_layout,
+        reveal_area_m2=reveal_area_m2,
+        zoned_fasteners=zoned_fasteners,
+        **validated_data
+    )
+    payload = {
+        'system_type': 'double' if inner_material else 'single',
+        'outer_material': outer_material,
+        'inner_material': inner_material,
+        **validated_data,
+        'reveal_area_m2': reveal_area_m2,
+        'use_layout': use_layout,
+        'zoned_fasteners': zoned_fasteners,
+    }
+    summary = get_result_cache().get_or_compute(
+        canonical_payload(payload), calc.summary,
+        catalog_version=repo.version)
+    return calc, summary
+
+
+def run_geometry_import(path):
+    """Фоновая задача: площадь нетто и откосы по CSV геометрии."""
+    from logic.geometry import load_geometry_csv
+
+    return load_geometry_csv(path).calculate()
+
+
+def run_optimizer(system_type, validated_data, target_thickness_mm):
+    """Фоновая задача: подбор лучших материалов для фасада."""
+    from logic.optimizer import MaterialOptimizer
+
+    return MaterialOptimizer().rank(
+        validated_data['area_m2'],
+        validated_data['building_height_m'],
+        validated_data['count_corner'],
+        system_type='double' if system_type == 'double' else 'single',
+        target_thickness_mm=target_thickness_mm,
+    )
+
+
+def run_fixture_sync(path, context):
+    """Фоновая задача: синхронизация БД с фикстурой с прогрессом."""
+    from data.sync import sync_db_with_fixture
+
+    _database_ready.wait()
+    context.report(0, None, 'Чтение фикстуры...')
+    return sync_db_with_fixture(
+        path, DB_URL,
+        progress=lambda count: context.report(
+            count, None, f'Прочитано продуктов: {count}')
+    )
+
+
+def build_report(calc, filename, report_format):
+    """Фоновая задача (отдельный процесс): построение Excel/PDF-отчета."""
+    from reports.report_generator import ReportGenerator
+
+    rg = ReportGenerator(calc)
+    if report_format == 'excel':
+        rg.generate_excel_report(filename)
+    else:
+        rg.generate_pdf_report(filename)
+    return filename
+
+
+def store_calculation(payload_in, payload_out, manager_full):
+    """Фоновая задача: сохранение первичного расчета в БД."""
+    from data.db import retry_on_busy
+    from data.people import get_engineer, list_managers, upsert_address
+    from data.services_calc import create_calc
+
+    def store():
+        with get_session() as s:
+            eng = get_engineer(s)
+            if not eng:
+                raise ValueError(
+                    "Сначала укажите инженера (База данных → Инженер).")
+            a = payload_in["address"]
+            adr = upsert_address(s, a["line1"], a["city"] or None, a["region"] or None, a["postal_code"] or None, a["note"] or None)
+            calc = create_calc(s, eng, adr.id, payload_in, payload_out)
+            # привяжем менеджера, если выбран
+            if manager_full:
+                m = next((x for x in list_managers(s) if f"{x.first_name} {x.last_name}"==manager_full), None)
+                if m:
+                    calc.managers.append(m)
+            s.commit()
+            return calc.number, calc.base_number
+
+    return retry_on_busy(store)
+
+
+def store_revision(base_number, payload_in, payload_out):
+    """Фоновая задача: сохранение новой версии расчета в БД."""
+    from data.db import retry_on_busy
+    from data.services_calc import create_revision
+
+    def store():
+        with get_session() as s:
+            rev = create_revision(s, base_number, payload_in, payload_out)
+            s.commit()
+            return rev.number
+
+    return retry_on_busy(store)
+
+
+def load_history_page(cursor, address):
+    """
+    Фоновая задача: страница истории — первые версии серий с числом
+    версий; входные данные и результат не читаются.
+    """
+    from data.calc_archive import (
+        archive_item_to_dict, count_versions, query_archive)
+
+    with get_session() as s:
+        page = query_archive(
+            s, address=address or None, series_only=True, cursor=cursor)
+        versions = count_versions(s, {c.base_number for c in page.items})
+        items = [
+            {**archive_item_to_dict(c), "versions": versions[c.base_number]}
+            for c in page.items
+        ]
+        return items, page.next_cursor
+
+
+def load_revisions(base_number):
+    """Фоновая задача: версии серии после первой."""
+    from data.calc_archive import archive_item_to_dict, list_revisions
+
+    with get_session() as s:
+        return [archive_item_to_dict(c)
+                for c in list_revisions(s, base_number) if c.version > 0]
+
+
+def load_calculation(calc_id):
+    """Фоновая задача: входные данные и результат сохраненного расчета."""
+    from data.models_calc import Calculation
+
+    with get_session() as s:
+        calc = s.get(Calculation, calc_id)
+        if calc is None:
+            raise ValueError("Расчёт не найден, обновите историю.")
+        return {
+            "number": calc.number,
+            "base_number": calc.base_number,
+            "input": calc.input_payload,
+            "result": calc.result_payload,
+        }
+
 
 class InsulationCalculatorApp(tk.Tk):
     """Главное окно приложения для расчета теплоизоляции фасадов НФС."""
 
-    def __init__(self):
-        """Инициализация главного окна приложения."""
+    def __init__(self, initialize_database=None):
+        """
+        Инициализация главного окна приложения.
+
+        initialize_database — проверка схемы БД; выполняется в фоне
+        после отрисовки окна, обращения к БД ждут ее окончания.
+        """
         super().__init__()
         self.title('Калькулятор теплоизоляции для НФС')
         self.geometry('800x600')
         logger.info('Запуск приложения InsulationCalculatorApp')
 
         try:
-            materials = GetInsulationMaterials()
+            materials = get_catalog()
             self.materials_list = materials.get_all_ru_names()
             self.materials_data = materials.get_all_materials()
             logger.debug(f'Загружены материалы: {self.materials_list}')
         except Exception as e:
             logger.error(f'Не удалось загрузить материалы: {e}', exc_info=True)
-            messagebox.showerror(
-                'Ошибка', f'Не удалось загрузить материалы: {e}')
+            # До проверки схемы таблиц может еще не быть: материалы
+            # перечитаются после нее
+            if initialize_database is None:
+                messagebox.showerror(
+                    'Ошибка', f'Не удалось загрузить материалы: {e}')
             self.materials_list = []
             self.materials_data = []
 
         self.result = {}
+        # Калькулятор результата self.result — по нему строятся отчеты
+        self.calc = None
+        self.reveal_area_m2 = 0.0
+        self.tasks = TaskExecutor(self)
+        self.current_task = None
+        self.protocol('WM_DELETE_WINDOW', self.on_close)
+        if initialize_database is not None:
+            _database_ready.clear()
+
         self.notebook = ttk.Notebook(self)
         self.notebook.pack(fill='both', expand=True)
+        self.create_status_bar()
 
         self.calc_frame = ttk.Frame(self.notebook)
         self.materials_frame = ttk.Frame(self.notebook)
 
+        self.history_frame = ttk.Frame(self.notebook)
+
         self.notebook.add(self.calc_frame, text='Калькулятор')
         self.notebook.add(self.materials_frame, text='Материалы')
+        self.notebook.add(self.history_frame, text='История')
 
         self.create_calc_tab()
+        self.create_history_tab()
 
         self.create_menu()
+        self.after_idle(self.start_database, initialize_database)
 
         self.material_columns = (
             'index',
@@ -72,8 +280,11 @@ class InsulationCalculatorApp(tk.Tk):
             "building_height_m": self.entries["building_height_m"].get().strip(),
             "count_corner": self.entries["count_corner"].get().strip(),
             "perimeter_m": self.entries["perimeter_m"].get().strip(),
+            "reveal_area_m2": self.reveal_area_m2,
             "inner_material": self.material_cb_inner.get().strip(),
             "outer_material": self.material_cb_outer.get().strip() if self.system_type.get()=="double" else self.material_cb_inner.get().strip(),
+            "use_layout": self.use_layout.get(),
+            "zoned_fasteners": self.zoned_fasteners.get(),
             "manager": self.manager_cb.get().strip() if hasattr(self, "manager_cb") else "",
             "address": {
                 "line1": self.addr_line1.get().strip(), "city": self.addr_city.get().strip(),
@@ -82,6 +293,96 @@ class InsulationCalculatorApp(tk.Tk):
             }
         }
 
+    def create_status_bar(self):
+        """Строка состояния фоновых задач: текст, прогресс и отмена."""
+        bar = ttk.Frame(self)
+        bar.pack(fill='x', side='bottom', padx=8, pady=(0, 4))
+        self.status_var = tk.StringVar(value='Готово')
+        ttk.Label(bar, textvariable=self.status_var).pack(side='left')
+        self.cancel_button = ttk.Button(
+            bar, text='Отмена', command=self.cancel_task, state='disabled')
+        self.cancel_button.pack(side='right')
+        self.progress = ttk.Progressbar(bar, mode='indeterminate', length=160)
+        self.progress.pack(side='right', padx=8)
+
+    def run_task(self, fn, *args, title, on_done, kind='io',
+                 with_context=False):
+        """
+        Запускает fn в фоне, показывая ход выполнения в строке состояния.
+
+        on_done вызывается в главном потоке с результатом fn,
+        ошибки показываются в окне с заголовком title.
+        """
+        def finish():
+            self.progress.stop()
+            self.progress.configure(mode='indeterminate', value=0)
+            if not self.tasks.busy:
+                self.cancel_button.configure(state='disabled')
+
+        def done(result):
+            finish()
+            self.status_var.set(f'{title}: готово')
+            on_done(result)
+
+        def error(e):
+            finish()
+            if isinstance(e, TaskCancelled):
+                self.status_var.set(f'{title}: отменено')
+                return
+            self.status_var.set(f'{title}: ошибка')
+            messagebox.showerror('Ошибка', f'{title}:\n{e}')
+
+        def progress(done_count, total, message):
+            if total:
+                self.progress.stop()
+                self.progress.configure(
+                    mode='determinate', maximum=total, value=done_count)
+            self.status_var.set(message or f'{title}...')
+
+        self.status_var.set(f'{title}...')
+        self.progress.start(10)
+        self.cancel_button.configure(state='normal')
+        self.current_task = self.tasks.submit(
+            fn, *args, name=title, kind=kind, with_context=with_context,
+            on_done=done, on_error=error, on_progress=progress
+        )
+        return self.current_task
+
+    def cancel_task(self):
+        """Отменяет текущую фоновую задачу."""
+        if self.current_task is not None and not self.current_task.done:
+            self.current_task.cancel()
+            self.status_var.set('Отмена...')
+
+    def start_database(self, initialize):
+        """Запускает проверку схемы БД, затем читает менеджеров."""
+        if initialize is None:
+            self.reload_managers()
+            return
+
+        def ready(_):
+            self.status_var.set('Готово')
+            if not self.materials_list:
+                self.reload_materials()
+            self.reload_managers()
+
+        def failed(e):
+            logger.error(f'Ошибка инициализации БД: {e}', exc_info=e)
+            messagebox.showerror(
+                'Ошибка инициализации БД',
+                f'Не удалось инициализировать базу данных:\n{e}')
+            self.on_close()
+
+        self.status_var.set('Проверка базы данных...')
+        self.tasks.submit(
+            prepare_database, initialize, name='Проверка базы данных',
+            on_done=ready, on_error=failed)
+
+    def on_close(self):
+        """Останавливает фоновые задачи и закрывает окно."""
+        self.tasks.shutdown()
+        self.destroy()
+
     def create_calc_tab(self):
         """Создает вкладку с интерфейсом калькулятора."""
         # Основной фрейм разделен на 2 колонки: левая (элементы управления) и правая (таблица)
@@ -149,6 +450,9 @@ class InsulationCalculatorApp(tk.Tk):
         if self.materials_list:
             self.material_cb_outer.set(self.materials_list[0])
 
+        ttk.Button(mat_frame, text="Подобрать материалы", command=self.open_optimizer)\
+            .grid(row=4, column=0, columnspan=2, sticky="ew", pady=(8, 0))
+
         mat_frame.grid_columnconfigure(0, weight=1)
         mat_frame.grid_columnconfigure(1, weight=1)
 
@@ -159,7 +463,6 @@ class InsulationCalculatorApp(tk.Tk):
         self.manager_cb.grid(row=0, column=1, padx=8, pady=(8, 4), sticky="ew")
         ttk.Button(left_mid, text="Добавить менеджера", command=self.open_add_manager)\
             .grid(row=1, column=0, columnspan=2, padx=8, pady=(0, 8), sticky="ew")
-        self.reload_managers()
 
         # Адрес
         row0 = 2
@@ -187,6 +490,14 @@ class InsulationCalculatorApp(tk.Tk):
             ttk.Label(left_mid, text=label_text).grid(row=base+i, column=0, padx=8, pady=2, sticky="w")
             e = ttk.Entry(left_mid); e.grid(row=base+i, column=1, padx=8, pady=2, sticky="ew")
             self.entries[key] = e
+        self.use_layout = tk.BooleanVar(value=False)
+        ttk.Checkbutton(left_mid, text="Учитывать раскрой плит по стенам",
+                        variable=self.use_layout)\
+            .grid(row=base+len(fields), column=0, columnspan=2, padx=8, pady=(4, 2), sticky="w")
+        self.zoned_fasteners = tk.BooleanVar(value=False)
+        ttk.Checkbutton(left_mid, text="Крепеж по ветровым зонам (углы, кровля)",
+                        variable=self.zoned_fasteners)\
+            .grid(row=base+len(fields)+1, column=0, columnspan=2, padx=8, pady=2, sticky="w")
 
         # ====== Содержание ЛЕВО — низ: кнопки ======
         btns = ttk.Frame(left_bottom)
@@ -287,18 +598,15 @@ class InsulationCalculatorApp(tk.Tk):
                     'Ошибка', f'Материал "{inner_material}" не найден в базе.')
                 return
 
-            calc = InsulationCalculator(
-                outer_material_ru_name=outer_material,
-                inner_material_ru_name=inner_material if self.system_type.get(
+            self.run_task(
+                run_calculation, outer_material,
+                inner_material if self.system_type.get(
                 ) == 'double' else None,
-                **validated_data
+                validated_data, self.use_layout.get(), self.reveal_area_m2,
+                self.zoned_fasteners.get(),
+                title='Расчет', on_done=self.on_calculated
             )
 
-            self.calc = calc
-            result = calc.summary()
-            self.result = result
-            self.display_result(result)
-
         except ValidationError as ve:
             messagebox.showerror('Ошибка ввода', str(ve))
         except Exception as e:
@@ -306,6 +614,77 @@ class InsulationCalculatorApp(tk.Tk):
             messagebox.showerror(
                 'Ошибка', f'Произошла ошибка при расчете:\n{e}')
 
+    def open_optimizer(self):
+        """Запускает подбор материалов по введенным габаритам фасада."""
+        try:
+            raw_data = {key: entry.get().strip()
+                        for key, entry in self.entries.items()}
+            validated_data = InputValidator().validate_inputs(raw_data)
+        except ValidationError as ve:
+            messagebox.showerror('Ошибка ввода', str(ve))
+            return
+        target = simpledialog.askinteger(
+            'Подбор материалов',
+            'Целевая суммарная толщина, мм (пусто — без ограничения):',
+            parent=self, minvalue=1
+        )
+        system_type = self.system_type.get()
+        self.run_task(
+            run_optimizer, system_type, validated_data, target,
+            title='Подбор материалов',
+            on_done=lambda candidates: self.show_candidates(
+                system_type, candidates)
+        )
+
+    def show_candidates(self, system_type, candidates):
+        """Окно с лучшими вариантами; выбранный подставляется в форму."""
+        if not candidates:
+            messagebox.showinfo('Подбор материалов', 'Подходящих материалов нет.')
+            return
+        win = tk.Toplevel(self)
+        win.title('Подбор материалов')
+        columns = ('outer', 'inner', 'volume', 'sheets', 'fasteners', 'thickness')
+        headings = ('Внешний слой' if system_type == 'double' else 'Материал',
+                    'Внутренний слой', 'Объем, м³', 'Плиты', 'Крепеж', 'Толщина, мм')
+        tree = ttk.Treeview(win, columns=columns, show='headings', height=10)
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=260 if column in ('outer', 'inner') else 90)
+        for i, c in enumerate(candidates):
+            tree.insert('', 'end', iid=str(i), values=(
+                c.outer_material, c.inner_material or '—', c.volume,
+                c.sheets, c.fasteners, c.thickness_mm))
+        tree.pack(fill='both', expand=True, padx=8, pady=8)
+        tree.selection_set('0')
+
+        def apply():
+            selected = tree.selection()
+            if not selected:
+                return
+            c = candidates[int(selected[0])]
+            if system_type == 'double':
+                self.material_cb_outer.set(c.outer_material)
+                self.material_cb_inner.set(c.inner_material)
+            else:
+                self.material_cb_inner.set(c.outer_material)
+            win.destroy()
+
+        tree.bind('<Double-1>', lambda _: apply())
+        ttk.Button(win, text='Применить', command=apply).pack(pady=(0, 8))
+
+    def on_calculated(self, outcome):
+        """Принимает результат фонового расчета."""
+        self.calc, self.result = outcome
+        self.display_result(self.result)
+        waste = [
+            f"{layer['material']}: {layer['layout']['waste_percent']}%"
+            for layer in (self.result.get('outer_layer'),
+                          self.result.get('inner_layer'))
+            if layer and 'layout' in layer
+        ]
+        if waste:
+            self.status_var.set('Отход раскроя — ' + '; '.join(waste))
+
     def display_result(self, result):
         """Отображает результаты расчета в таблице."""
         self.object_table.delete(*self.object_table.get_children())
@@ -396,6 +775,8 @@ class InsulationCalculatorApp(tk.Tk):
         file_menu.add_separator()
         file_menu.add_command(
             label='Загрузить фикстуру в БД', command=self.load_fixture)
+        file_menu.add_command(
+            label='Импорт фасадов и проемов (CSV)…', command=self.import_geometry)
         file_menu.add_separator()
         file_menu.add_command(label='Сохранить Excel', command=self.save_excel)
         file_menu.add_command(label='Сохранить PDF', command=self.save_pdf)
@@ -415,6 +796,30 @@ class InsulationCalculatorApp(tk.Tk):
 
         self.config(menu=menubar)
 
+    def import_geometry(self):
+        """Подставляет площадь нетто и площадь откосов из CSV геометрии."""
+        path = filedialog.askopenfilename(
+            title='Выберите CSV с фасадами и проемами',
+            filetypes=[('CSV files', '*.csv'), ('All files', '*.*')]
+        )
+        if not path:
+            return
+
+        def done(net):
+            entry = self.entries['area_m2']
+            entry.delete(0, tk.END)
+            entry.insert(0, f'{net.net_area_m2:.2f}')
+            self.reveal_area_m2 = net.reveal_area_m2
+            self.status_var.set(
+                f'Фасады {net.gross_area_m2:.2f} м², проемов {net.openings} '
+                f'({net.openings_area_m2:.2f} м²), откосы {net.reveal_area_m2:.2f} м²'
+            )
+
+        self.run_task(
+            run_geometry_import, path,
+            title='Импорт геометрии', on_done=done
+        )
+
     def load_fixture(self):
         """Загрузка фикстур руками."""
         path = filedialog.askopenfilename(
@@ -423,24 +828,31 @@ class InsulationCalculatorApp(tk.Tk):
         )
         if not path:
             return
-        try:
-            sync_db_with_fixture(path, DB_URL)
+
+        def done(changed):
+            if changed is None:
+                messagebox.showerror(
+                    'Ошибка', 'Не удалось загрузить фикстуру, '
+                    'подробности в журнале.')
+                return
             messagebox.showinfo('Успех', f'Фикстура успешо загружена: {path}')
             self.reload_materials()
-        except Exception as e:
-            logger.exception('Ошибка загрузки фикстуры')
-            messagebox.showerror(
-                'Ошибка', f'Не удалось загрузить фикстуру: {e}'
-            )
+
+        self.run_task(
+            run_fixture_sync, path, with_context=True,
+            title='Загрузка фикстуры', on_done=done
+        )
 
     def reload_materials(self):
         try:
-            repo = GetInsulationMaterials()
+            repo = get_catalog()
             self.materials_list = repo.get_all_ru_names()
+            self.materials_data = repo.get_all_materials()
 
-            self.material_cb_inner.configure(values=self.materials_list)
-            if self.materials_list:
-                self.material_cb_inner.set(self.materials_list[0])
+            for cb in (self.material_cb_inner, self.material_cb_outer):
+                cb.configure(values=self.materials_list)
+                if self.materials_list:
+                    cb.set(self.materials_list[0])
         except Exception as e:
             logger.exception('Ошибка обновления материалов')
             messagebox.showerror(
@@ -454,10 +866,12 @@ class InsulationCalculatorApp(tk.Tk):
         for item in self.result_table.get_children():
             self.result_table.delete(item)
         self.result = {}
+        self.calc = None
+        self.reveal_area_m2 = 0.0
 
     def save_excel(self):
         """Сохраняет результаты расчета в Excel файл."""
-        if not hasattr(self, 'result') or not self.result:
+        if not self.result or self.calc is None:
             logger.warning('Попытка сохранения отчета без данных')
             messagebox.showerror(
                 'Ошибка', 'Нет данных для сохранения. '
@@ -470,11 +884,15 @@ class InsulationCalculatorApp(tk.Tk):
                 filetypes=[('Excel files', '*.xlsx'), ('All files', '*.*')]
             )
             if filename:
-                rg = ReportGenerator(self.calc)
-                rg.generate_excel_report(filename)
-                logger.info(f'Отчет успешно сохранен в Excel: {filename}')
-                messagebox.showinfo(
-                    'Успех', f'Отчет успешно сохранен: {filename}'
+                def done(path):
+                    logger.info(f'Отчет успешно сохранен в Excel: {path}')
+                    messagebox.showinfo(
+                        'Успех', f'Отчет успешно сохранен: {path}'
+                    )
+
+                self.run_task(
+                    build_report, self.calc, filename, 'excel', kind='cpu',
+                    title='Сохранение Excel', on_done=done
                 )
         except Exception as e:
             logger.error(
@@ -484,7 +902,7 @@ class InsulationCalculatorApp(tk.Tk):
 
     def save_pdf(self):
         """Сохраняет отчет в формате PDF."""
-        if not hasattr(self, 'result') or not self.result:
+        if not self.result or self.calc is None:
             logger.warning('Попытка сохранения PDF отчета без данных')
             messagebox.showerror(
                 'Ошибка', 'Нет данных для сохранения. '
@@ -497,11 +915,15 @@ class InsulationCalculatorApp(tk.Tk):
                 filetypes=[('PDF files', '*.pdf'), ('All files', '*.*')]
             )
             if filename:
-                rg = ReportGenerator(self.calc)
-                rg.generate_pdf_report(filename)
-                logger.info(f'Отчет успешно сохранен в PDF: {filename}')
-                messagebox.showinfo(
-                    'Успех', f'Отчет успешно сохранен: {filename}'
+                def done(path):
+                    logger.info(f'Отчет успешно сохранен в PDF: {path}')
+                    messagebox.showinfo(
+                        'Успех', f'Отчет успешно сохранен: {path}'
+                    )
+
+                self.run_task(
+                    build_report, self.calc, filename, 'pdf', kind='cpu',
+                    title='Сохранение PDF', on_done=done
                 )
         except Exception as e:
             logger.error(
@@ -533,6 +955,8 @@ class InsulationCalculatorApp(tk.Tk):
         e3.grid(row=2, column=1, padx=6, pady=4)
         e4.grid(row=3, column=1, padx=6, pady=4)
 
+        from data.people import get_engineer, upsert_engineer
+
         # префилл
         with get_session() as s:
             eng = get_engineer(s)
@@ -560,6 +984,8 @@ class InsulationCalculatorApp(tk.Tk):
             row=4, column=0, columnspan=2, pady=8)
 
     def reload_managers(self):
+        from data.people import list_managers
+
         try:
             with get_session() as s:
                 items = list_managers(s)
@@ -575,6 +1001,8 @@ class InsulationCalculatorApp(tk.Tk):
                 "Ошибка", f"Не удалось загрузить менеджеров:\n{e}")
 
     def open_add_manager(self):
+        from data.people import add_manager
+
         win = tk.Toplevel(self)
         win.title("Добавить менеджера")
         win.grab_set()
@@ -611,37 +1039,268 @@ class InsulationCalculatorApp(tk.Tk):
         if not getattr(self, "result", None):
             messagebox.showerror("Ошибка", "Сначала выполните расчёт.")
             return
-        with get_session() as s:
-            eng = get_engineer(s)
-            if not eng:
-                messagebox.showerror("Ошибка", "Сначала укажите инженера (База данных → Инженер).")
-                return
-            a = self._gather_input_payload()["address"]
-            adr = upsert_address(s, a["line1"], a["city"] or None, a["region"] or None, a["postal_code"] or None, a["note"] or None)
-            payload_in = self._gather_input_payload()
-            payload_out = self.result
-            calc = create_calc(s, eng, adr.id, payload_in, payload_out)
-            # привяжем менеджера, если выбран
-            if self.manager_cb.get():
-                full = self.manager_cb.get()
-                m = next((x for x in list_managers(s) if f"{x.first_name} {x.last_name}"==full), None)
-                if m:
-                    calc.managers.append(m)
-            s.commit()
-            messagebox.showinfo("Сохранено", f"Расчёт сохранён с номером:\n{calc.number}")
-            self.current_calc_base = calc.base_number  # запомним для ревизий
+        def done(saved):
+            number, base_number = saved
+            messagebox.showinfo("Сохранено", f"Расчёт сохранён с номером:\n{number}")
+            self.current_calc_base = base_number  # запомним для ревизий
+            self.reload_history()
+
+        self.run_task(
+            store_calculation, self._gather_input_payload(), self.result,
+            self.manager_cb.get(),
+            title="Сохранение расчёта", on_done=done
+        )
 
     def save_calculation_revision(self):
         if not getattr(self, "result", None) or not getattr(self, "current_calc_base", None):
             messagebox.showerror("Ошибка", "Нет базового расчёта. Сначала сохраните первичную версию.")
             return
-        with get_session() as s:
-            payload_in = self._gather_input_payload()
-            payload_out = self.result
-            rev = create_revision(s, self.current_calc_base, payload_in, payload_out)
-            s.commit()
-            messagebox.showinfo("Сохранено", f"Создана версия:\n{rev.number}")
+        self.run_task(
+            store_revision, self.current_calc_base,
+            self._gather_input_payload(), self.result,
+            title="Сохранение версии", on_done=self.on_revision_saved
+        )
+
+    def on_revision_saved(self, number):
+        messagebox.showinfo("Сохранено", f"Создана версия:\n{number}")
+        self.reload_history()
             
+    def create_history_tab(self):
+        """Создает вкладку истории сохраненных расчетов."""
+        self.history_frame.grid_columnconfigure(0, weight=1)
+        self.history_frame.grid_rowconfigure(1, weight=1)
+
+        search = ttk.Frame(self.history_frame)
+        search.grid(row=0, column=0, columnspan=2, sticky='ew',
+                    padx=8, pady=(8, 4))
+        ttk.Label(search, text='Адрес содержит:').pack(side='left')
+        self.history_address = ttk.Entry(search, width=30)
+        self.history_address.pack(side='left', padx=6)
+        self.history_address.bind(
+            '<Return>', lambda event: self.reload_history(force=True))
+        ttk.Button(search, text='Найти',
+                   command=lambda: self.reload_history(force=True))\
+            .pack(side='left')
+        ttk.Button(search, text='Открыть расчёт',
+                   command=self.open_history_item).pack(side='right')
+
+        columns = ('created', 'engineer', 'address', 'managers', 'status')
+        self.history_table = ttk.Treeview(
+            self.history_frame, columns=columns, show='tree headings')
+        self.history_table.heading('#0', text='Номер')
+        self.history_table.column('#0', width=170, stretch=False)
+        headers = {
+            'created': 'Создан',
+            'engineer': 'Инженер',
+            'address': 'Адрес',
+            'managers': 'Менеджеры',
+            'status': 'Статус',
+        }
+        widths = [130, 150, 260, 180, 80]
+        for col, w in zip(columns, widths):
+            self.history_table.heading(col, text=headers[col])
+            self.history_table.column(
+                col, width=w, stretch=(col == 'address'))
+        vsb = ttk.Scrollbar(self.history_frame, orient='vertical',
+                            command=self.history_table.yview)
+        self.history_vsb = vsb
+        self.history_table.configure(yscrollcommand=self.on_history_scroll)
+        self.history_table.grid(
+            row=1, column=0, sticky='nsew', padx=(8, 0), pady=(0, 8))
+        vsb.grid(row=1, column=1, sticky='ns', padx=(0, 8), pady=(0, 8))
+
+        self.history_table.bind('<<TreeviewOpen>>', self.on_history_expand)
+        self.history_table.bind(
+            '<Double-1>', lambda event: self.open_history_item())
+        self.history_table.bind(
+            '<Return>', lambda event: self.open_history_item())
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+
+        # Страницы подгружаются по мере прокрутки; generation отбрасывает
+        # ответы, пришедшие после смены фильтра
+        self.history_loaded = False
+        self.history_loading = False
+        self.history_cursor = None
+        self.history_generation = 0
+
+    def on_tab_changed(self, event):
+        """Первая страница истории читается при первом открытии вкладки."""
+        if (self.notebook.select() == str(self.history_frame)
+                and not self.history_loaded):
+            self.reload_history(force=True)
+
+    def reload_history(self, force=False):
+        """Сбрасывает список и загружает первую страницу."""
+        if not (force or self.history_loaded):
+            return
+        self.history_generation += 1
+        self.history_loaded = True
+        self.history_loading = False
+        self.history_cursor = None
+        self.history_table.delete(*self.history_table.get_children())
+        self.load_history_page()
+
+    def load_history_page(self):
+        """Загружает следующую страницу истории в фоне."""
+        if self.history_loading:
+            return
+        if self.history_table.get_children() and not self.history_cursor:
+            return
+        self.history_loading = True
+        generation = self.history_generation
+
+        def done(page):
+            if generation != self.history_generation:
+                return
+            self.history_loading = False
+            items, self.history_cursor = page
+            for item in items:
+                self._insert_history_row('', item)
+                if item['versions'] > 1:
+                    # заглушка: версии читаются при раскрытии серии
+                    self.history_table.insert(
+                        f"calc-{item['id']}", 'end',
+                        iid=f"stub-{item['id']}", text='…')
+            self.status_var.set(
+                f'История: загружено {len(self.history_table.get_children())}'
+                f'{"" if self.history_cursor else " (все)"}'
+            )
+
+        def error(e):
+            if generation == self.history_generation:
+                self.history_loading = False
+            self.status_var.set('История: ошибка загрузки')
+            messagebox.showerror('Ошибка', f'Не удалось загрузить историю:\n{e}')
+
+        self.tasks.submit(
+            load_history_page, self.history_cursor,
+            self.history_address.get().strip(),
+            name='История расчётов', on_done=done, on_error=error)
+
+    def _insert_history_row(self, parent, item):
+        self.history_table.insert(
+            parent, 'end', iid=f"calc-{item['id']}", text=item['number'],
+            values=(
+                item['created_at'][:16].replace('T', ' '),
+                item['engineer'],
+                item['address'] or '',
+                ', '.join(item['managers']),
+                item['status'],
+            ))
+
+    def on_history_scroll(self, first, last):
+        """Подгружает страницу, когда прокрутка подходит к концу списка."""
+        self.history_vsb.set(first, last)
+        if float(last) > 0.9 and self.history_cursor:
+            self.load_history_page()
+
+    def on_history_expand(self, event):
+        """Читает версии серии при ее первом раскрытии."""
+        iid = self.history_table.focus()
+        stub = iid.replace('calc-', 'stub-', 1)
+        if not self.history_table.exists(stub):
+            return
+        generation = self.history_generation
+        base_number = self.history_table.item(iid, 'text')
+
+        def done(revisions):
+            if (generation != self.history_generation
+                    or not self.history_table.exists(stub)):
+                return
+            self.history_table.delete(stub)
+            for item in revisions:
+                self._insert_history_row(iid, item)
+
+        self.tasks.submit(
+            load_revisions, base_number, name='Версии расчёта',
+            on_done=done,
+            on_error=lambda e: self.status_var.set(
+                f'Не удалось загрузить версии: {e}'))
+
+    def open_history_item(self):
+        """Восстанавливает в форме входные данные выбранного расчета."""
+        iid = self.history_table.focus()
+        if not iid.startswith('calc-'):
+            return
+        self.run_task(
+            load_calculation, int(iid[len('calc-'):]),
+            title='Открытие расчёта', on_done=self.on_history_opened)
+
+    def on_history_opened(self, saved):
+        payload = saved['input'] or {}
+        double = payload.get('system_type') == 'double'
+        self.system_type.set('double' if double else 'mono')
+        self.toggle_material_fields()
+        self.material_cb_inner.set(payload.get('inner_material') or '')
+        if double:
+            self.material_cb_outer.set(payload.get('outer_material') or '')
+        for key, entry in self.entries.items():
+            entry.delete(0, tk.END)
+            entry.insert(0, str(payload.get(key, '')))
+        self.reveal_area_m2 = float(payload.get('reveal_area_m2') or 0)
+        self.use_layout.set(bool(payload.get('use_layout')))
+        self.zoned_fasteners.set(bool(payload.get('zoned_fasteners')))
+        address = payload.get('address') or {}
+        for entry, key in ((self.addr_line1, 'line1'),
+                           (self.addr_city, 'city'),
+                           (self.addr_region, 'region'),
+                           (self.addr_postal, 'postal_code'),
+                           (self.addr_note, 'note')):
+            entry.delete(0, tk.END)
+            entry.insert(0, address.get(key) or '')
+        if payload.get('manager') in self.manager_cb.cget('values'):
+            self.manager_cb.set(payload['manager'])
+
+        self.result = saved['result'] or {}
+        # Отчеты недоступны, пока калькулятор не пересобран
+        self.calc = None
+        if self.result:
+            self.display_result(self.result)
+        # «Сохранить как версию» добавит версию в открытую серию
+        self.current_calc_base = saved['base_number']
+        self.notebook.select(self.calc_frame)
+        self.status_var.set(f"Открыт расчёт {saved['number']}")
+        if self.result:
+            self.restore_calc(payload, self.result)
+
+    def restore_calc(self, payload, result):
+        """
+        Пересобирает в фоне калькулятор открытого расчета для отчетов.
+
+        В таблице остается сохраненный результат; калькулятор
+        принимается, только если за это время не выполнен
+        и не открыт другой расчет.
+        """
+        try:
+            validated_data = InputValidator().validate_inputs(
+                {key: entry.get().strip()
+                 for key, entry in self.entries.items()})
+        except ValidationError as ve:
+            self.status_var.set(
+                f'Отчет недоступен: {ve}. Выполните расчет заново.')
+            return
+        inner_material = payload.get('inner_material') or ''
+        double = payload.get('system_type') == 'double'
+        outer_material = (
+            payload.get('outer_material') or '') if double else inner_material
+        if not inner_material or not outer_material:
+            self.status_var.set(
+                'Отчет недоступен: не указан материал. '
+                'Выполните расчет заново.')
+            return
+
+        def done(outcome):
+            if self.result is result:
+                self.calc = outcome[0]
+
+        self.run_task(
+            run_calculation, outer_material,
+            inner_material if double else None, validated_data,
+            bool(payload.get('use_layout')), self.reveal_area_m2,
+            bool(payload.get('zoned_fasteners')),
+            title='Подготовка отчета', on_done=done
+        )
+
     def show_about(self):
         """Показывает информацию об авторе."""
         messagebox.showinfo(
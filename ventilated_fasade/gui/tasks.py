@@ -0,0 +1,197 @@
+import logging
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import (
+    CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor)
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TaskCancelled(Exception):
+    """Задача остановлена пользователем."""
+
+    pass
+
+
+class TaskContext:
+    """
+    Связь фоновой задачи с окном.
+
+    Передается в функцию задачи (аргумент context), если она
+    запущена с with_context=True.
+    """
+
+    def __init__(self, executor, handle):
+        self._executor = executor
+        self._handle = handle
+
+    @property
+    def cancelled(self) -> bool:
+        return self._handle.cancelled
+
+    def check(self):
+        """Прерывает задачу, если пользователь ее отменил."""
+        if self._handle.cancelled:
+            raise TaskCancelled()
+
+    def report(self, done: float, total: Optional[float] = None,
+               message: str = ''):
+        """Передает прогресс в главный поток и проверяет отмену."""
+        self._executor._post(self._handle, 'progress', (done, total, message))
+        self.check()
+
+
+class TaskHandle:
+    """Запущенная задача: отмена и состояние."""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.future: Optional[Future] = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def cancel(self):
+        """
+        Запрашивает отмену.
+
+        Еще не начатая задача снимается с очереди; выполняющаяся
+        потоковая задача остановится на ближайшем context.check().
+        """
+        self._cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class TaskExecutor:
+    """
+    Исполнитель фоновых задач для Tk-приложения.
+
+    Потоковый пул — для ввода-вывода (БД, файлы), процессный — для
+    тяжелых вычислений. Процессы пула запускаются через spawn: fork
+    многопоточного процесса с Tk может унаследовать захваченные
+    блокировки и зависнуть. Все обратные вызовы (on_done, on_error,
+    on_progress) выполняются в главном потоке через after().
+    """
+
+    def __init__(self, root, io_workers: int = 4,
+                 cpu_workers: Optional[int] = None, poll_ms: int = 50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._io_pool = ThreadPoolExecutor(
+            max_workers=io_workers, thread_name_prefix='gui-io')
+        self._cpu_workers = cpu_workers
+        self._cpu_pool: Optional[ProcessPoolExecutor] = None
+        self._events: queue.Queue = queue.Queue()
+        self._callbacks = {}
+        self._active = set()
+        self._polling = False
+
+    def _cpu(self) -> ProcessPoolExecutor:
+        if self._cpu_pool is None:
+            self._cpu_pool = ProcessPoolExecutor(
+                max_workers=self._cpu_workers,
+                mp_context=multiprocessing.get_context('spawn'))
+        return self._cpu_pool
+
+    def _post(self, handle, event, payload):
+        self._events.put((handle, event, payload))
+
+    def submit(self, fn: Callable, *args, name: str = '',
+               kind: str = 'io', with_context: bool = False,
+               on_done: Optional[Callable] = None,
+               on_error: Optional[Callable] = None,
+               on_progress: Optional[Callable] = None,
+               **kwargs) -> TaskHandle:
+        """
+        Запускает fn(*args, **kwargs) в пуле kind ('io' или 'cpu').
+
+        Для 'cpu' функция и аргументы должны сериализоваться pickle,
+        а прогресс и отмена во время выполнения недоступны.
+        """
+        if kind not in ('io', 'cpu'):
+            raise ValueError(f'Неизвестный тип задачи: {kind}')
+        handle = TaskHandle(name or getattr(fn, '__name__', 'task'), kind)
+        self._callbacks[handle] = (on_done, on_error, on_progress)
+        if with_context:
+            if kind == 'cpu':
+                raise ValueError('Контекст доступен только для io-задач')
+            kwargs['context'] = TaskContext(self, handle)
+
+        pool = self._io_pool if kind == 'io' else self._cpu()
+        handle.future = pool.submit(fn, *args, **kwargs)
+        self._active.add(handle)
+        handle.future.add_done_callback(
+            lambda future: self._post(handle, 'finished', future))
+        logger.debug(f'Задача «{handle.name}» запущена ({kind})')
+        self._schedule()
+        return handle
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._active)
+
+    def _schedule(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                handle, event, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            on_done, on_error, on_progress = self._callbacks.get(
+                handle, (None, None, None))
+            if event == 'progress':
+                if on_progress and not handle.done:
+                    on_progress(*payload)
+                continue
+            self._finish(handle, payload, on_done, on_error)
+        if self._active:
+            self._schedule()
+
+    def _finish(self, handle, future, on_done, on_error):
+        self._active.discard(handle)
+        self._callbacks.pop(handle, None)
+        try:
+            result = future.result()
+        except (CancelledError, TaskCancelled) as e:
+            logger.info(f'Задача «{handle.name}» отменена')
+            if on_error:
+                on_error(TaskCancelled() if isinstance(
+                    e, CancelledError) else e)
+            return
+        except Exception as e:
+            logger.error(
+                f'Ошибка в задаче «{handle.name}»: {e}', exc_info=e)
+            if on_error:
+                on_error(e)
+            return
+        if handle.cancelled:
+            logger.info(f'Задача «{handle.name}» отменена')
+            if on_error:
+                on_error(TaskCancelled())
+            return
+        logger.debug(f'Задача «{handle.name}» завершена')
+        if on_done:
+            on_done(result)
+
+    def shutdown(self):
+        """Отменяет ожидающие задачи и останавливает пулы."""
+        for handle in list(self._active):
+            handle.cancel()
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
+        if self._cpu_pool is not None:
+            self._cpu_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,210 @@
+from data.materials import GetInsulationMaterials
+from data.catalog import get_catalog
+import os
+import sys
+import logging
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+logger = logging.getLogger(__name__)
+
+OUTER_FASTENERS_PER_SHEET = 5
+INNER_FASTENERS_PER_SHEET = 1
+FASTENER_ANCHORAGE_MM = 45
+
+MaterialNames = Union[str, Sequence[Optional[str]], None]
+
+
+def round_like_python(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    Округление массива с тем же результатом, что и встроенный round().
+
+    np.round может отличаться от round() только около границы ".5",
+    поэтому такие элементы досчитываются поштучно.
+    """
+    rounded = np.round(values, ndigits)
+    scaled = values * (10 ** ndigits)
+    ambiguous = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(ambiguous):
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+
+def material_params(product) -> Dict[str, float]:
+    """Параметры материала, необходимые для векторного расчета."""
+    if product.size is None:
+        raise ValueError('Размер материала не задан')
+    if product.thickness is None:
+        raise ValueError('Толщина материала не задана')
+    if product.volume_m3 is None:
+        raise ValueError('Отсутствует объем материала')
+    return {
+        'sheet_area': (
+            (product.size.length_mm / 1000) * (product.size.width_mm / 1000)
+        ),
+        'volume_m3': product.volume_m3,
+        'thickness_mm': product.thickness.thickness_mm,
+    }
+
+
+def calculate_layer_arrays(
+    area_m2: np.ndarray,
+    building_height_m: np.ndarray,
+    count_corner: np.ndarray,
+    sheet_area: np.ndarray,
+    volume_m3: np.ndarray,
+    thickness_mm: np.ndarray,
+    count_per_sheet: int
+) -> Dict[str, np.ndarray]:
+    """
+    Векторный аналог calculate_layer с перевязкой углов и крепежом.
+
+    Порядок операций повторяет InsulationCalculator, чтобы результаты
+    совпадали с summary() до последнего бита.
+    """
+    corner_area = (building_height_m * count_corner) * (thickness_mm / 1000)
+    layer_area = area_m2 + corner_area
+    sheets = np.ceil(layer_area / sheet_area).astype(np.int64)
+    volume = round_like_python(sheets * volume_m3, 3)
+    return {
+        'sheets': sheets,
+        'volume': volume,
+        'fasteners': sheets * count_per_sheet,
+        'fastener_length': (
+            np.asarray(thickness_mm, dtype=np.int64) + FASTENER_ANCHORAGE_MM
+        ),
+    }
+
+
+class BatchInsulationCalculator:
+    """Пакетный расчет теплоизоляции для массива фасадов."""
+
+    def __init__(
+        self,
+        outer_materials: MaterialNames,
+        area_m2: Sequence[float],
+        building_height_m: Sequence[float],
+        count_corner: Sequence[int],
+        inner_materials: MaterialNames = None,
+        repo: Optional[GetInsulationMaterials] = None
+    ):
+        self.area_m2 = np.asarray(area_m2, dtype=np.float64)
+        self.building_height_m = np.asarray(
+            building_height_m, dtype=np.float64)
+        self.count_corner = np.asarray(count_corner, dtype=np.int64)
+        self.area_m2, self.building_height_m, self.count_corner = (
+            np.broadcast_arrays(
+                self.area_m2, self.building_height_m, self.count_corner)
+        )
+        self.size = self.area_m2.shape[0] if self.area_m2.ndim else 1
+        self.area_m2 = self.area_m2.reshape(self.size)
+        self.building_height_m = self.building_height_m.reshape(self.size)
+        self.count_corner = self.count_corner.reshape(self.size)
+
+        logger.info(f'Инициализация пакетного расчета: {self.size} фасадов')
+
+        self.outer_names = self._normalize_names(outer_materials)
+        self.inner_names = self._normalize_names(inner_materials)
+        if any(name is None for name in self.outer_names):
+            raise ValueError('Не указан материал внешнего слоя')
+        self.is_double_layer = np.array(
+            [name is not None for name in self.inner_names], dtype=bool)
+
+        repo = repo or get_catalog()
+        names = set(self.outer_names) | {
+            name for name in self.inner_names if name is not None}
+        self.params = {}
+        for name in names:
+            products = repo.get_materials_by_ru_name(name)
+            if not products:
+                logger.error(f'Материал "{name}" не найден')
+                raise ValueError(f'Материал "{name}" не найден')
+            self.params[name] = material_params(products[0])
+
+    def _normalize_names(self, names: MaterialNames) -> list:
+        """Приводит названия материалов к списку длиной в число фасадов."""
+        if names is None or isinstance(names, str):
+            return [names or None] * self.size
+        names = [name or None for name in names]
+        if len(names) != self.size:
+            raise ValueError(
+                f'Ожидалось {self.size} названий материалов, '
+                f'получено {len(names)}'
+            )
+        return names
+
+    def _gather(self, names: list, mask: np.ndarray) -> Dict[str, np.ndarray]:
+        """Раскладывает параметры материалов по строкам пакета."""
+        keys = [name if use else None for name, use in zip(names, mask)]
+        unique, inverse = np.unique(
+            np.array([k or '' for k in keys], dtype=object),
+            return_inverse=True
+        )
+        table = {
+            'sheet_area': np.ones(len(unique)),
+            'volume_m3': np.zeros(len(unique)),
+            'thickness_mm': np.zeros(len(unique), dtype=np.int64),
+        }
+        for i, name in enumerate(unique):
+            if name:
+                for key, value in self.params[name].items():
+                    table[key][i] = value
+        return {key: column[inverse] for key, column in table.items()}
+
+    def _layer(self, names: list, mask: np.ndarray,
+               count_per_sheet: int) -> Dict[str, np.ndarray]:
+        params = self._gather(names, mask)
+        layer = calculate_layer_arrays(
+            self.area_m2, self.building_height_m, self.count_corner,
+            params['sheet_area'], params['volume_m3'],
+            params['thickness_mm'], count_per_sheet
+        )
+        for column in layer.values():
+            column[~mask] = 0
+        return layer
+
+    def calculate(self) -> Dict[str, np.ndarray]:
+        """Расчет всех фасадов пакета, результат — словарь колонок."""
+        logger.info('Пакетный расчет по %d фасадам', self.size)
+        outer = self._layer(
+            self.outer_names, np.ones(self.size, dtype=bool),
+            OUTER_FASTENERS_PER_SHEET
+        )
+        inner = self._layer(
+            self.inner_names, self.is_double_layer,
+            INNER_FASTENERS_PER_SHEET
+        )
+        result = {'is_double_layer': self.is_double_layer}
+        for prefix, layer in (('outer', outer), ('inner', inner)):
+            for key, column in layer.items():
+                result[f'{prefix}_{key}'] = column
+        self.result = result
+        return result
+
+    def summary(self, index: int) -> dict:
+        """Отчет по одному фасаду в формате InsulationCalculator.summary()."""
+        result = getattr(self, 'result', None) or self.calculate()
+
+        def layer(prefix, material):
+            return {
+                'material': material,
+                'sheets': int(result[f'{prefix}_sheets'][index]),
+                'volume': float(result[f'{prefix}_volume'][index]),
+                'fasteners': {
+                    'count': int(result[f'{prefix}_fasteners'][index]),
+                    'length': int(result[f'{prefix}_fastener_length'][index])
+                }
+            }
+
+        is_double = bool(self.is_double_layer[index])
+        summary = {
+            'system_type': 'double' if is_double else 'single',
+            'outer_layer': layer('outer', self.outer_names[index]),
+        }
+        if is_double:
+            summary['inner_layer'] = layer('inner', self.inner_names[index])
+        return summary
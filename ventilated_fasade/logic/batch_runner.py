@@ -0,0 +1,256 @@
+from logic.batch_calculator import BatchInsulationCalculator
+from logic.validators import InputValidator, ValidationError
+from data.catalog import get_catalog
+from config import BATCH_CHUNK_SIZE, DB_URL
+import csv
+import json
+import os
+import sys
+import logging
+import multiprocessing
+from collections import deque
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = [
+    'id', 'status', 'error', 'system_type',
+    'outer_material', 'outer_sheets', 'outer_volume',
+    'outer_fasteners', 'outer_fastener_length',
+    'inner_material', 'inner_sheets', 'inner_volume',
+    'inner_fasteners', 'inner_fastener_length',
+]
+LAYER_COLUMNS = ['sheets', 'volume', 'fasteners', 'fastener_length']
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """Формат файла по явному указанию или расширению: csv или jsonl."""
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f'Не удалось определить формат файла: {path}')
+
+
+def read_rows(path: str, fmt: Optional[str] = None) -> Iterator[dict]:
+    """Построчное чтение фасадов из CSV или JSONL."""
+    fmt = detect_format(path, fmt)
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        if fmt == 'csv':
+            yield from csv.DictReader(file)
+            return
+        for line_no, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {'_error': f'Строка {line_no}: некорректный JSON ({e})'}
+                continue
+            if not isinstance(row, dict):
+                row = {'_error': f'Строка {line_no}: ожидался JSON-объект'}
+            yield row
+
+
+def chunked(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    """Разбивает поток строк на порции фиксированного размера."""
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _error_record(row_id, message: str) -> dict:
+    return {'id': row_id, 'status': 'error', 'error': message}
+
+
+def calculate_chunk(rows: List[dict], start: int = 0,
+                    db_url: str = DB_URL) -> List[dict]:
+    """
+    Валидирует и рассчитывает порцию фасадов одним векторным проходом.
+
+    Ошибочные строки не прерывают расчет, а попадают в результат
+    со статусом error. Порядок результатов совпадает с порядком строк.
+    """
+    catalog = get_catalog(db_url)
+    records: List[Optional[dict]] = [None] * len(rows)
+    valid, data, outer, inner = [], [], [], []
+
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            records[i] = _error_record(
+                start + i + 1, 'Строка должна быть объектом')
+            continue
+        row_id = row.get('id') or start + i + 1
+        if '_error' in row:
+            records[i] = _error_record(row_id, row['_error'])
+            continue
+        try:
+            validated = InputValidator.validate_inputs(row)
+        except ValidationError as e:
+            records[i] = _error_record(row_id, str(e))
+            continue
+        outer_name = (row.get('outer_material') or '').strip()
+        inner_name = (row.get('inner_material') or '').strip() or None
+        if not outer_name:
+            records[i] = _error_record(
+                row_id, 'Не указан материал внешнего слоя')
+            continue
+        unknown = [
+            name for name in (outer_name, inner_name)
+            if name and name not in catalog
+        ]
+        if unknown:
+            records[i] = _error_record(
+                row_id, f'Материал "{unknown[0]}" не найден')
+            continue
+        valid.append((i, row_id))
+        data.append(validated)
+        outer.append(outer_name)
+        inner.append(inner_name)
+
+    if valid:
+        batch = BatchInsulationCalculator(
+            outer_materials=outer,
+            inner_materials=inner,
+            area_m2=[d['area_m2'] for d in data],
+            building_height_m=[d['building_height_m'] for d in data],
+            count_corner=[d['count_corner'] for d in data],
+            repo=catalog
+        )
+        result = batch.calculate()
+        columns = {key: column.tolist() for key, column in result.items()}
+        for j, (i, row_id) in enumerate(valid):
+            is_double = columns['is_double_layer'][j]
+            record = {
+                'id': row_id,
+                'status': 'ok',
+                'error': None,
+                'system_type': 'double' if is_double else 'single',
+                'outer_material': outer[j],
+                'inner_material': inner[j] if is_double else None,
+            }
+            for prefix in ('outer', 'inner'):
+                for key in LAYER_COLUMNS:
+                    name = f'{prefix}_{key}'
+                    record[name] = (
+                        columns[name][j]
+                        if prefix == 'outer' or is_double else None
+                    )
+            records[i] = record
+    return records
+
+
+def _init_worker(db_url: str):
+    """Загружает каталог в процесс пула один раз при старте."""
+    get_catalog(db_url)
+
+
+def _calculate_task(args):
+    rows, start, db_url = args
+    return calculate_chunk(rows, start, db_url)
+
+
+class ResultWriter:
+    """Запись результатов в CSV или JSONL порциями."""
+
+    def __init__(self, path: str, fmt: Optional[str] = None):
+        self.fmt = detect_format(path, fmt)
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        if self.fmt == 'csv':
+            self._csv = csv.DictWriter(
+                self.file, fieldnames=RESULT_FIELDS, extrasaction='ignore')
+            self._csv.writeheader()
+
+    def write(self, records: List[dict]):
+        if self.fmt == 'csv':
+            self._csv.writerows(records)
+        else:
+            self.file.writelines(
+                json.dumps(record, ensure_ascii=False) + '\n'
+                for record in records
+            )
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    workers: Optional[int] = None,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    input_format: Optional[str] = None,
+    output_format: Optional[str] = None,
+    db_url: str = DB_URL,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, int]:
+    """
+    Потоковый пакетный расчет файла фасадов в пуле процессов.
+
+    В работе одновременно не больше двух порций на процесс, поэтому
+    память не зависит от размера входного файла. Результаты пишутся
+    в порядке входных строк по мере готовности порций.
+    Возвращает счетчики {'total', 'ok', 'errors'}.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = {'total': 0, 'ok': 0, 'errors': 0}
+    chunks = chunked(read_rows(input_path, input_format), chunk_size)
+    logger.info(
+        f'Пакетный расчет {input_path} -> {output_path}: '
+        f'{workers} процессов, порция {chunk_size}'
+    )
+
+    def collect(records, writer):
+        writer.write(records)
+        ok = sum(1 for record in records if record['status'] == 'ok')
+        stats['total'] += len(records)
+        stats['ok'] += ok
+        stats['errors'] += len(records) - ok
+        if progress:
+            progress(stats['total'], stats['errors'])
+
+    with ResultWriter(output_path, output_format) as writer:
+        if workers == 1:
+            start = 0
+            for rows in chunks:
+                collect(calculate_chunk(rows, start, db_url), writer)
+                start += len(rows)
+        else:
+            with multiprocessing.Pool(
+                workers, initializer=_init_worker, initargs=(db_url,)
+            ) as pool:
+                pending = deque()
+                start = 0
+                for rows in chunks:
+                    pending.append(
+                        pool.apply_async(
+                        _calculate_task, ((rows, start, db_url),)))
+                    start += len(rows)
+                    if len(pending) >= 2 * workers:
+                        collect(pending.popleft().get(), writer)
+                while pending:
+                    collect(pending.popleft().get(), writer)
+
+    logger.info(
+        f'Пакетный расчет завершен: {stats["total"]} строк, '
+        f'ошибок {stats["errors"]}'
+    )
+    return stats
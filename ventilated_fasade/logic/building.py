@@ -0,0 +1,248 @@
+from logic.calculator import InsulationCalculator
+from logic.layout import Wall
+from data.catalog import get_catalog
+import os
+import sys
+import logging
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+logger = logging.getLogger(__name__)
+
+LAYERS = ('outer_layer', 'inner_layer')
+
+
+@dataclass(frozen=True)
+class Opening:
+    """Проем (окно, дверь) в стене, м."""
+    width_m: float
+    height_m: float
+    count: int = 1
+
+    @property
+    def area_m2(self) -> float:
+        return self.width_m * self.height_m * self.count
+
+
+@dataclass(frozen=True)
+class Segment:
+    """
+    Участок фасада: стена своей ширины и высоты с проемами.
+
+    corners — число внешних углов здания, примыкающих к участку
+    (учитываются при перевязке углов).
+    """
+    name: str
+    width_m: float
+    height_m: float
+    openings: Tuple[Opening, ...] = ()
+    corners: int = 0
+
+    @property
+    def gross_area_m2(self) -> float:
+        return self.width_m * self.height_m
+
+    @property
+    def net_area_m2(self) -> float:
+        return max(
+            self.gross_area_m2 - sum(o.area_m2 for o in self.openings), 0.0)
+
+
+class Building:
+    """
+    Здание из участков фасада с инкрементальным пересчетом.
+
+    Результат каждого участка кэшируется вместе с входами, от которых
+    он зависит: параметрами самого участка и общими параметрами здания
+    (материалы, режим раскроя). Изменение участка помечает грязным
+    только его; изменение общих параметров — все участки. Итоги
+    по зданию поддерживаются как сумма: при пересчете участка его
+    старый вклад вычитается, новый прибавляется.
+
+    Раскрой (use_layout) ведется по каждому участку отдельно,
+    обрезки между участками не переносятся — иначе правка одной
+    стены меняла бы результат всех остальных.
+    """
+
+    def __init__(
+        self,
+        outer_material: str,
+        inner_material: Optional[str] = None,
+        segments: Iterable[Segment] = (),
+        use_layout: bool = False,
+        repo=None
+    ):
+        self.repo = repo or get_catalog()
+        self._check_materials(outer_material, inner_material)
+        self.outer_material = outer_material
+        self.inner_material = inner_material
+        self.use_layout = use_layout
+        self.segments: Dict[str, Segment] = {}
+        self._results: Dict[str, dict] = {}
+        self._inputs: Dict[str, tuple] = {}
+        self._dirty = set()
+        self._totals = self._empty_totals()
+        self.last_recalculated = 0
+        for segment in segments:
+            self.add_segment(segment)
+
+    # --- общие параметры ---
+
+    def _shared_inputs(self) -> tuple:
+        return (self.outer_material, self.inner_material, self.use_layout)
+
+    def _check_materials(self, *names):
+        for name in names:
+            if name is not None and not self.repo.get_materials_by_ru_name(
+                    name):
+                raise ValueError(f'Материал "{name}" не найден')
+
+    def set_materials(self, outer_material: str,
+                      inner_material: Optional[str] = None):
+        """Меняет материалы — пересчитываются все участки."""
+        self._check_materials(outer_material, inner_material)
+        self.outer_material = outer_material
+        self.inner_material = inner_material
+        self._dirty.update(self.segments)
+
+    def set_use_layout(self, use_layout: bool):
+        """Включает раскрой по стенам — пересчитываются все участки."""
+        self.use_layout = use_layout
+        self._dirty.update(self.segments)
+
+    # --- участки ---
+
+    def add_segment(self, segment: Segment):
+        if segment.name in self.segments:
+            raise ValueError(f'Участок "{segment.name}" уже существует')
+        self.segments[segment.name] = segment
+        self._dirty.add(segment.name)
+
+    def update_segment(self, name: str, **changes) -> Segment:
+        """Меняет поля участка; пересчитан будет только он."""
+        if changes.get('name', name) != name:
+            raise ValueError('Участок нельзя переименовать')
+        segment = replace(self._segment(name), **changes)
+        self.segments[name] = segment
+        self._dirty.add(name)
+        return segment
+
+    def remove_segment(self, name: str):
+        self._segment(name)
+        del self.segments[name]
+        self._dirty.discard(name)
+        self._inputs.pop(name, None)
+        old = self._results.pop(name, None)
+        if old is not None:
+            self._apply(old, -1)
+
+    def _segment(self, name: str) -> Segment:
+        try:
+            return self.segments[name]
+        except KeyError:
+            raise KeyError(f'Участок "{name}" не найден')
+
+    # --- расчет ---
+
+    def _calculate_segment(self, segment: Segment) -> dict:
+        calc = InsulationCalculator(
+            outer_material_ru_name=self.outer_material,
+            inner_material_ru_name=self.inner_material,
+            area_m2=segment.net_area_m2,
+            building_height_m=segment.height_m,
+            count_corner=segment.corners,
+            perimeter_m=segment.width_m,
+            repo=self.repo,
+            use_layout=self.use_layout,
+            walls=[Wall(segment.width_m, segment.height_m)],
+        )
+        return calc.summary()
+
+    def _empty_totals(self) -> dict:
+        return {
+            layer: {'sheets': 0, 'volume': 0.0, 'fasteners': 0}
+            for layer in LAYERS
+        }
+
+    def _apply(self, result: dict, sign: int):
+        for layer in LAYERS:
+            part = result.get(layer)
+            if not part:
+                continue
+            total = self._totals[layer]
+            total['sheets'] += sign * part['sheets']
+            total['volume'] += sign * part['volume']
+            total['fasteners'] += sign * part['fasteners']['count']
+
+    def recalculate(self) -> int:
+        """
+        Пересчитывает грязные участки, возвращает их число.
+
+        Участок, входы которого совпадают с закэшированными
+        (например, правка вернула прежнее значение), не считается.
+        """
+        shared = self._shared_inputs()
+        count = 0
+        for name in sorted(self._dirty):
+            segment = self.segments[name]
+            inputs = (segment, shared)
+            if self._inputs.get(name) == inputs:
+                continue
+            result = self._calculate_segment(segment)
+            old = self._results.get(name)
+            if old is not None:
+                self._apply(old, -1)
+            self._apply(result, 1)
+            self._results[name] = result
+            self._inputs[name] = inputs
+            count += 1
+        self._dirty.clear()
+        self.last_recalculated = count
+        if count:
+            logger.debug(
+                f'Пересчитано участков: {count} из {len(self.segments)}')
+        return count
+
+    def segment_result(self, name: str) -> dict:
+        """Отчет summary() по одному участку."""
+        self._segment(name)
+        self.recalculate()
+        return self._results[name]
+
+    def summary(self) -> dict:
+        """Итоги по зданию в формате InsulationCalculator.summary()."""
+        self.recalculate()
+        is_double = self.inner_material is not None
+        materials = {
+            'outer_layer': self.outer_material,
+            'inner_layer': self.inner_material,
+        }
+        # Длина крепежа зависит только от материала слоя
+        sample = next(iter(self._results.values()), {})
+
+        result = {
+            'system_type': 'double' if is_double else 'single',
+            'segments': len(self.segments),
+            'area_m2': round(
+                sum(s.net_area_m2 for s in self.segments.values()), 3),
+        }
+        for layer in LAYERS if is_double else LAYERS[:1]:
+            total = self._totals[layer]
+            result[layer] = {
+                'material': materials[layer],
+                'sheets': total['sheets'],
+                'volume': round(total['volume'], 3),
+                'fasteners': {
+                    'count': total['fasteners'],
+                    'length': (
+                        sample[layer]['fasteners']['length']
+                        if layer in sample else None),
+                },
+            }
+        return result
+
+    def segment_names(self) -> List[str]:
+        return list(self.segments)
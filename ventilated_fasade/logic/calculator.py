@@ -1,10 +1,16 @@
 from data.models import Product
 from data.materials import GetInsulationMaterials
+from data.catalog import get_catalog
+from logic.layout import (
+    LayoutResult, Wall, layout_walls, walls_for_area, walls_from_perimeter)
+from logic.fasteners import FastenerEngine, snap_length
+from logic.montecarlo import MonteCarloAnalysis
+from config import MONTE_CARLO_DRAWS
 import math
 import os
 import sys
 import logging
-from typing import Optional, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -23,7 +29,11 @@ class InsulationCalculator:
         building_height_m: float = 0,
         count_corner: int = 0,
         perimeter_m: int = 0,
-        repo: Optional[GetInsulationMaterials] = None
+        repo: Optional[GetInsulationMaterials] = None,
+        use_layout: bool = False,
+        walls: Optional[Sequence[Wall]] = None,
+        reveal_area_m2: float = 0,
+        zoned_fasteners: bool = False
     ):
         logger.info('Инициализация InsulationCalculator')
 
@@ -34,6 +44,11 @@ class InsulationCalculator:
         self.count_corner = count_corner
         self.perimeter_m = perimeter_m
         self.is_double_layer = inner_material_ru_name is not None
+        self.use_layout = use_layout
+        self.walls = list(walls) if walls is not None else None
+        # Откосы проемов утепляются одним слоем — внешним
+        self.reveal_area_m2 = reveal_area_m2
+        self.zoned_fasteners = zoned_fasteners
 
         logger.debug(
             f'Параметры: внешний материал="{outer_material_ru_name}", '
@@ -42,7 +57,7 @@ class InsulationCalculator:
             f'углы={count_corner}, периметр={perimeter_m}'
         )
 
-        repo = repo or GetInsulationMaterials()
+        repo = repo or get_catalog()
 
         self.outer_product = repo.get_materials_by_ru_name(
             outer_material_ru_name
@@ -88,9 +103,86 @@ class InsulationCalculator:
         total_volume = sheets_needed * product.volume_m3
         return sheets_needed, round(total_volume, 3)
 
-    def get_fastener_length(self, product: Product) -> int:
-        """Расчет длины крепежа."""
-        return product.thickness.thickness_mm + 45
+    def get_walls(self) -> List[Wall]:
+        """Стены фасада: заданные явно или по периметру и высоте."""
+        if self.walls is not None:
+            return self.walls
+        return walls_from_perimeter(
+            self.perimeter_m, self.building_height_m, self.count_corner
+        )
+
+    def get_layout_walls(self) -> List[Wall]:
+        """
+        Стены для раскладки: заданные явно или площадью area_m2.
+
+        Без явных стен раскладывается та же площадь нетто, что
+        и в расчете по площади, поэтому режимы сопоставимы; если
+        площадь не задана — стены по периметру и высоте.
+        """
+        if self.walls is not None or self.area_m2 <= 0:
+            return self.get_walls()
+        return walls_for_area(
+            self.area_m2, self.perimeter_m, self.building_height_m,
+            self.count_corner
+        )
+
+    def layout_layer(self, product: Product,
+                     reveal_area_m2: float = 0) -> LayoutResult:
+        """
+        Раскладка плит по стенам с учетом обрезков.
+
+        Откосы раскладываются как полоса той же площади
+        на высоту здания.
+        """
+        if product.size is None:
+            raise ValueError('Размер материала не задан')
+        if product.thickness is None:
+            raise ValueError('Толщина материала не задана')
+        # Перевязка углов — полосы шириной в толщину слоя на всю высоту
+        strips = [Wall(
+            product.thickness.thickness_mm / 1000, self.building_height_m
+        )] * self.count_corner
+        if reveal_area_m2 and self.building_height_m:
+            strips.append(Wall(
+                reveal_area_m2 / self.building_height_m,
+                self.building_height_m
+            ))
+        return layout_walls(
+            self.get_layout_walls() + strips,
+            product.size.length_mm, product.size.width_mm
+        )
+
+    def _layer_quantities(self, product: Product,
+                          reveal_area_m2: float = 0
+                          ) -> Tuple[int, float, dict]:
+        """Плиты, объем и (при раскладке) показатели отхода слоя."""
+        if not self.use_layout:
+            area = (self.area_m2 + reveal_area_m2
+                    + self.get_bandaging_the_corner(product))
+            sheets, volume = self.calculate_layer(product, area)
+            return sheets, volume, {}
+        if product.volume_m3 is None:
+            raise ValueError('Отсутствует объем материала')
+        layout = self.layout_layer(product, reveal_area_m2)
+        return layout.sheets, round(layout.sheets * product.volume_m3, 3), {
+            'layout': {
+                'waste_percent': layout.waste_percent,
+                'waste_m2': round(layout.waste_m2, 3),
+                'pieces_from_offcuts': layout.pieces_from_offcuts,
+                'offcut_area_m2': round(layout.offcut_area_m2, 3),
+            }
+        }
+
+    def get_fastener_length(self, product: Product, through_mm: int = 0,
+                            standard: bool = False) -> int:
+        """
+        Расчет длины крепежа.
+
+        through_mm — толщина слоев, которые дюбель проходит насквозь
+        под этим слоем; standard — округлить до типоразмера дюбеля.
+        """
+        length = product.thickness.thickness_mm + through_mm + 45
+        return snap_length(length) if standard else length
 
     def get_count_fasteners(
             self, sheets_needed: int, count_per_sheet: int = 1
@@ -98,15 +190,33 @@ class InsulationCalculator:
         """Расчет количества крепежа."""
         return sheets_needed * count_per_sheet
 
+    def get_zoned_fasteners(self, product: Product, sheets: int,
+                            layer: str) -> dict:
+        """
+        Крепеж по ветровым зонам у углов и кровли.
+
+        Наружные дюбели двухслойной системы проходят и внутренний
+        слой, длина округляется до типоразмера.
+        """
+        if product.size is None:
+            raise ValueError('Размер материала не задан')
+        engine = FastenerEngine(self.get_walls(), self.count_corner)
+        fasteners = engine.calculate(
+            sheets, product.size.length_mm, product.size.width_mm, layer)
+        through = (
+            self.inner_product.thickness.thickness_mm
+            if layer == 'outer' and self.is_double_layer else 0
+        )
+        fasteners['length'] = self.get_fastener_length(
+            product, through_mm=through, standard=True)
+        return fasteners
+
     def summary(self) -> dict:
         """Формирование отчета."""
         logger.info('Формирование отчета по расчету')
 
-        outer_area = self.area_m2 + self.get_bandaging_the_corner(
-            self.outer_product
-        )
-        outer_sheets, outer_volume = self.calculate_layer(
-            self.outer_product, outer_area
+        outer_sheets, outer_volume, outer_extra = self._layer_quantities(
+            self.outer_product, self.reveal_area_m2
         )
         outer_fasteners_count = self.get_count_fasteners(
             outer_sheets, count_per_sheet=5
@@ -114,6 +224,9 @@ class InsulationCalculator:
         outer_fasteners_length = self.get_fastener_length(
             self.outer_product
         )
+        if self.zoned_fasteners:
+            outer_extra['fasteners'] = self.get_zoned_fasteners(
+                self.outer_product, outer_sheets, 'outer')
 
         result = {
             'system_type': 'double' if self.is_double_layer else 'single',
@@ -124,23 +237,24 @@ class InsulationCalculator:
                 'fasteners': {
                     'count': outer_fasteners_count,
                     'length': outer_fasteners_length
-                }
+                },
+                **outer_extra
             }
         }
 
         if self.is_double_layer:
-            inner_area = self.area_m2 + self.get_bandaging_the_corner(
+            inner_sheets, inner_volume, inner_extra = self._layer_quantities(
                 self.inner_product
             )
-            inner_sheets, inner_volume = self.calculate_layer(
-                self.inner_product, inner_area
-            )
             inner_fasteners_count = self.get_count_fasteners(
                 inner_sheets, count_per_sheet=1
             )
             inner_fasteners_length = self.get_fastener_length(
                 self.inner_product
             )
+            if self.zoned_fasteners:
+                inner_extra['fasteners'] = self.get_zoned_fasteners(
+                    self.inner_product, inner_sheets, 'inner')
 
             result['inner_layer'] = {
                 'material': self.inner_material_ru_name,
@@ -149,7 +263,19 @@ class InsulationCalculator:
                 'fasteners': {
                     'count': inner_fasteners_count,
                     'length': inner_fasteners_length
-                }
+                },
+                **inner_extra
             }
 
         return result
+
+    def simulate(self, draws: int = MONTE_CARLO_DRAWS,
+                 seed: Optional[int] = None, **options) -> dict:
+        """
+        Вероятностный расчет P50/P90 плит и объема по слоям.
+
+        options передаются в MonteCarloAnalysis (tolerance, waste,
+        default_waste).
+        """
+        logger.info(f'Вероятностный расчет: {draws} розыгрышей')
+        return MonteCarloAnalysis(self, **options).run(draws, seed)
@@ -0,0 +1,162 @@
+from logic.layout import Wall
+import os
+import sys
+import bisect
+import logging
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+logger = logging.getLogger(__name__)
+
+ZONES = ('field', 'edge', 'corner')
+
+# Дюбелей на плиту по ветровым зонам: рядовая, краевая, угловая
+FASTENER_DENSITY = {
+    'outer': {'field': 5, 'edge': 7, 'corner': 9},
+    'inner': {'field': 1, 'edge': 1, 'corner': 2},
+}
+# Ширина краевой зоны — доля от min(ширина стены, 2 × высота),
+# но не меньше EDGE_ZONE_MIN_M
+EDGE_ZONE_RATIO = 0.1
+EDGE_ZONE_MIN_M = 1.0
+# Типоразмеры тарельчатых дюбелей, мм
+STANDARD_LENGTHS_MM = (
+    90, 110, 120, 140, 160, 180, 200, 220, 260, 300, 340, 380)
+
+
+def snap_length(length_mm: int) -> int:
+    """Ближайший типоразмер дюбеля не короче требуемого."""
+    i = bisect.bisect_left(STANDARD_LENGTHS_MM, length_mm)
+    return STANDARD_LENGTHS_MM[i] if i < len(STANDARD_LENGTHS_MM) \
+        else int(length_mm)
+
+
+def corner_ends(walls_count: int, count_corner: int) -> np.ndarray:
+    """
+    Сколько концов каждой стены примыкает к внешнему углу (0–2).
+
+    Каждый угол — два конца соседних стен; для одной развернутой
+    стены углов у концов не больше двух.
+    """
+    if walls_count <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if walls_count == 1:
+        return np.array([min(count_corner, 2)], dtype=np.int64)
+    ends = np.zeros(walls_count, dtype=np.int64)
+    total = min(2 * count_corner, 2 * walls_count)
+    ends += total // walls_count
+    ends[:total % walls_count] += 1
+    return ends
+
+
+def edge_zone_width(width_m: np.ndarray, height_m: np.ndarray) -> np.ndarray:
+    """Ширина краевой зоны для каждой стены, м."""
+    zone = np.maximum(
+        EDGE_ZONE_RATIO * np.minimum(width_m, 2 * height_m), EDGE_ZONE_MIN_M)
+    return np.minimum(zone, np.minimum(width_m / 2, height_m))
+
+
+def zone_sheet_counts(width_m: np.ndarray, height_m: np.ndarray,
+                      ends: np.ndarray, length_mm: int,
+                      sheet_width_mm: int) -> Dict[str, int]:
+    """
+    Число плит раскладки в каждой зоне по всем стенам сразу.
+
+    Плиты кладутся рядами длинной стороной вдоль стены. Столбец плит
+    попадает в угловую полосу, если заходит в нее хотя бы частью,
+    ряд — в полосу у кровли аналогично. Считается по столбцам
+    и рядам каждой стены, без перебора отдельных плит.
+    """
+    width_m = np.asarray(width_m, dtype=np.float64)
+    height_m = np.asarray(height_m, dtype=np.float64)
+    length = length_mm / 1000
+    sheet_width = sheet_width_mm / 1000
+    zone = edge_zone_width(width_m, height_m)
+
+    cols = np.ceil(width_m / length - 1e-9).astype(np.int64)
+    rows = np.ceil(height_m / sheet_width - 1e-9).astype(np.int64)
+    left = np.where(ends >= 1, np.ceil(zone / length - 1e-9), 0)
+    right = np.where(
+        ends >= 2, cols - np.floor((width_m - zone) / length + 1e-9), 0)
+    edge_cols = np.minimum(cols, (left + right).astype(np.int64))
+    roof_rows = np.minimum(
+        rows,
+        (rows - np.floor((height_m - zone) / sheet_width + 1e-9)
+         ).astype(np.int64)
+    )
+    corner = edge_cols * roof_rows
+    edge = edge_cols * (rows - roof_rows) + (cols - edge_cols) * roof_rows
+    field = (cols - edge_cols) * (rows - roof_rows)
+    return {
+        'field': int(field.sum()),
+        'edge': int(edge.sum()),
+        'corner': int(corner.sum()),
+    }
+
+
+def distribute(total: int, weights: Sequence[float]) -> np.ndarray:
+    """Делит целое total пропорционально весам (наибольшие остатки)."""
+    weights = np.asarray(weights, dtype=np.float64)
+    if total <= 0 or weights.sum() <= 0:
+        return np.zeros(len(weights), dtype=np.int64)
+    exact = total * weights / weights.sum()
+    result = np.floor(exact).astype(np.int64)
+    rest = total - int(result.sum())
+    if rest:
+        result[np.argsort(result - exact, kind='stable')[:rest]] += 1
+    return result
+
+
+class FastenerEngine:
+    """
+    Расчет крепежа по ветровым зонам фасада.
+
+    Доли плит в рядовой, краевой (у углов и кровли) и угловой
+    зонах берутся из раскладки по стенам, затем число плит слоя
+    распределяется по зонам, и для каждой зоны применяется своя
+    плотность дюбелей на плиту.
+    """
+
+    def __init__(self, walls: Sequence[Wall], count_corner: int = 0,
+                 density: Optional[Dict[str, Dict[str, int]]] = None):
+        self.width_m = np.array([w.width_m for w in walls], dtype=np.float64)
+        self.height_m = np.array(
+            [w.height_m for w in walls], dtype=np.float64)
+        self.ends = corner_ends(len(walls), count_corner)
+        self.density = density or FASTENER_DENSITY
+
+    def zone_shares(self, length_mm: int,
+                    sheet_width_mm: int) -> Dict[str, float]:
+        """Доли плит по зонам для плиты указанного размера."""
+        counts = zone_sheet_counts(
+            self.width_m, self.height_m, self.ends, length_mm, sheet_width_mm)
+        total = sum(counts.values())
+        if not total:
+            return {'field': 1.0, 'edge': 0.0, 'corner': 0.0}
+        return {zone: counts[zone] / total for zone in ZONES}
+
+    def calculate(self, sheets: int, length_mm: int, sheet_width_mm: int,
+                  layer: str = 'outer') -> dict:
+        """
+        Крепеж слоя по зонам: {'count', 'zones': {зона: {...}}}.
+
+        sheets — итоговое число плит слоя из расчета калькулятора.
+        """
+        shares = self.zone_shares(length_mm, sheet_width_mm)
+        per_zone = distribute(sheets, [shares[z] for z in ZONES])
+        density = self.density[layer]
+        zones = {}
+        for zone, zone_sheets in zip(ZONES, per_zone.tolist()):
+            zones[zone] = {
+                'sheets': zone_sheets,
+                'per_sheet': density[zone],
+                'count': zone_sheets * density[zone],
+            }
+        return {
+            'count': sum(z['count'] for z in zones.values()),
+            'zones': zones,
+        }
@@ -0,0 +1,226 @@
+import csv
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Глубина откоса по умолчанию, м
+DEFAULT_REVEAL_DEPTH_M = 0.15
+
+Point = Tuple[float, float]
+
+
+def _ragged(polygons: Sequence[Sequence[Point]]):
+    """Многоугольники в плоские массивы x, y и смещения начала каждого."""
+    sizes = np.fromiter((len(p) for p in polygons), dtype=np.int64,
+                        count=len(polygons))
+    if (sizes < 3).any():
+        raise ValueError('Многоугольник должен иметь не менее трех вершин')
+    offsets = np.zeros(len(polygons), dtype=np.int64)
+    np.cumsum(sizes[:-1], out=offsets[1:])
+    coords = np.array(
+        [point for polygon in polygons for point in polygon],
+        dtype=np.float64
+    ).reshape(-1, 2)
+    return coords[:, 0], coords[:, 1], offsets, sizes
+
+
+def _next_vertex(offsets: np.ndarray, sizes: np.ndarray,
+                 total: int) -> np.ndarray:
+    """Индекс следующей вершины с замыканием каждого контура."""
+    nxt = np.arange(1, total + 1)
+    nxt[offsets + sizes - 1] = offsets
+    return nxt
+
+
+def polygon_areas(x: np.ndarray, y: np.ndarray, offsets: np.ndarray,
+                  sizes: np.ndarray) -> np.ndarray:
+    """
+    Площади многих многоугольников формулой шнурования за один проход.
+
+    Вершины всех контуров лежат подряд в x, y; offsets — индекс
+    первой вершины каждого контура, sizes — число вершин.
+    """
+    nxt = _next_vertex(offsets, sizes, len(x))
+    cross = x * y[nxt] - x[nxt] * y
+    return np.abs(np.add.reduceat(cross, offsets)) / 2
+
+
+def polygon_perimeters(x: np.ndarray, y: np.ndarray, offsets: np.ndarray,
+                       sizes: np.ndarray) -> np.ndarray:
+    """Периметры многих многоугольников за один проход."""
+    nxt = _next_vertex(offsets, sizes, len(x))
+    edges = np.hypot(x[nxt] - x, y[nxt] - y)
+    return np.add.reduceat(edges, offsets)
+
+
+@dataclass
+class OpeningSet:
+    """
+    Проемы фасада в колоночном виде.
+
+    Прямоугольные и многоугольные проемы хранятся раздельно,
+    у каждого — количество и глубина откоса.
+    """
+    rect_width_m: np.ndarray
+    rect_height_m: np.ndarray
+    rect_count: np.ndarray
+    rect_reveal_m: np.ndarray
+    polygons: List[Sequence[Point]]
+    polygon_count: np.ndarray
+    polygon_reveal_m: np.ndarray
+
+    @classmethod
+    def empty(cls) -> 'OpeningSet':
+        zeros = np.zeros(0)
+        return cls(zeros, zeros, zeros, zeros, [], zeros, zeros)
+
+    def __len__(self) -> int:
+        return int(self.rect_count.sum() + self.polygon_count.sum())
+
+    def areas(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Площади одного проема каждого вида (прямоуг., многоуг.)."""
+        rect = self.rect_width_m * self.rect_height_m
+        if not self.polygons:
+            return rect, np.zeros(0)
+        return rect, polygon_areas(*_ragged(self.polygons))
+
+    def perimeters(self) -> Tuple[np.ndarray, np.ndarray]:
+        rect = 2 * (self.rect_width_m + self.rect_height_m)
+        if not self.polygons:
+            return rect, np.zeros(0)
+        return rect, polygon_perimeters(*_ragged(self.polygons))
+
+
+@dataclass(frozen=True)
+class NetArea:
+    """Итог расчета геометрии фасада, м²."""
+    gross_area_m2: float
+    openings_area_m2: float
+    reveal_area_m2: float
+    openings: int
+
+    @property
+    def net_area_m2(self) -> float:
+        return max(self.gross_area_m2 - self.openings_area_m2, 0.0)
+
+
+class FacadeGeometry:
+    """Фасады-многоугольники и проемы в них."""
+
+    def __init__(self, facades: Sequence[Sequence[Point]],
+                 openings: Optional[OpeningSet] = None):
+        if not facades:
+            raise ValueError('Не задан ни один фасад')
+        self.facades = list(facades)
+        self.openings = openings or OpeningSet.empty()
+
+    def calculate(self) -> NetArea:
+        """
+        Площадь нетто и площадь утепления откосов
+        (периметр проема × глубина откоса).
+        """
+        gross = polygon_areas(*_ragged(self.facades)).sum()
+        o = self.openings
+        rect_area, poly_area = o.areas()
+        rect_perim, poly_perim = o.perimeters()
+        openings_area = (
+            (rect_area * o.rect_count).sum()
+            + (poly_area * o.polygon_count).sum()
+        )
+        reveal_area = (
+            (rect_perim * o.rect_reveal_m * o.rect_count).sum()
+            + (poly_perim * o.polygon_reveal_m * o.polygon_count).sum()
+        )
+        if openings_area > gross:
+            raise ValueError('Площадь проемов больше площади фасадов')
+        return NetArea(
+            gross_area_m2=round(float(gross), 3),
+            openings_area_m2=round(float(openings_area), 3),
+            reveal_area_m2=round(float(reveal_area), 3),
+            openings=len(o),
+        )
+
+
+def parse_points(text: str) -> List[Point]:
+    """Вершины из строки вида "0 0; 3 0; 3 2; 0 2"."""
+    points = []
+    for pair in text.split(';'):
+        pair = pair.strip()
+        if not pair:
+            continue
+        try:
+            x, y = pair.replace(',', ' ').split()
+            points.append((float(x), float(y)))
+        except ValueError:
+            raise ValueError(f'Некорректная вершина "{pair}"')
+    return points
+
+
+def load_geometry_csv(path: str,
+                      reveal_depth_m: float = DEFAULT_REVEAL_DEPTH_M
+                      ) -> FacadeGeometry:
+    """
+    Загрузка фасадов и проемов из CSV.
+
+    Колонки: type (facade | opening), width_m, height_m — для
+    прямоугольника, либо points ("x y; x y; ...") — для многоугольника,
+    count (по умолчанию 1), reveal_depth_m (по умолчанию reveal_depth_m).
+    """
+    facades = []
+    rects = {'w': [], 'h': [], 'n': [], 'd': []}
+    polys, poly_n, poly_d = [], [], []
+
+    with open(path, 'r', encoding='utf-8-sig', newline='') as file:
+        for line_no, row in enumerate(csv.DictReader(file), 2):
+            try:
+                kind = (row.get('type') or '').strip().lower()
+                points = (row.get('points') or '').strip()
+                if points:
+                    shape = parse_points(points)
+                else:
+                    w = float(row['width_m'])
+                    h = float(row['height_m'])
+                    if w <= 0 or h <= 0:
+                        raise ValueError('размеры должны быть больше нуля')
+                    shape = None
+                count = int(row.get('count') or 1)
+                depth = float(row.get('reveal_depth_m') or reveal_depth_m)
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f'{path}, строка {line_no}: {e}')
+
+            if kind == 'facade':
+                rect = [(0, 0), (w, 0), (w, h), (0, h)] if shape is None \
+                    else shape
+                facades.extend([rect] * count)
+            elif kind == 'opening':
+                if shape is None:
+                    rects['w'].append(w)
+                    rects['h'].append(h)
+                    rects['n'].append(count)
+                    rects['d'].append(depth)
+                else:
+                    polys.append(shape)
+                    poly_n.append(count)
+                    poly_d.append(depth)
+            else:
+                raise ValueError(
+                    f'{path}, строка {line_no}: неизвестный тип "{kind}"')
+
+    openings = OpeningSet(
+        rect_width_m=np.array(rects['w'], dtype=np.float64),
+        rect_height_m=np.array(rects['h'], dtype=np.float64),
+        rect_count=np.array(rects['n'], dtype=np.int64),
+        rect_reveal_m=np.array(rects['d'], dtype=np.float64),
+        polygons=polys,
+        polygon_count=np.array(poly_n, dtype=np.int64),
+        polygon_reveal_m=np.array(poly_d, dtype=np.float64),
+    )
+    logger.info(
+        f'Геометрия загружена из {path}: фасадов {len(facades)}, '
+        f'проемов {len(openings)}'
+    )
+    return FacadeGeometry(facades, openings)
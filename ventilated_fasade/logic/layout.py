@@ -0,0 +1,258 @@
+import bisect
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Обрезки с меньшей стороной короче этого размера идут в отход
+MIN_OFFCUT_MM = 100
+
+
+@dataclass(frozen=True)
+class Wall:
+    """Прямоугольный участок стены, м."""
+    width_m: float
+    height_m: float
+
+    @property
+    def area_m2(self) -> float:
+        return self.width_m * self.height_m
+
+
+@dataclass(frozen=True)
+class LayoutResult:
+    """Итог раскладки слоя по стенам."""
+    sheets: int
+    pieces: int
+    pieces_from_offcuts: int
+    covered_area_m2: float
+    purchased_area_m2: float
+    offcut_area_m2: float
+
+    @property
+    def waste_m2(self) -> float:
+        return self.purchased_area_m2 - self.covered_area_m2
+
+    @property
+    def waste_percent(self) -> float:
+        if not self.purchased_area_m2:
+            return 0.0
+        return round(self.waste_m2 / self.purchased_area_m2 * 100, 2)
+
+
+def walls_from_perimeter(perimeter_m: float, building_height_m: float,
+                         count_corner: int = 0) -> List[Wall]:
+    """
+    Стены здания по периметру и высоте.
+
+    При трех и более внешних углах периметр делится на count_corner
+    равных стен, иначе фасад считается одной развернутой стеной.
+    """
+    if perimeter_m <= 0 or building_height_m <= 0:
+        raise ValueError('Периметр и высота здания должны быть больше нуля')
+    count = count_corner if count_corner >= 3 else 1
+    return [Wall(perimeter_m / count, building_height_m)] * count
+
+
+def walls_for_area(area_m2: float, perimeter_m: float,
+                   building_height_m: float,
+                   count_corner: int = 0) -> List[Wall]:
+    """
+    Стены фасада площадью area_m2 (нетто, без проемов).
+
+    Ширины стен — как у walls_from_perimeter, а высота подобрана так,
+    чтобы их общая площадь была равна area_m2: раскладка покрывает
+    ту же площадь, что и расчет по площади. Проемы при этом учтены
+    только площадью, без их расположения на стене.
+    """
+    walls = walls_from_perimeter(perimeter_m, building_height_m,
+                                 count_corner)
+    if area_m2 <= 0:
+        raise ValueError('Площадь фасада должна быть больше нуля')
+    height_m = area_m2 / perimeter_m
+    return [Wall(wall.width_m, height_m) for wall in walls]
+
+
+class OffcutPool:
+    """
+    Склад обрезков с индексом по размерам.
+
+    Обрезки хранятся как (короткая, длинная сторона) → количество.
+    Короткие стороны отсортированы, для каждой — отсортированный
+    список длинных, поэтому подходящий обрезок ищется бинарным
+    поиском, а не перебором всего склада.
+    """
+
+    def __init__(self, min_side_mm: int = MIN_OFFCUT_MM):
+        self.min_side_mm = min_side_mm
+        self._shorts: List[int] = []
+        self._longs: Dict[int, List[int]] = {}
+        self._counts: Counter = Counter()
+
+    def __len__(self) -> int:
+        return sum(self._counts.values())
+
+    @property
+    def area_mm2(self) -> int:
+        return sum(s * l * n for (s, l), n in self._counts.items())
+
+    def add(self, a: int, b: int, count: int = 1):
+        """Кладет обрезки на склад, если они не меньше минимального."""
+        short, long = (a, b) if a <= b else (b, a)
+        if short < self.min_side_mm:
+            return
+        key = (short, long)
+        if not self._counts[key]:
+            longs = self._longs.get(short)
+            if longs is None:
+                bisect.insort(self._shorts, short)
+                longs = self._longs[short] = []
+            bisect.insort(longs, long)
+        self._counts[key] += count
+
+    def take(self, a: int, b: int) -> Optional[Tuple[int, int]]:
+        """
+        Забирает наименьший по короткой стороне обрезок,
+        в который помещается деталь a×b (с поворотом).
+        """
+        short, long = (a, b) if a <= b else (b, a)
+        shorts = self._shorts
+        for i in range(bisect.bisect_left(shorts, short), len(shorts)):
+            s = shorts[i]
+            longs = self._longs[s]
+            if longs[-1] < long:
+                continue
+            j = bisect.bisect_left(longs, long)
+            if j < len(longs):
+                key = (s, longs[j])
+                self._counts[key] -= 1
+                if not self._counts[key]:
+                    del self._counts[key]
+                    longs.pop(j)
+                    if not longs:
+                        del self._longs[s]
+                        self._shorts.remove(s)
+                return key
+        return None
+
+
+def _wall_pieces(width_mm: int, height_mm: int, length_mm: int,
+                 sheet_width_mm: int) -> Tuple[int, Counter]:
+    """
+    Разбивает стену на целые плиты и подрезанные детали.
+
+    Плиты кладутся рядами длинной стороной вдоль стены.
+    Возвращает (число целых плит, Counter{(a, b): количество}).
+    """
+    full_x, rest_x = divmod(width_mm, length_mm)
+    full_y, rest_y = divmod(height_mm, sheet_width_mm)
+    pieces = Counter()
+    if rest_x and full_y:
+        pieces[(rest_x, sheet_width_mm)] += full_y
+    if rest_y and full_x:
+        pieces[(length_mm, rest_y)] += full_x
+    if rest_x and rest_y:
+        pieces[(rest_x, rest_y)] += 1
+    return full_x * full_y, pieces
+
+
+def _cut(sheet: Tuple[int, int], piece: Tuple[int, int]):
+    """
+    Гильотинный рез детали из листа, возвращает два остатка.
+
+    Из двух вариантов реза выбирается тот, что оставляет
+    больший обрезок.
+    """
+    a, b = piece
+    big_a, big_b = sheet
+    if a > big_a or b > big_b:
+        a, b = b, a
+    # Сначала рез поперек листа (по длине), либо вдоль (по ширине)
+    if (big_a - a) * big_b >= big_a * (big_b - b):
+        return (big_a - a, big_b), (a, big_b - b)
+    return (big_a, big_b - b), (big_a - a, b)
+
+
+def _fits(piece: Tuple[int, int], rest: Tuple[int, int]) -> bool:
+    a, b = sorted(piece)
+    x, y = sorted(rest)
+    return a <= x and b <= y
+
+
+def layout_walls(
+    walls: Iterable[Wall],
+    length_mm: int,
+    width_mm: int,
+    corner_overlap_m: float = 0.0,
+    pool: Optional[OffcutPool] = None
+) -> LayoutResult:
+    """
+    Раскладка плит length_mm×width_mm по стенам с повторным
+    использованием обрезков.
+
+    Каждая стена удлиняется на corner_overlap_m (перевязка угла).
+    Подрезанные детали всех стен собираются вместе и режутся
+    от больших к меньшим: сначала ищется подходящий обрезок
+    на складе, и только если его нет — берется новая плита.
+    """
+    if length_mm <= 0 or width_mm <= 0:
+        raise ValueError('Размер плиты должен быть больше нуля')
+    pool = pool if pool is not None else OffcutPool()
+    full_sheets = 0
+    covered_mm2 = 0
+    pieces = Counter()
+    for wall in walls:
+        wall_w = round((wall.width_m + corner_overlap_m) * 1000)
+        wall_h = round(wall.height_m * 1000)
+        if wall_w <= 0 or wall_h <= 0:
+            continue
+        covered_mm2 += wall_w * wall_h
+        full, wall_pieces = _wall_pieces(wall_w, wall_h, length_mm, width_mm)
+        full_sheets += full
+        pieces.update(wall_pieces)
+
+    sheets = full_sheets
+    from_offcuts = 0
+    total_pieces = full_sheets
+    sheet = (length_mm, width_mm)
+    for piece in sorted(pieces, key=lambda p: p[0] * p[1], reverse=True):
+        left = pieces[piece]
+        total_pieces += left
+        fresh = _cut(sheet, piece)
+        # Если остатки новой плиты не вмещают такую же деталь, а на
+        # складе подходящих нет — оставшиеся детали режутся из новых
+        # плит разом
+        fresh_reusable = any(
+            min(r) >= pool.min_side_mm and _fits(piece, r) for r in fresh)
+        while left:
+            offcut = pool.take(*piece)
+            if offcut is not None:
+                from_offcuts += 1
+                for rest in _cut(offcut, piece):
+                    if rest[0] > 0 and rest[1] > 0:
+                        pool.add(*rest)
+                left -= 1
+                continue
+            count = 1 if fresh_reusable else left
+            sheets += count
+            for rest in fresh:
+                if rest[0] > 0 and rest[1] > 0:
+                    pool.add(*rest, count=count)
+            left -= count
+
+    result = LayoutResult(
+        sheets=sheets,
+        pieces=total_pieces,
+        pieces_from_offcuts=from_offcuts,
+        covered_area_m2=covered_mm2 / 1e6,
+        purchased_area_m2=sheets * length_mm * width_mm / 1e6,
+        offcut_area_m2=pool.area_mm2 / 1e6,
+    )
+    logger.debug(
+        f'Раскладка {length_mm}x{width_mm}: плит {result.sheets}, '
+        f'деталей из обрезков {from_offcuts}, '
+        f'отход {result.waste_percent}%'
+    )
+    return result
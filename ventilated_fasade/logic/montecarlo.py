@@ -0,0 +1,147 @@
+from config import MONTE_CARLO_DRAWS
+import os
+import sys
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90)
+
+
+@dataclass(frozen=True)
+class Tolerance:
+    """
+    Погрешности обмера — относительные стандартные отклонения.
+
+    overlap — разброс фактического перехлеста углов относительно
+    расчетного (высота × углы × толщина).
+    """
+    area: float = 0.02
+    height: float = 0.01
+    overlap: float = 0.10
+
+
+@dataclass(frozen=True)
+class WasteDistribution:
+    """Доля отхода при резке — треугольное распределение."""
+    low: float = 0.02
+    mode: float = 0.05
+    high: float = 0.10
+
+    def __post_init__(self):
+        if not 0 <= self.low <= self.mode <= self.high < 1:
+            raise ValueError(
+                'Доли отхода должны быть 0 <= low <= mode <= high < 1')
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        if self.low == self.high:
+            return np.full(size, self.low)
+        return rng.triangular(self.low, self.mode, self.high, size)
+
+
+def _normal_factor(rng: np.random.Generator, sigma: float,
+                   size: int) -> np.ndarray:
+    """Множитель 1 + N(0, sigma), не меньше нуля."""
+    if not sigma:
+        return np.ones(size)
+    return np.maximum(rng.normal(1.0, sigma, size), 0.0)
+
+
+def _stats(values: np.ndarray, ndigits: Optional[int] = None) -> dict:
+    """Среднее и перцентили; перцентиль — значение одной из выборок."""
+    result = {'mean': float(values.mean())}
+    for q in PERCENTILES:
+        result[f'p{q}'] = np.percentile(values, q, method='higher').item()
+    if ndigits is not None:
+        result = {key: round(value, ndigits) for key, value in result.items()}
+    else:
+        result['mean'] = round(result['mean'], 1)
+    return result
+
+
+class MonteCarloAnalysis:
+    """
+    Вероятностный расчет потребности в плитах для страхового запаса.
+
+    Розыгрыш повторяет InsulationCalculator.calculate_layer:
+    площадь слоя — площадь фасада (с откосами для внешнего слоя)
+    плюс перехлест углов get_bandaging_the_corner, к ней добавляется
+    отход при резке, плиты округляются вверх. Площадь и высота
+    разыгрываются один раз на здание и общие для обоих слоев,
+    перехлест и отход — для каждого слоя свои. Все розыгрыши
+    считаются массивами.
+    """
+
+    def __init__(
+        self,
+        calculator,
+        tolerance: Optional[Tolerance] = None,
+        waste: Optional[Dict[str, WasteDistribution]] = None,
+        default_waste: Optional[WasteDistribution] = None
+    ):
+        self.calculator = calculator
+        self.tolerance = tolerance or Tolerance()
+        self.waste = waste or {}
+        self.default_waste = default_waste or WasteDistribution()
+
+    def _waste_for(self, name: str) -> WasteDistribution:
+        return self.waste.get(name, self.default_waste)
+
+    def _layer(self, rng, product, name: str, area: np.ndarray,
+               height: np.ndarray, draws: int) -> dict:
+        calc = self.calculator
+        if product.thickness is None:
+            raise ValueError('Толщина материала не задана')
+        if product.volume_m3 is None:
+            raise ValueError('Отсутствует объем материала')
+        overlap = (
+            height * calc.count_corner
+            * (product.thickness.thickness_mm / 1000)
+            * _normal_factor(rng, self.tolerance.overlap, draws)
+        )
+        waste = self._waste_for(name).sample(rng, draws)
+        layer_area = (area + overlap) * (1 + waste)
+        sheets = np.ceil(layer_area / calc.get_sheet_area(product))
+        sheets = sheets.astype(np.int64)
+        volume = sheets * product.volume_m3
+        return {
+            'material': name,
+            'sheets': _stats(sheets),
+            'volume': _stats(volume, 3),
+        }
+
+    def run(self, draws: int = MONTE_CARLO_DRAWS,
+            seed: Optional[int] = None) -> dict:
+        """
+        P50/P90 плит и объема по слоям.
+
+        При одинаковом seed результат воспроизводится.
+        """
+        if draws <= 0:
+            raise ValueError('Число розыгрышей должно быть больше нуля')
+        calc = self.calculator
+        rng = np.random.default_rng(seed)
+        area = calc.area_m2 * _normal_factor(rng, self.tolerance.area, draws)
+        height = calc.building_height_m * _normal_factor(
+            rng, self.tolerance.height, draws)
+
+        result = {
+            'draws': draws,
+            'seed': seed,
+            'outer_layer': self._layer(
+                rng, calc.outer_product, calc.outer_material_ru_name,
+                area + calc.reveal_area_m2, height, draws),
+        }
+        if calc.is_double_layer:
+            result['inner_layer'] = self._layer(
+                rng, calc.inner_product, calc.inner_material_ru_name,
+                area, height, draws)
+        logger.debug(f'Вероятностный расчет: {draws} розыгрышей, seed={seed}')
+        return result
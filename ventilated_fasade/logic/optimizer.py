@@ -0,0 +1,258 @@
+from logic.batch_calculator import (
+    INNER_FASTENERS_PER_SHEET, OUTER_FASTENERS_PER_SHEET,
+    calculate_layer_arrays)
+from data.catalog import MaterialCatalog, get_catalog
+import os
+import sys
+import heapq
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OptimizerWeights:
+    """
+    Веса критериев подбора.
+
+    Объем, плиты и крепеж берутся относительно лучшего одиночного
+    материала для фасада, отклонение толщины — относительно целевой
+    толщины, поэтому веса сопоставимы между собой.
+    """
+    volume: float = 1.0
+    sheets: float = 0.0
+    fasteners: float = 0.0
+    thickness: float = 1.0
+
+
+@dataclass(frozen=True)
+class Candidate:
+    """Вариант системы утепления с итоговыми показателями."""
+    score: float
+    outer_material: str
+    inner_material: Optional[str]
+    volume: float
+    sheets: int
+    fasteners: int
+    thickness_mm: int
+
+    @property
+    def system_type(self) -> str:
+        return 'double' if self.inner_material else 'single'
+
+
+class MaterialOptimizer:
+    """
+    Подбор материалов для одно- и двухслойной системы.
+
+    Показатели слоя (плиты, объем, крепеж) для всех продуктов
+    считаются одним векторным проходом. Оценка пары раскладывается
+    на вклад внешнего слоя, вклад внутреннего и штраф за суммарную
+    толщину, который зависит только от толщин. Поэтому для каждой
+    пары групп толщин достаточно перебрать лучшие top_k продуктов
+    каждой группы, а пары групп просматриваются по возрастанию
+    нижней оценки и отбрасываются, как только она хуже найденных.
+    """
+
+    def __init__(self, repo: Optional[MaterialCatalog] = None,
+                 construction_name: Optional[str] = None):
+        repo = repo or get_catalog()
+        products = [
+            p for p in repo.products
+            if p.size is not None and p.thickness is not None
+            and p.volume_m3 is not None
+            and (construction_name is None
+                 or p.construction_name == construction_name)
+        ]
+        self.names = [p.product_name_ru for p in products]
+        self.material_types = np.array(
+            [p.material_type_name or '' for p in products], dtype=object)
+        self.sheet_area = np.array(
+            [(p.size.length_mm / 1000) * (p.size.width_mm / 1000)
+             for p in products], dtype=np.float64)
+        self.volume_m3 = np.array(
+            [p.volume_m3 for p in products], dtype=np.float64)
+        self.thickness_mm = np.array(
+            [p.thickness.thickness_mm for p in products], dtype=np.int64)
+        logger.info(f'Оптимизатор: {len(products)} материалов')
+
+    def _layer(self, area_m2, building_height_m, count_corner,
+               index: np.ndarray, count_per_sheet: int):
+        return calculate_layer_arrays(
+            area_m2, building_height_m, count_corner,
+            self.sheet_area[index], self.volume_m3[index],
+            self.thickness_mm[index], count_per_sheet
+        )
+
+    def _mask(self, material_type: Optional[str]) -> np.ndarray:
+        if material_type is None:
+            return np.ones(len(self.names), dtype=bool)
+        return self.material_types == material_type
+
+    @staticmethod
+    def _separable(layer: Dict[str, np.ndarray], scales: Dict[str, float],
+                   weights: OptimizerWeights) -> np.ndarray:
+        return (
+            weights.volume * layer['volume'] / scales['volume']
+            + weights.sheets * layer['sheets'] / scales['sheets']
+            + weights.fasteners * layer['fasteners'] / scales['fasteners']
+        )
+
+    def rank(
+        self,
+        area_m2: float,
+        building_height_m: float,
+        count_corner: int,
+        system_type: str = 'double',
+        target_thickness_mm: Optional[float] = None,
+        weights: Optional[OptimizerWeights] = None,
+        top_k: int = 10,
+        outer_material_type: Optional[str] = None,
+        inner_material_type: Optional[str] = None,
+        allow_same: bool = False
+    ) -> List[Candidate]:
+        """
+        Лучшие top_k вариантов по возрастанию оценки (меньше — лучше).
+
+        Для system_type='single' перебираются одиночные продукты
+        (слой считается как внешний), для 'double' — пары
+        «внешний + внутренний». Без target_thickness_mm толщина
+        в оценке не участвует.
+        """
+        weights = weights or OptimizerWeights()
+        if system_type not in ('single', 'double'):
+            raise ValueError(f'Неизвестный тип системы: {system_type}')
+        if top_k <= 0:
+            return []
+        use_thickness = bool(target_thickness_mm) and weights.thickness
+        outer_idx = np.flatnonzero(self._mask(outer_material_type))
+        if not len(outer_idx):
+            return []
+        outer = self._layer(
+            area_m2, building_height_m, count_corner, outer_idx,
+            OUTER_FASTENERS_PER_SHEET)
+        scales = {
+            key: max(float(outer[key].min()), 1e-9)
+            for key in ('volume', 'sheets', 'fasteners')
+        }
+        score_outer = self._separable(outer, scales, weights)
+        thick_outer = self.thickness_mm[outer_idx]
+
+        def penalty(total_thickness):
+            if not use_thickness:
+                return np.zeros_like(total_thickness, dtype=np.float64)
+            return weights.thickness * np.abs(
+                total_thickness - target_thickness_mm) / target_thickness_mm
+
+        if system_type == 'single':
+            scores = score_outer + penalty(thick_outer)
+            best = np.argsort(scores, kind='stable')[:top_k]
+            return [
+                self._candidate(scores[j], outer, outer_idx[j], j)
+                for j in best
+            ]
+
+        inner_idx = np.flatnonzero(self._mask(inner_material_type))
+        if not len(inner_idx):
+            return []
+        inner = self._layer(
+            area_m2, building_height_m, count_corner, inner_idx,
+            INNER_FASTENERS_PER_SHEET)
+        score_inner = self._separable(inner, scales, weights)
+        thick_inner = self.thickness_mm[inner_idx]
+        # Одинаковые продукты могут отсекаться, поэтому берем k + 1
+        keep = top_k if allow_same else top_k + 1
+        groups_outer = self._top_by_group(thick_outer, score_outer, keep)
+        groups_inner = self._top_by_group(thick_inner, score_inner, keep)
+
+        t_outer = np.array(list(groups_outer), dtype=np.int64)
+        t_inner = np.array(list(groups_inner), dtype=np.int64)
+        best_outer = np.array(
+            [score_outer[groups_outer[t][0]] for t in t_outer])
+        best_inner = np.array(
+            [score_inner[groups_inner[t][0]] for t in t_inner])
+        bounds = (
+            best_outer[:, None] + best_inner[None, :]
+            + penalty(t_outer[:, None] + t_inner[None, :])
+        )
+
+        heap = []
+        evaluated = 0
+        for flat in np.argsort(bounds, axis=None, kind='stable'):
+            go, gi = np.unravel_index(flat, bounds.shape)
+            if len(heap) == top_k and bounds[go, gi] >= -heap[0][0]:
+                break
+            jo = groups_outer[t_outer[go]]
+            ji = groups_inner[t_inner[gi]]
+            pair = (
+                score_outer[jo][:, None] + score_inner[ji][None, :]
+                + penalty(np.int64(t_outer[go] + t_inner[gi]))
+            )
+            evaluated += pair.size
+            for a, b in zip(*np.unravel_index(
+                    np.argsort(pair, axis=None, kind='stable'), pair.shape)):
+                o, i = outer_idx[jo[a]], inner_idx[ji[b]]
+                if not allow_same and self.names[o] == self.names[i]:
+                    continue
+                item = (-pair[a, b], -int(jo[a]), -int(ji[b]))
+                if len(heap) < top_k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+                else:
+                    break
+
+        logger.debug(
+            f'Оптимизатор: оценено {evaluated} пар из '
+            f'{len(outer_idx) * len(inner_idx)}'
+        )
+        result = []
+        for neg_score, neg_jo, neg_ji in sorted(heap, reverse=True):
+            jo, ji = -neg_jo, -neg_ji
+            result.append(self._pair_candidate(
+                -neg_score, outer, inner, outer_idx, inner_idx, jo, ji))
+        return result
+
+    @staticmethod
+    def _top_by_group(thickness: np.ndarray, scores: np.ndarray,
+                      keep: int) -> Dict[int, np.ndarray]:
+        """Индексы keep лучших продуктов для каждой толщины."""
+        order = np.lexsort((scores, thickness))
+        values, starts = np.unique(thickness[order], return_index=True)
+        ends = list(starts[1:]) + [len(order)]
+        return {
+            int(value): order[start:min(end, start + keep)]
+            for value, start, end in zip(values, starts, ends)
+        }
+
+    def _candidate(self, score, layer, index, j) -> Candidate:
+        return Candidate(
+            score=float(score),
+            outer_material=self.names[index],
+            inner_material=None,
+            volume=float(layer['volume'][j]),
+            sheets=int(layer['sheets'][j]),
+            fasteners=int(layer['fasteners'][j]),
+            thickness_mm=int(self.thickness_mm[index]),
+        )
+
+    def _pair_candidate(self, score, outer, inner, outer_idx, inner_idx,
+                        jo, ji) -> Candidate:
+        o, i = outer_idx[jo], inner_idx[ji]
+        return Candidate(
+            score=float(score),
+            outer_material=self.names[o],
+            inner_material=self.names[i],
+            volume=round(
+                float(outer['volume'][jo]) + float(inner['volume'][ji]), 3),
+            sheets=int(outer['sheets'][jo] + inner['sheets'][ji]),
+            fasteners=int(outer['fasteners'][jo] + inner['fasteners'][ji]),
+            thickness_mm=int(self.thickness_mm[o] + self.thickness_mm[i]),
+        )
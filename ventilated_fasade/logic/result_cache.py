@@ -0,0 +1,243 @@
+from logic.validators import InputValidator, ValidationError
+from data.catalog import get_catalog_version
+from data.db import get_engine
+from data.models import ResultCacheEntry
+from config import DB_URL, RESULT_CACHE_SIZE
+import os
+import sys
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+logger = logging.getLogger(__name__)
+
+# Тип системы из формы GUI ('mono') и из API ('single') — одно и то же
+SYSTEM_TYPES = {'single': 'single', 'mono': 'single', 'double': 'double'}
+
+
+def canonical_payload(payload: dict) -> dict:
+    """
+    Входные данные расчета в каноническом виде для ключа кэша.
+
+    Принимает словарь вида InsulationCalculatorApp._gather_input_payload
+    или тело запроса /calculate. Числа валидируются и приводятся к типам
+    калькулятора, названия материалов очищаются от пробелов, тип
+    системы 'mono' приводится к 'single'; поля, не влияющие
+    на результат (менеджер, адрес), отбрасываются.
+    """
+    validated = InputValidator.validate_inputs(payload)
+    reveal_area_m2 = InputValidator.validate_positive_number(
+        payload.get('reveal_area_m2') or 0, 'Площадь откосов', min_value=0)
+    outer = str(payload.get('outer_material') or '').strip()
+    inner = str(payload.get('inner_material') or '').strip() or None
+    system_type = payload.get('system_type') or (
+        'double' if inner else 'single')
+    if system_type not in SYSTEM_TYPES:
+        raise ValidationError(f'Неизвестный тип системы: {system_type}')
+    system_type = SYSTEM_TYPES[system_type]
+    if system_type != 'double':
+        inner = None
+    return {
+        'system_type': system_type,
+        'outer_material': outer,
+        'inner_material': inner,
+        **validated,
+        'reveal_area_m2': reveal_area_m2,
+        'use_layout': bool(payload.get('use_layout')),
+        'zoned_fasteners': bool(payload.get('zoned_fasteners')),
+    }
+
+
+class ResultCache:
+    """
+    Двухуровневый кэш результатов summary().
+
+    Первый уровень — LRU в памяти на max_entries записей, второй —
+    таблица result_cache в БД материалов. Ключ — SHA-256 канонических
+    входных данных и метки версии каталога, поэтому после
+    синхронизации каталога старые результаты не находятся; при смене
+    метки память очищается, а строки прежних версий удаляются из БД.
+    Метка сверяется при каждом обращении через get_catalog_version,
+    который не обращается к БД, пока ее файлы не менялись, так что
+    синхронизация из другого процесса тоже сбрасывает кэш.
+    """
+
+    def __init__(self, db_url: str = DB_URL,
+                 max_entries: int = RESULT_CACHE_SIZE,
+                 persistent: bool = True):
+        self.db_url = db_url
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._memory: 'OrderedDict[tuple, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        if persistent:
+            try:
+                ResultCacheEntry.__table__.create(
+                    get_engine(db_url), checkfirst=True)
+            except SQLAlchemyError as e:
+                logger.warning(f'Кэш результатов только в памяти: {e}')
+                self.persistent = False
+
+    @staticmethod
+    def make_key(canonical: dict, version: str) -> str:
+        text = json.dumps(
+            canonical, sort_keys=True, ensure_ascii=False,
+            separators=(',', ':'))
+        return hashlib.sha256(
+            f'{version}|{text}'.encode('utf-8')).hexdigest()
+
+    def _check_version(self) -> str:
+        """Текущая метка каталога; при ее смене сбрасывает старые записи."""
+        version = get_catalog_version(self.db_url)
+        if version == self._version:
+            return version
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    logger.info('Каталог изменился, кэш результатов сброшен')
+                self._memory.clear()
+                self._version = version
+                self._purge_disk(version)
+        return version
+
+    def _purge_disk(self, version: str):
+        if not self.persistent:
+            return
+        table = ResultCacheEntry.__table__
+        try:
+            with get_engine(self.db_url).begin() as conn:
+                conn.execute(delete(table).where(
+                    table.c.catalog_version != version))
+        except SQLAlchemyError as e:
+            logger.warning(f'Не удалось очистить кэш результатов: {e}')
+
+    @staticmethod
+    def memory_key(canonical: dict, version: str) -> tuple:
+        """Ключ первого уровня: без сериализации и хэширования."""
+        return version, tuple(sorted(canonical.items()))
+
+    def _remember(self, key: tuple, text: str):
+        with self._lock:
+            self._memory[key] = text
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        if not self.persistent:
+            return None
+        table = ResultCacheEntry.__table__
+        try:
+            with get_engine(self.db_url).connect() as conn:
+                return conn.execute(
+                    select(table.c.result).where(table.c.key == key)
+                ).scalar()
+        except SQLAlchemyError as e:
+            logger.warning(f'Кэш результатов не прочитан: {e}')
+            return None
+
+    def _write_disk(self, key: str, version: str, text: str):
+        if not self.persistent:
+            return
+        table = ResultCacheEntry.__table__
+        stmt = sqlite_insert(table).values(
+            key=key, catalog_version=version, result=text)
+        try:
+            with get_engine(self.db_url).begin() as conn:
+                conn.execute(stmt.on_conflict_do_update(
+                    index_elements=[table.c.key],
+                    set_={'catalog_version': version, 'result': text}
+                ))
+        except SQLAlchemyError as e:
+            logger.warning(f'Кэш результатов не записан: {e}')
+
+    def get_or_compute(self, canonical: dict, compute: Callable[[], dict],
+                       catalog_version: Optional[str] = None) -> dict:
+        """
+        Результат из кэша или compute() с сохранением в оба уровня.
+
+        catalog_version — версия каталога, по которому считает compute
+        (MaterialCatalog.version). Если каталог успел смениться,
+        результат не сохраняется. Метка читается один раз: результат,
+        посчитанный во время синхронизации, хранится под ключом старой
+        версии и после нее уже не находится.
+        """
+        version = self._check_version()
+        if catalog_version is not None and catalog_version != version:
+            with self._lock:
+                self.counters['misses'] += 1
+            return compute()
+        memory_key = self.memory_key(canonical, version)
+        with self._lock:
+            text = self._memory.get(memory_key)
+            if text is not None:
+                self._memory.move_to_end(memory_key)
+                self.counters['memory_hits'] += 1
+                return json.loads(text)
+        key = self.make_key(canonical, version)
+        text = self._read_disk(key)
+        if text is not None:
+            self._remember(memory_key, text)
+            with self._lock:
+                self.counters['disk_hits'] += 1
+            return json.loads(text)
+
+        result = compute()
+        with self._lock:
+            self.counters['misses'] += 1
+        text = json.dumps(result, ensure_ascii=False)
+        self._remember(memory_key, text)
+        self._write_disk(key, version, text)
+        return result
+
+    def clear(self):
+        """Очищает оба уровня кэша."""
+        with self._lock:
+            self._memory.clear()
+        if self.persistent:
+            try:
+                with get_engine(self.db_url).begin() as conn:
+                    conn.execute(delete(ResultCacheEntry.__table__))
+            except SQLAlchemyError as e:
+                logger.warning(f'Не удалось очистить кэш результатов: {e}')
+
+    def stats(self) -> Dict[str, object]:
+        """Счетчики попаданий и промахов."""
+        with self._lock:
+            counters = dict(self.counters)
+            entries = len(self._memory)
+        total = sum(counters.values())
+        hits = counters['memory_hits'] + counters['disk_hits']
+        return {
+            **counters,
+            'memory_entries': entries,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+        }
+
+
+_caches: Dict[str, ResultCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_result_cache(db_url: str = DB_URL) -> ResultCache:
+    """Общий кэш результатов процесса для указанной БД."""
+    cache = _caches.get(db_url)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(db_url)
+            if cache is None:
+                cache = _caches[db_url] = ResultCache(db_url)
+    return cache
+
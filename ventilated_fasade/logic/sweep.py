@@ -0,0 +1,259 @@
+from logic.batch_calculator import (
+    INNER_FASTENERS_PER_SHEET, OUTER_FASTENERS_PER_SHEET,
+    calculate_layer_arrays, material_params)
+from data.catalog import get_catalog
+from config import SWEEP_CHUNK_SIZE
+import csv
+import os
+import sys
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+logger = logging.getLogger(__name__)
+
+AXES = ('area_m2', 'building_height_m', 'count_corner',
+        'outer_material', 'inner_material')
+LAYER_COLUMNS = ('sheets', 'volume', 'fasteners', 'fastener_length')
+RESULT_COLUMNS = AXES + tuple(
+    f'{prefix}_{key}' for prefix in ('outer', 'inner')
+    for key in LAYER_COLUMNS
+) + ('total_volume',)
+# Предел строк листа Excel без заголовка
+EXCEL_MAX_ROWS = 1048575
+
+
+def value_range(start: float, stop: float, step: float) -> np.ndarray:
+    """Значения от start до stop включительно с шагом step."""
+    if step <= 0:
+        raise ValueError('Шаг должен быть больше нуля')
+    if stop < start:
+        raise ValueError('Конец диапазона меньше начала')
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return start + step * np.arange(count)
+
+
+def parse_range(text: str) -> List[float]:
+    """
+    Значения оси из строки: "30", "30,40,60" или "30:60:5"
+    (начало:конец:шаг, конец включается).
+    """
+    text = text.strip()
+    try:
+        if ':' in text:
+            start, stop, step = (float(part) for part in text.split(':'))
+            return value_range(start, stop, step).round(6).tolist()
+        return [float(part) for part in text.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError(f'Некорректный диапазон "{text}"')
+
+
+class SweepResult:
+    """
+    Результат параметрического расчета в колоночном виде.
+
+    Материалы хранятся индексами в списках outer_materials
+    и inner_materials, названия подставляются только при выгрузке.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray],
+                 outer_materials: List[str],
+                 inner_materials: List[Optional[str]]):
+        self.columns = columns
+        self.outer_materials = outer_materials
+        self.inner_materials = inner_materials
+
+    def __len__(self) -> int:
+        return len(self.columns['area_m2'])
+
+    def column(self, name: str) -> np.ndarray:
+        """Колонка результата; для материалов — массив названий."""
+        if name == 'outer_material':
+            names = np.array(self.outer_materials, dtype=object)
+            return names[self.columns[name]]
+        if name == 'inner_material':
+            names = np.array(self.inner_materials, dtype=object)
+            return names[self.columns[name]]
+        return self.columns[name]
+
+    def to_dict(self) -> Dict[str, list]:
+        return {name: self.column(name).tolist() for name in RESULT_COLUMNS}
+
+    def iter_rows(self, chunk_size: int = SWEEP_CHUNK_SIZE) -> Iterator[tuple]:
+        """Строки результата, колонки переводятся в списки порциями."""
+        for start in range(0, len(self), chunk_size):
+            end = start + chunk_size
+            yield from zip(*(
+                self.column(name)[start:end].tolist()
+                for name in RESULT_COLUMNS
+            ))
+
+    def to_csv(self, path: str):
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(RESULT_COLUMNS)
+            writer.writerows(self.iter_rows())
+        logger.info(f'Результат перебора ({len(self)} точек) записан в {path}')
+
+    def to_excel(self, path: str):
+        if len(self) > EXCEL_MAX_ROWS:
+            raise ValueError(
+                f'{len(self)} точек не помещаются на лист Excel, '
+                f'используйте CSV'
+            )
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Перебор параметров')
+        ws.append(RESULT_COLUMNS)
+        for row in self.iter_rows():
+            ws.append(row)
+        wb.save(path)
+        logger.info(f'Результат перебора ({len(self)} точек) записан в {path}')
+
+    def save(self, path: str):
+        """Выгрузка в CSV или Excel по расширению файла."""
+        ext = os.path.splitext(path)[1].lower()
+        if ext == '.csv':
+            self.to_csv(path)
+        elif ext == '.xlsx':
+            self.to_excel(path)
+        else:
+            raise ValueError(f'Неизвестный формат выгрузки: {path}')
+
+
+class ParameterSweep:
+    """
+    Перебор входов InsulationCalculator по декартовой сетке.
+
+    Параметры материалов читаются из каталога один раз при создании.
+    Точки сетки не хранятся: индексы осей каждой порции восстанавливаются
+    из номера точки, порции считаются векторно в пуле потоков (NumPy
+    отпускает GIL) и пишутся в заранее выделенные колонки результата.
+    """
+
+    def __init__(
+        self,
+        area_m2: Sequence[float],
+        building_height_m: Sequence[float],
+        count_corner: Sequence[int],
+        outer_materials: Sequence[str],
+        inner_materials: Sequence[Optional[str]] = (None,),
+        repo=None
+    ):
+        self.axes = {
+            'area_m2': np.asarray(area_m2, dtype=np.float64),
+            'building_height_m': np.asarray(
+                building_height_m, dtype=np.float64),
+            'count_corner': np.asarray(count_corner, dtype=np.int64),
+        }
+        for name, values in self.axes.items():
+            if not len(values):
+                raise ValueError(f'Не заданы значения оси {name}')
+            if (values < 0).any():
+                raise ValueError(f'Отрицательные значения оси {name}')
+        self.outer_materials = list(outer_materials)
+        self.inner_materials = [name or None for name in inner_materials]
+        if not self.outer_materials:
+            raise ValueError('Не указан материал внешнего слоя')
+        if not self.inner_materials:
+            self.inner_materials = [None]
+
+        repo = repo or get_catalog()
+        self.outer_params = self._params(repo, self.outer_materials)
+        self.inner_params = self._params(repo, self.inner_materials)
+        self.shape = tuple(len(v) for v in self.axes.values()) + (
+            len(self.outer_materials), len(self.inner_materials))
+
+    @staticmethod
+    def _params(repo, names: List[Optional[str]]) -> Dict[str, np.ndarray]:
+        """Таблица параметров материалов; None — слоя нет."""
+        table = {
+            'sheet_area': np.ones(len(names)),
+            'volume_m3': np.zeros(len(names)),
+            'thickness_mm': np.zeros(len(names), dtype=np.int64),
+        }
+        for i, name in enumerate(names):
+            if name is None:
+                continue
+            products = repo.get_materials_by_ru_name(name)
+            if not products:
+                raise ValueError(f'Материал "{name}" не найден')
+            for key, value in material_params(products[0]).items():
+                table[key][i] = value
+        return table
+
+    def __len__(self) -> int:
+        return int(np.prod(self.shape))
+
+    def _calculate_chunk(self, columns: Dict[str, np.ndarray],
+                         start: int, end: int):
+        index = np.unravel_index(np.arange(start, end), self.shape)
+        area, height, corners, outer, inner = index
+        area = self.axes['area_m2'][area]
+        height = self.axes['building_height_m'][height]
+        corners = self.axes['count_corner'][corners]
+        part = slice(start, end)
+        columns['area_m2'][part] = area
+        columns['building_height_m'][part] = height
+        columns['count_corner'][part] = corners
+        columns['outer_material'][part] = outer
+        columns['inner_material'][part] = inner
+
+        has_inner = np.array(
+            [name is not None for name in self.inner_materials])[inner]
+        for prefix, params, material, per_sheet in (
+            ('outer', self.outer_params, outer, OUTER_FASTENERS_PER_SHEET),
+            ('inner', self.inner_params, inner, INNER_FASTENERS_PER_SHEET),
+        ):
+            layer = calculate_layer_arrays(
+                area, height, corners,
+                params['sheet_area'][material], params['volume_m3'][material],
+                params['thickness_mm'][material], per_sheet
+            )
+            for key in LAYER_COLUMNS:
+                values = layer[key]
+                if prefix == 'inner':
+                    values = np.where(has_inner, values, 0)
+                columns[f'{prefix}_{key}'][part] = values
+        columns['total_volume'][part] = np.round(
+            columns['outer_volume'][part] + columns['inner_volume'][part], 3)
+
+    def run(self, workers: Optional[int] = None,
+            chunk_size: int = SWEEP_CHUNK_SIZE) -> SweepResult:
+        """Расчет всей сетки, результат — SweepResult."""
+        size = len(self)
+        workers = workers or os.cpu_count() or 1
+        logger.info(
+            f'Перебор параметров: {size} точек, сетка {self.shape}, '
+            f'{workers} потоков'
+        )
+        int_columns = {'count_corner', 'outer_material', 'inner_material'}
+        columns = {}
+        for name in RESULT_COLUMNS:
+            if name in int_columns or name.endswith(
+                    ('_sheets', '_fasteners', '_fastener_length')):
+                columns[name] = np.empty(size, dtype=np.int64)
+            else:
+                columns[name] = np.empty(size, dtype=np.float64)
+
+        bounds = [
+            (start, min(start + chunk_size, size))
+            for start in range(0, size, chunk_size)
+        ]
+        if workers == 1 or len(bounds) == 1:
+            for start, end in bounds:
+                self._calculate_chunk(columns, start, end)
+        else:
+            with ThreadPoolExecutor(workers) as pool:
+                for future in [
+                    pool.submit(self._calculate_chunk, columns, start, end)
+                    for start, end in bounds
+                ]:
+                    future.result()
+        return SweepResult(columns, self.outer_materials, self.inner_materials)
@@ -0,0 +1,207 @@
+from data.catalog import MaterialCatalog, get_catalog
+import os
+import sys
+import bisect
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+logger = logging.getLogger(__name__)
+
+# Допуск сравнения термического сопротивления, м²·К/Вт
+R_EPSILON = 1e-9
+
+
+def thermal_resistance(thickness_mm: float, conductivity: float) -> float:
+    """Термическое сопротивление слоя R = δ / λ, м²·К/Вт."""
+    if conductivity <= 0:
+        raise ValueError('Теплопроводность должна быть больше нуля')
+    return thickness_mm / 1000 / conductivity
+
+
+@dataclass(frozen=True)
+class ThermalStack:
+    """Одно- или двухслойная система с сопротивлением и объемом на 1 м²."""
+    outer_material: str
+    inner_material: Optional[str]
+    r_value: float
+    volume_per_m2: float
+    thickness_mm: int
+
+    @property
+    def system_type(self) -> str:
+        return 'double' if self.inner_material else 'single'
+
+
+class _ResistanceIndex:
+    """
+    Продукты, отсортированные по R, с минимумами объема на суффиксах.
+
+    best[i] — продукт с наименьшим объемом на 1 м² среди R >= R[i],
+    second[i] — лучший среди них с другим названием (для пар из
+    разных продуктов). frontier — парето-фронт (R растет, объем
+    растет): только эти продукты могут быть внешним слоем лучшей пары.
+    """
+
+    def __init__(self, items: List[Tuple[float, float, int, str]]):
+        items.sort()
+        self.r = [item[0] for item in items]
+        self.volume = [item[1] for item in items]
+        self.thickness = [item[2] for item in items]
+        self.names = [item[3] for item in items]
+        size = len(items)
+        self.best = [0] * size
+        self.second: List[Optional[int]] = [None] * size
+        best, second = None, None
+        for i in range(size - 1, -1, -1):
+            if best is None or self.volume[i] <= self.volume[best]:
+                if best is not None and self.names[best] != self.names[i]:
+                    second = best
+                best = i
+            elif self.names[i] != self.names[best] and (
+                    second is None
+                    or self.volume[i] <= self.volume[second]):
+                second = i
+            self.best[i], self.second[i] = best, second
+        self.frontier = sorted({i for i in self.best})
+
+    def __len__(self) -> int:
+        return len(self.r)
+
+    def lightest(self, min_r: float,
+                 exclude: Optional[str] = None) -> Optional[int]:
+        """Продукт с R >= min_r и наименьшим объемом (бинарный поиск)."""
+        i = bisect.bisect_left(self.r, min_r - R_EPSILON)
+        if i >= len(self.r):
+            return None
+        j = self.best[i]
+        if exclude is not None and self.names[j] == exclude:
+            return self.second[i]
+        return j
+
+
+class ThermalSolver:
+    """
+    Подбор системы с R >= целевого при наименьшем объеме утеплителя.
+
+    Сопротивление слоев складывается (R = Σ δ/λ), сопротивления
+    теплообмена у поверхностей и каркаса не учитываются.
+    Для каждой комбинации фильтров индекс строится один раз: продукты
+    сортируются по R, для суффиксов запоминаются минимумы объема.
+    Однослойная система находится одним бинарным поиском, двухслойная —
+    перебором только парето-фронта внешнего слоя с бинарным поиском
+    внутреннего, а не всех пар продуктов.
+    """
+
+    def __init__(self, repo: Optional[MaterialCatalog] = None,
+                 construction_name: Optional[str] = None):
+        repo = repo or get_catalog()
+        self.products = [
+            p for p in repo.products
+            if p.size is not None and p.thickness is not None
+            and p.volume_m3 and p.thermal_conductivity
+            and (construction_name is None
+                 or p.construction_name == construction_name)
+        ]
+        self._indexes: Dict[Optional[str], _ResistanceIndex] = {}
+        logger.info(
+            f'Подбор по термическому сопротивлению: '
+            f'{len(self.products)} материалов с λ'
+        )
+
+    def index(self, material_type: Optional[str] = None) -> _ResistanceIndex:
+        index = self._indexes.get(material_type)
+        if index is None:
+            items = []
+            for p in self.products:
+                if (material_type is not None
+                        and p.material_type_name != material_type):
+                    continue
+                sheet_area = (p.size.length_mm / 1000) * (
+                    p.size.width_mm / 1000)
+                items.append((
+                    thermal_resistance(
+                        p.thickness.thickness_mm, p.thermal_conductivity),
+                    p.volume_m3 / sheet_area,
+                    p.thickness.thickness_mm,
+                    p.product_name_ru,
+                ))
+            index = self._indexes[material_type] = _ResistanceIndex(items)
+        return index
+
+    @staticmethod
+    def _single(index: _ResistanceIndex, i: int) -> ThermalStack:
+        return ThermalStack(
+            outer_material=index.names[i],
+            inner_material=None,
+            r_value=round(index.r[i], 3),
+            volume_per_m2=round(index.volume[i], 4),
+            thickness_mm=index.thickness[i],
+        )
+
+    def frontier(self, material_type: Optional[str] = None
+                 ) -> List[ThermalStack]:
+        """Парето-фронт однослойных систем: больше R — больше объем."""
+        index = self.index(material_type)
+        return [self._single(index, i) for i in index.frontier]
+
+    def solve(
+        self,
+        target_r: float,
+        system_type: str = 'any',
+        outer_material_type: Optional[str] = None,
+        inner_material_type: Optional[str] = None,
+        allow_same: bool = True
+    ) -> Optional[ThermalStack]:
+        """
+        Система с R >= target_r и наименьшим объемом на 1 м².
+
+        system_type: 'single', 'double' или 'any' (лучшая из двух).
+        allow_same=False запрещает одинаковый продукт в обоих слоях.
+        Возвращает None, если целевое сопротивление недостижимо.
+        """
+        if target_r <= 0:
+            raise ValueError('Целевое сопротивление должно быть больше нуля')
+        if system_type not in ('single', 'double', 'any'):
+            raise ValueError(f'Неизвестный тип системы: {system_type}')
+        candidates = []
+        outer = self.index(outer_material_type)
+        if system_type in ('single', 'any'):
+            i = outer.lightest(target_r)
+            if i is not None:
+                candidates.append(self._single(outer, i))
+        if system_type in ('double', 'any'):
+            pair = self._solve_double(
+                target_r, outer, self.index(inner_material_type), allow_same)
+            if pair is not None:
+                candidates.append(pair)
+        if not candidates:
+            return None
+        return min(candidates, key=lambda s: (s.volume_per_m2, -s.r_value))
+
+    @staticmethod
+    def _solve_double(target_r: float, outer: _ResistanceIndex,
+                      inner: _ResistanceIndex,
+                      allow_same: bool) -> Optional[ThermalStack]:
+        best = None
+        for o in outer.frontier:
+            exclude = None if allow_same else outer.names[o]
+            i = inner.lightest(target_r - outer.r[o], exclude)
+            if i is None:
+                continue
+            volume = outer.volume[o] + inner.volume[i]
+            if best is None or volume < best[0]:
+                best = (volume, o, i)
+        if best is None:
+            return None
+        volume, o, i = best
+        return ThermalStack(
+            outer_material=outer.names[o],
+            inner_material=inner.names[i],
+            r_value=round(outer.r[o] + inner.r[i], 3),
+            volume_per_m2=round(volume, 4),
+            thickness_mm=outer.thickness[o] + inner.thickness[i],
+        )
@@ -3,12 +3,10 @@ from config import DB_URL, LOG_DIR, REQUIRED_DEPENDENCIES
 import sys
 import os
 import logging
+import importlib.util
 from logging.handlers import RotatingFileHandler
 import tkinter as tk
 from tkinter import messagebox
-from sqlalchemy import create_engine
-from data.models import Base as Material
-from data.models_calc import Base as Personal
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
@@ -62,9 +60,8 @@ def check_dependencies():
     logger.info('Начата проверка наличия необходимых библиотек...')
     missing_deps = []
     for dep in REQUIRED_DEPENDENCIES:
-        try:
-            __import__(dep)
-        except ImportError:
+        # Только поиск модуля: импорт отложен до первого использования
+        if importlib.util.find_spec(dep) is None:
             missing_deps.append(dep)
 
     if missing_deps:
@@ -85,23 +82,26 @@ def check_dependencies():
 
 
 def initialize_database():
-    """Инициализирует базу данных."""
+    """
+    Инициализирует базу данных.
+
+    Выполняется в фоне после отрисовки окна; ошибку показывает окно.
+    """
+    from data.db import (
+        get_engine, ensure_indexes, ensure_unique_constraints,
+        verify_db_profile)
+    from data.models import Base as Material
+    from data.models_calc import Base as Personal
+    from data.sync import upgrade_schema
+
     logger.info('Начата инициализация базы данных...')
-    try:
-        engine = create_engine(DB_URL)
-        Material.metadata.create_all(engine)
-        Personal.metadata.create_all(engine)
-        logger.info('База данных успешно инициализирована.')
-        return True
-    except Exception as e:
-        logger.error(f'Ошибка инициализации БД: {e}', exc_info=True)
-        root = tk.Tk()
-        root.withdraw()
-        messagebox.showerror(
-            'Ошибка инициализации БД',
-            f'Не удалось инициализировать базу данных:\n{e}'
-        )
-        return False
+    engine = get_engine(DB_URL)
+    upgrade_schema(engine)
+    Personal.metadata.create_all(engine)
+    ensure_unique_constraints(engine, Personal.metadata)
+    ensure_indexes(engine, Material.metadata, Personal.metadata)
+    verify_db_profile(engine)
+    logger.info('База данных успешно инициализирована.')
 
 
 def main():
@@ -113,12 +113,8 @@ def main():
         logger.warning('Завершение работы из-за отсутствия зависимостей.')
         return
 
-    if not initialize_database():
-        logger.warning('Завершение работы из-за ошибки инициализации БД.')
-        return
-
     try:
-        app = InsulationCalculatorApp()
+        app = InsulationCalculatorApp(initialize_database)
         logger.info('Запуск GUI приложения.')
         app.mainloop()
     except Exception as e:
@@ -129,6 +125,10 @@ def main():
             'Ошибка запуска',
             f'Не удалось запустить приложение:\n{e}'
         )
+    finally:
+        if 'data.db' in sys.modules:
+            from data.db import dispose_engines
+            dispose_engines()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,138 @@
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.catalog import (  # noqa: E402
+    CatalogProduct, CatalogSize, CatalogThickness, MaterialCatalog)
+
+
+def make_product(name, thickness_mm, volume_m3, length_mm=1200,
+                 width_mm=600, material_type='Базальт',
+                 construction='НФС', conductivity=None) -> CatalogProduct:
+    """Запись каталога для тестов без обращения к БД."""
+    return CatalogProduct(
+        product_name_ru=name,
+        product_name_en=name,
+        volume_m3=volume_m3,
+        construction_name=construction,
+        material_type_name=material_type,
+        size=CatalogSize(length_mm, width_mm),
+        thickness=CatalogThickness(thickness_mm),
+        thermal_conductivity=conductivity,
+    )
+
+
+@pytest.fixture
+def catalog() -> MaterialCatalog:
+    """Небольшой каталог: плиты разной толщины, размера и типа."""
+    return MaterialCatalog([
+        make_product('Фасад 50', 50, 0.288, conductivity=0.036),
+        make_product('Фасад 100', 100, 0.144, conductivity=0.037),
+        make_product('Фасад 150', 150, 0.108, 1000, 600, conductivity=0.038),
+        make_product('Лайт 50', 50, 0.432, material_type='Кварц',
+                     conductivity=0.039),
+        make_product('Лайт 100', 100, 0.216, material_type='Кварц',
+                     conductivity=0.040),
+        make_product('Венти 80', 80, 0.173, 1000, 500, conductivity=0.035),
+    ])
+
+
+def fixture_product(name, thickness_id=1, volume_m3=0.288, **fields):
+    """Продукт фикстуры со ссылками на записи make_fixture."""
+    return {
+        'product_name_ru': name, 'product_name_en': name,
+        'volume_m3': volume_m3, 'construction_id': 1,
+        'material_type_id': 1, 'size_id': 1, 'thickness_id': thickness_id,
+        **fields,
+    }
+
+
+def make_fixture(products=None):
+    """Фикстура материалов: справочники из одной-двух записей."""
+    if products is None:
+        products = [fixture_product('Фасад 50', 1),
+                    fixture_product('Фасад 100', 2, 0.144)]
+    return {
+        'ConstructionType': [{'id': 1, 'name': 'НФС'}],
+        'MaterialType': [{'id': 1, 'type': 'Базальт'}],
+        'Size': [{'id': 1, 'length_mm': 1200, 'width_mm': 600}],
+        'Thickness': [{'id': 1, 'thickness_mm': 50},
+                      {'id': 2, 'thickness_mm': 100}],
+        'products': products,
+    }
+
+
+def write_fixture(path, fixture):
+    """Записывает фикстуру в JSON с отступами, возвращает путь строкой."""
+    path.write_text(json.dumps(fixture, ensure_ascii=False, indent=2),
+                    encoding='utf-8')
+    return str(path)
+
+
+def set_manifest_version(db_url, version):
+    """Записывает метку версии каталога, как это делает синхронизация."""
+    from data.db import get_engine
+    from data.models import SyncManifest
+
+    table = SyncManifest.__table__
+    with get_engine(db_url).begin() as conn:
+        table.create(conn, checkfirst=True)
+        conn.execute(table.delete())
+        conn.execute(table.insert().values(
+            id=1, fixture_path='fixture.json', size_bytes=0, mtime_ns=0,
+            content_hash='', section_hashes={}, catalog_version=version))
+
+
+def seed_calculations(db_url, series=3, revisions=1,
+                      engineer=('Иван', 'Петров'), address='ул. Ленина 1',
+                      start=datetime(2025, 3, 1, 9, 0), step_s=60):
+    """
+    Создает series серий по 1 + revisions версий; возвращает номера.
+
+    created_at версий идут с шагом step_s секунд от start, каждая
+    вторая серия без адреса, у всех — менеджер «Анна Смирнова».
+    """
+    from data.db import get_engine, get_sessionmaker
+    from data.models_calc import Base
+    from data.people import add_manager, upsert_address, upsert_engineer
+    from data.services_calc import create_calc, create_revision
+
+    Base.metadata.create_all(get_engine(db_url))
+    numbers = []
+    moment = start
+    with get_sessionmaker(db_url)() as session:
+        eng = upsert_engineer(session, *engineer)
+        manager = add_manager(session, 'Анна', 'Смирнова')
+        adr = upsert_address(session, address, 'Москва')
+        for i in range(series):
+            calc = create_calc(
+                session, eng, adr.id if i % 2 == 0 else None,
+                {'area_m2': 100 + i}, {'sheets': i}, dt=start)
+            calc.managers.append(manager)
+            versions = [calc] + [
+                create_revision(session, calc.base_number,
+                                {'area_m2': 100 + i, 'v': v}, {'sheets': v})
+                for v in range(1, revisions + 1)]
+            for version in versions:
+                version.created_at = version.updated_at = moment
+                moment += timedelta(seconds=step_s)
+                numbers.append(version.number)
+        session.commit()
+    return numbers
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    """URL отдельной файловой БД SQLite; движки закрываются после теста."""
+    from data.catalog import invalidate_catalog
+    from data.db import dispose_engines
+
+    yield f"sqlite:///{tmp_path / 'test.db'}"
+    invalidate_catalog()
+    dispose_engines()
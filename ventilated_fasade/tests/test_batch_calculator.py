@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from logic.batch_calculator import BatchInsulationCalculator, round_like_python
+from logic.calculator import InsulationCalculator
+
+
+def test_round_like_python_matches_round():
+    values = np.array([0.0005, 0.0015, 2.675, 1.0005, 0.1234, 3.9995])
+    expected = [round(float(v), 3) for v in values]
+    assert round_like_python(values, 3).tolist() == expected
+
+
+def test_batch_matches_summary_row_by_row(catalog):
+    rng = np.random.default_rng(7)
+    size = 200
+    names = catalog.get_all_ru_names()
+    area = np.round(rng.uniform(1, 5000, size), 2)
+    height = np.round(rng.uniform(3, 75, size), 1)
+    corners = rng.integers(0, 12, size)
+    outer = [names[i] for i in rng.integers(0, len(names), size)]
+    inner = [
+        names[i] if use else None
+        for i, use in zip(rng.integers(0, len(names), size),
+                          rng.random(size) < 0.5)
+    ]
+
+    batch = BatchInsulationCalculator(
+        outer, area, height, corners, inner_materials=inner, repo=catalog)
+    for i in range(size):
+        single = InsulationCalculator(
+            outer[i], inner[i], area_m2=float(area[i]),
+            building_height_m=float(height[i]),
+            count_corner=int(corners[i]), repo=catalog)
+        assert batch.summary(i) == single.summary()
+
+
+def test_scalar_material_is_broadcast(catalog):
+    batch = BatchInsulationCalculator(
+        'Фасад 100', [100, 250.5], [10, 12], [4, 6], repo=catalog)
+    result = batch.calculate()
+    assert not result['is_double_layer'].any()
+    assert result['inner_sheets'].tolist() == [0, 0]
+    assert batch.summary(1) == InsulationCalculator(
+        'Фасад 100', area_m2=250.5, building_height_m=12, count_corner=6,
+        repo=catalog).summary()
+
+
+def test_unknown_material_raises(catalog):
+    with pytest.raises(ValueError, match='не найден'):
+        BatchInsulationCalculator('Нет такого', [10], [3], [0], repo=catalog)
+
+
+def test_wrong_names_length_raises(catalog):
+    with pytest.raises(ValueError, match='Ожидалось 2'):
+        BatchInsulationCalculator(
+            ['Фасад 50'], [10, 20], [3, 3], [0, 0], repo=catalog)
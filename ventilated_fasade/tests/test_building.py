@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from logic.building import Building, Opening, Segment
+
+
+def random_segment(rng, name):
+    openings = tuple(
+        Opening(round(float(rng.uniform(0.5, 2)), 2),
+                round(float(rng.uniform(0.5, 2.5)), 2),
+                int(rng.integers(1, 6)))
+        for _ in range(int(rng.integers(0, 3))))
+    return Segment(name, round(float(rng.uniform(2, 40)), 2),
+                   round(float(rng.uniform(3, 30)), 1), openings,
+                   int(rng.integers(0, 3)))
+
+
+def fresh_summary(building):
+    """Итоги того же здания, посчитанные заново без кэша."""
+    return Building(
+        building.outer_material, building.inner_material,
+        building.segments.values(), building.use_layout,
+        repo=building.repo).summary()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_totals_match_full_recompute(catalog, seed):
+    rng = np.random.default_rng(seed)
+    names = catalog.get_all_ru_names()
+    building = Building('Фасад 100', 'Фасад 50', repo=catalog)
+    counter = 0
+    for step in range(60):
+        action = rng.random()
+        if action < 0.4 or len(building.segments) < 2:
+            counter += 1
+            building.add_segment(random_segment(rng, f'Стена {counter}'))
+        elif action < 0.75:
+            name = str(rng.choice(building.segment_names()))
+            fresh = random_segment(rng, name)
+            building.update_segment(name, width_m=fresh.width_m,
+                                    openings=fresh.openings)
+        elif action < 0.9:
+            building.remove_segment(str(rng.choice(building.segment_names())))
+        elif action < 0.95:
+            inner = str(rng.choice(names)) if rng.random() < 0.5 else None
+            building.set_materials(str(rng.choice(names)), inner)
+        else:
+            building.set_use_layout(not building.use_layout)
+        if step % 3 == 0:
+            assert building.summary() == fresh_summary(building)
+    assert building.summary() == fresh_summary(building)
+
+
+def test_only_changed_segments_are_recalculated(catalog):
+    building = Building('Фасад 100', repo=catalog, segments=[
+        Segment('Север', 12, 9), Segment('Юг', 12, 9, corners=2)])
+    building.summary()
+    assert building.last_recalculated == 2
+
+    building.update_segment('Юг', openings=(Opening(1.2, 1.5, 4),))
+    building.summary()
+    assert building.last_recalculated == 1
+
+    # Правка, вернувшая прежнее значение, пересчета не требует
+    building.update_segment('Юг', openings=())
+    building.update_segment('Юг', openings=(Opening(1.2, 1.5, 4),))
+    building.summary()
+    assert building.last_recalculated == 0
+
+    building.set_materials('Фасад 50')
+    building.summary()
+    assert building.last_recalculated == 2
+
+
+def test_remove_segment_subtracts_its_share(catalog):
+    building = Building('Фасад 100', repo=catalog, segments=[
+        Segment('Север', 12, 9), Segment('Юг', 20, 9, corners=2)])
+    north = building.segment_result('Север')['outer_layer']
+    total = building.summary()['outer_layer']['sheets']
+    building.remove_segment('Юг')
+    assert building.summary()['outer_layer']['sheets'] == north['sheets']
+    assert total > north['sheets']
+    with pytest.raises(KeyError):
+        building.remove_segment('Юг')
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import select
+
+from data.calc_archive import (
+    count_versions, decode_cursor, list_revisions, query_archive)
+from data.db import get_sessionmaker
+from data.models_calc import Calculation
+
+from conftest import seed_calculations
+
+
+@pytest.fixture
+def session(db_url):
+    """Архив из 8 серий по 2 версии; у двух партий одинаковые created_at."""
+    seed_calculations(db_url, series=4, revisions=1)
+    seed_calculations(db_url, series=4, revisions=1)
+    with get_sessionmaker(db_url)() as session:
+        yield session
+
+
+def all_pages(session, limit, **filters):
+    ids, cursor = [], None
+    while True:
+        page = query_archive(session, cursor=cursor, limit=limit, **filters)
+        assert len(page.items) <= limit
+        ids += [calc.id for calc in page.items]
+        cursor = page.next_cursor
+        if cursor is None:
+            return ids
+
+
+def ordered_ids(session, *where):
+    return list(session.execute(
+        select(Calculation.id).where(*where)
+        .order_by(Calculation.created_at.desc(), Calculation.id.desc())
+    ).scalars())
+
+
+@pytest.mark.parametrize('limit', [1, 3, 16, 50])
+def test_cursor_pages_match_full_query(session, limit):
+    assert all_pages(session, limit) == ordered_ids(session)
+
+
+def test_cursor_pages_series_only(session):
+    assert all_pages(session, 3, series_only=True) == ordered_ids(
+        session, Calculation.version == 0)
+
+
+@pytest.mark.parametrize('address', [
+    'ленина', 'ЛЕНИНА', 'Ленина', 'ул. лЕнИнА 1', 'москва'])
+def test_address_ignores_case_of_cyrillic(session, address):
+    expected = ordered_ids(session, Calculation.address_id.isnot(None))
+    assert len(expected) == 8
+    assert all_pages(session, 5, address=address) == expected
+
+
+@pytest.mark.parametrize('address', ['пушкина', 'ул%', '_'])
+def test_address_without_match(session, address):
+    assert query_archive(session, address=address).items == []
+
+
+def test_revisions_and_versions(session):
+    bases = [calc.base_number
+             for calc in query_archive(session, series_only=True).items]
+    assert len(bases) == 8
+    assert count_versions(session, bases) == dict.fromkeys(bases, 2)
+    assert count_versions(session, []) == {}
+
+    revisions = list_revisions(session, bases[0])
+    assert [calc.version for calc in revisions] == [0, 1]
+    assert revisions[1].number == f'{bases[0]}-1'
+
+
+def test_bad_arguments(session):
+    with pytest.raises(ValueError, match='курсор'):
+        decode_cursor('нет курсора')
+    with pytest.raises(ValueError, match='больше нуля'):
+        query_archive(session, limit=0)
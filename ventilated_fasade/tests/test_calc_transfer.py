@@ -0,0 +1,114 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from data.calc_transfer import export_calculations, import_calculations
+from data.db import get_sessionmaker
+from data.models_calc import Calculation
+
+from conftest import seed_calculations
+
+
+@pytest.fixture
+def target_url(db_url, tmp_path):
+    """Вторая БД для импорта; движки закрывает фикстура db_url."""
+    return f"sqlite:///{tmp_path / 'target.db'}"
+
+
+@pytest.fixture
+def export_path(db_url, tmp_path):
+    """Выгрузка 3 серий по 2 версии из db_url."""
+    seed_calculations(db_url, series=3, revisions=1)
+    path = tmp_path / 'calcs.jsonl'
+    assert export_calculations(str(path), db_url, batch_size=4) == 6
+    return path
+
+
+def snapshot(url):
+    """Расчеты БД по порядку id: номер, дата, входные данные, менеджеры."""
+    with get_sessionmaker(url)() as session:
+        calcs = session.execute(
+            select(Calculation).order_by(Calculation.id)).scalars().all()
+        return [
+            (c.number, c.created_at, c.input_payload,
+             sorted(m.last_name for m in c.managers),
+             c.address and c.address.line1)
+            for c in calcs
+        ]
+
+
+def test_round_trip(db_url, target_url, export_path):
+    stats = import_calculations(str(export_path), target_url, batch_size=4)
+
+    assert stats == {'total': 6, 'imported': 6, 'remapped': 0,
+                     'skipped': 0, 'errors': 0}
+    assert snapshot(target_url) == snapshot(db_url)
+
+
+def test_reimport_adds_nothing(db_url, target_url, export_path):
+    import_calculations(str(export_path), target_url, batch_size=4)
+    stats = import_calculations(str(export_path), target_url, batch_size=4)
+
+    assert stats == {'total': 6, 'imported': 0, 'remapped': 0,
+                     'skipped': 6, 'errors': 0}
+    assert snapshot(target_url) == snapshot(db_url)
+
+
+def test_interrupted_import_resumes(db_url, target_url, export_path,
+                                    tmp_path):
+    partial = tmp_path / 'partial.jsonl'
+    # Обрыв посреди второй серии: ее версия 1 еще не перенесена
+    lines = export_path.read_text(encoding='utf-8').splitlines(True)
+    partial.write_text(''.join(lines[:3]), encoding='utf-8')
+    import_calculations(str(partial), target_url, batch_size=2)
+    stats = import_calculations(str(export_path), target_url, batch_size=2)
+
+    assert stats['imported'] == 3
+    assert stats['skipped'] == 3
+    assert stats['remapped'] == 0
+    assert snapshot(target_url) == snapshot(db_url)
+
+
+def test_collision_is_remapped_once(db_url, target_url, export_path):
+    # Своя серия в целевой БД с тем же номером ПИ-001-0325
+    own = seed_calculations(target_url, series=1, revisions=0,
+                            start=datetime(2025, 3, 20, 12, 0))
+    source = [row[0] for row in snapshot(db_url)]
+    assert own[0] == source[0]
+
+    stats = import_calculations(str(export_path), target_url, batch_size=4)
+    assert stats['imported'] == 6
+    assert stats['remapped'] == 1
+    numbers = [row[0] for row in snapshot(target_url)]
+    assert numbers[0] == own[0]
+    # Конфликтная серия получила номер после занятых исходных
+    assert sorted(numbers[1:]) == sorted(
+        source[2:] + ['ПИ-004-0325', 'ПИ-004-0325-1'])
+
+    stats = import_calculations(str(export_path), target_url, batch_size=4)
+    assert stats['imported'] == 0
+    assert stats['remapped'] == 0
+    assert stats['skipped'] == 6
+    assert [row[0] for row in snapshot(target_url)] == numbers
+
+
+def test_collision_is_skipped(db_url, target_url, export_path):
+    own = seed_calculations(target_url, series=1, revisions=0,
+                            start=datetime(2025, 3, 20, 12, 0))
+    stats = import_calculations(
+        str(export_path), target_url, batch_size=4, on_conflict='skip')
+
+    assert stats['imported'] == 4
+    assert stats['skipped'] == 2
+    assert stats['remapped'] == 0
+    rows = snapshot(target_url)
+    assert rows[0][0] == own[0]
+    assert rows[0][1] == datetime(2025, 3, 20, 12, 0)
+    assert [row[0] for row in rows[1:]] == [
+        row[0] for row in snapshot(db_url)[2:]]
+
+
+def test_unknown_conflict_mode(target_url, export_path):
+    with pytest.raises(ValueError, match='Неизвестный режим'):
+        import_calculations(str(export_path), target_url, on_conflict='x')
@@ -0,0 +1,135 @@
+import sqlite3
+
+import pytest
+
+import data.catalog
+
+from data.catalog import (
+    get_catalog, invalidate_catalog, load_catalog, get_catalog_version)
+from data.db import get_engine, get_sessionmaker
+from data.models import (
+    Base, ConstructionType, MaterialType, Product, Size, Thickness)
+from data.snapshot import SnapshotError, read_snapshot, snapshot_path_for
+
+from conftest import set_manifest_version
+
+
+@pytest.fixture
+def materials_db(db_url):
+    """БД материалов: две полные записи и три неполные."""
+    Base.metadata.create_all(get_engine(db_url))
+    with get_sessionmaker(db_url)() as session:
+        construction = ConstructionType(name='НФС')
+        material_type = MaterialType(type='Базальт')
+        size = Size(length_mm=1200, width_mm=600)
+        thickness = Thickness(thickness_mm=100)
+        session.add_all([construction, material_type, size, thickness])
+        session.flush()
+        full = dict(construction_id=construction.id,
+                    material_type_id=material_type.id,
+                    size_id=size.id, thickness_id=thickness.id)
+        session.add_all([
+            Product(product_name_ru='Полный 1', product_name_en='Full 1',
+                    volume_m3=0.072, **full),
+            Product(product_name_ru='Без размера', product_name_en='No size',
+                    volume_m3=0.072, **{**full, 'size_id': None}),
+            Product(product_name_ru='Без типа', product_name_en='No type',
+                    volume_m3=0.072, **{**full, 'material_type_id': None}),
+            Product(product_name_ru='Без конструкции',
+                    product_name_en='No construction',
+                    volume_m3=0.072, **{**full, 'construction_id': None}),
+            Product(product_name_ru='Полный 2', product_name_en='Full 2',
+                    volume_m3=0.036, thermal_conductivity=0.037, **full),
+        ])
+        session.commit()
+    return db_url
+
+
+def test_load_catalog_skips_incomplete_products(materials_db):
+    catalog = load_catalog(materials_db)
+    assert catalog.get_all_ru_names() == ['Полный 1', 'Полный 2']
+    assert 'Без размера' not in catalog
+    assert catalog.get_materials_by_ru_name('Без типа') == []
+    row = catalog.get_all_materials()[1]
+    assert row['thickness_mm'] == 100
+    assert row['thermal_conductivity'] == 0.037
+
+
+def test_snapshot_round_trip(materials_db):
+    catalog = get_catalog(materials_db)
+    snapshot = read_snapshot(snapshot_path_for(materials_db))
+    assert snapshot.products == catalog.products
+
+
+def test_snapshot_records_catalog_version(materials_db):
+    set_manifest_version(materials_db, 'v1')
+    assert get_catalog_version(materials_db) == 'v1'
+    get_catalog(materials_db)
+    path = snapshot_path_for(materials_db)
+    assert len(read_snapshot(path, 'v1')) == 2
+    with pytest.raises(SnapshotError, match='устарел'):
+        read_snapshot(path, 'v2')
+
+
+def test_stale_snapshot_is_rebuilt(materials_db):
+    set_manifest_version(materials_db, 'v1')
+    assert len(get_catalog(materials_db)) == 2
+
+    # Другой процесс синхронизировал БД: новый продукт и новая метка
+    with get_sessionmaker(materials_db)() as session:
+        template = session.query(Product).filter_by(
+            product_name_ru='Полный 1').one()
+        session.add(Product(
+            product_name_ru='Полный 3', product_name_en='Full 3',
+            volume_m3=0.05, construction_id=template.construction_id,
+            material_type_id=template.material_type_id,
+            size_id=template.size_id, thickness_id=template.thickness_id))
+        session.commit()
+    set_manifest_version(materials_db, 'v2')
+
+    # Новый процесс: каталог в памяти пуст, снимок на диске устарел
+    invalidate_catalog()
+    catalog = get_catalog(materials_db)
+    assert 'Полный 3' in catalog
+    assert catalog.version == 'v2'
+    assert len(read_snapshot(snapshot_path_for(materials_db), 'v2')) == 3
+
+
+def test_running_process_sees_external_sync(materials_db):
+    set_manifest_version(materials_db, 'v1')
+    before = get_catalog(materials_db)
+    assert get_catalog(materials_db) is before
+
+    with get_sessionmaker(materials_db)() as session:
+        session.query(Product).filter_by(product_name_ru='Полный 2').delete()
+        session.commit()
+    set_manifest_version(materials_db, 'v2')
+
+    after = get_catalog(materials_db)
+    assert after is not before
+    assert after.version == 'v2'
+    assert 'Полный 2' not in after
+
+
+def test_calculator_resolves_products_in_memory(materials_db, monkeypatch):
+    from logic.calculator import InsulationCalculator
+
+    set_manifest_version(materials_db, 'v1')
+    catalog = get_catalog(materials_db)
+    # Пока файлы БД не менялись, к SQLite не обращаются вовсе
+    monkeypatch.setattr(sqlite3, 'connect', no_database)
+    monkeypatch.setattr(data.catalog, 'load_catalog', no_database)
+    for _ in range(3):
+        assert get_catalog(materials_db) is catalog
+    calc = InsulationCalculator(
+        'Полный 1', area_m2=100, building_height_m=9, count_corner=4,
+        repo=get_catalog(materials_db))
+    assert calc.summary()['outer_layer']['material'] == 'Полный 1'
+
+
+def no_database(*args, **kwargs):
+    raise AssertionError('обращение к БД')
+
+
+def test_get_catalog_version_without_manifest(tmp_path):
+    assert get_catalog_version(f"sqlite:///{tmp_path / 'none.db'}") == ''
@@ -0,0 +1,84 @@
+import csv
+import json
+
+import pytest
+
+from cli import main
+from data.sync import sync_db_with_fixture
+
+from conftest import make_fixture, write_fixture
+
+ROWS = [
+    {'id': 'a', 'area_m2': 100, 'building_height_m': 9, 'count_corner': 4,
+     'perimeter_m': 40, 'outer_material': 'Фасад 100'},
+    {'id': 'b', 'area_m2': 250, 'building_height_m': 12, 'count_corner': 6,
+     'perimeter_m': 60, 'outer_material': 'Фасад 100',
+     'inner_material': 'Фасад 50'},
+    {'id': 'c', 'area_m2': -1, 'building_height_m': 9, 'count_corner': 4,
+     'perimeter_m': 40, 'outer_material': 'Фасад 100'},
+    {'id': 'd', 'area_m2': 100, 'building_height_m': 9, 'count_corner': 4,
+     'perimeter_m': 40, 'outer_material': 'Нет такого'},
+]
+
+
+@pytest.fixture
+def batch_db(db_url, tmp_path):
+    """БД с каталогом фикстуры make_fixture."""
+    path = write_fixture(tmp_path / 'fixture.json', make_fixture())
+    assert sync_db_with_fixture(path, db_url)
+    return db_url
+
+
+def run_batch_cli(db_url, input_path, output_path, *args):
+    return main(['--db-url', db_url, 'batch', str(input_path),
+                 str(output_path), *args])
+
+
+def read_jsonl(path):
+    return [json.loads(line)
+            for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_batch_jsonl_reports_bad_lines_per_row(batch_db, tmp_path, workers):
+    source = tmp_path / 'input.jsonl'
+    lines = [json.dumps(row, ensure_ascii=False) for row in ROWS]
+    lines[2:2] = ['[1, 2]', '"строка"', '42', 'null', '{"id": ']
+    source.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    output = tmp_path / 'output.jsonl'
+
+    assert run_batch_cli(batch_db, source, output, '-w', workers,
+                         '--chunk-size', '3') == 0
+    records = read_jsonl(output)
+    assert [r['id'] for r in records] == ['a', 'b', 3, 4, 5, 6, 7, 'c', 'd']
+    assert [r['status'] for r in records] == ['ok'] * 2 + ['error'] * 7
+    assert [r['system_type'] for r in records[:2]] == ['single', 'double']
+    assert 'Строка 3: ожидался JSON-объект' in records[2]['error']
+    assert 'некорректный JSON' in records[6]['error']
+    assert 'не найден' in records[8]['error']
+
+    assert run_batch_cli(batch_db, source, output, '-w', workers,
+                         '--fail-on-error') == 1
+
+
+def test_batch_csv(batch_db, tmp_path):
+    source = tmp_path / 'input.csv'
+    with open(source, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(ROWS[1]))
+        writer.writeheader()
+        writer.writerows(ROWS)
+    output = tmp_path / 'output.csv'
+
+    assert run_batch_cli(batch_db, source, output, '-w', '1') == 0
+    with open(output, encoding='utf-8', newline='') as file:
+        records = list(csv.DictReader(file))
+    assert [r['id'] for r in records] == ['a', 'b', 'c', 'd']
+    assert [r['status'] for r in records] == ['ok', 'ok', 'error', 'error']
+    assert records[0]['inner_material'] == ''
+    assert int(records[1]['inner_sheets']) > 0
+
+
+def test_batch_unknown_format(batch_db, tmp_path):
+    source = tmp_path / 'input.txt'
+    source.write_text('', encoding='utf-8')
+    assert run_batch_cli(batch_db, source, tmp_path / 'out.jsonl') == 2
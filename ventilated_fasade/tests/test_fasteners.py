@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from logic.fasteners import (
+    FastenerEngine, corner_ends, distribute, snap_length)
+from logic.layout import Wall
+
+
+@pytest.mark.parametrize('total, weights, expected', [
+    (10, [1, 1, 1], [4, 3, 3]),
+    (7, [0.5, 0.3, 0.2], [4, 2, 1]),
+    (100, [0.25, 0.25, 0.5], [25, 25, 50]),
+    (0, [1, 2, 3], [0, 0, 0]),
+    (5, [0, 0, 0], [0, 0, 0]),
+])
+def test_distribute_examples(total, weights, expected):
+    assert distribute(total, weights).tolist() == expected
+
+
+def test_distribute_is_largest_remainder():
+    rng = np.random.default_rng(3)
+    for _ in range(500):
+        weights = rng.random(int(rng.integers(1, 6)))
+        total = int(rng.integers(1, 1000))
+        result = distribute(total, weights)
+        exact = total * weights / weights.sum()
+        floor = np.floor(exact)
+
+        assert result.sum() == total
+        assert np.all((result == floor) | (result == floor + 1))
+        # Единицы сверх floor получают доли с наибольшими остатками
+        bumped = result > floor
+        if bumped.any() and (~bumped).any():
+            remainder = exact - floor
+            assert remainder[bumped].min() >= remainder[~bumped].max() - 1e-9
+
+
+def test_corner_ends():
+    assert corner_ends(4, 4).tolist() == [2, 2, 2, 2]
+    assert corner_ends(4, 2).tolist() == [1, 1, 1, 1]
+    assert corner_ends(3, 1).tolist() == [1, 1, 0]
+    assert corner_ends(1, 5).tolist() == [2]
+    assert corner_ends(0, 4).tolist() == []
+
+
+def test_snap_length():
+    assert snap_length(90) == 90
+    assert snap_length(95) == 110
+    assert snap_length(500) == 500
+
+
+def test_engine_splits_all_sheets():
+    walls = [Wall(12.0, 9.0), Wall(8.0, 9.0)] * 2
+    engine = FastenerEngine(walls, count_corner=4)
+    result = engine.calculate(137, 1200, 600, 'outer')
+    zones = result['zones']
+
+    assert sum(z['sheets'] for z in zones.values()) == 137
+    assert zones['corner']['sheets'] > 0
+    assert result['count'] == (
+        zones['field']['sheets'] * 5 + zones['edge']['sheets'] * 7
+        + zones['corner']['sheets'] * 9)
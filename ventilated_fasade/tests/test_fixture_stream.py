@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from data.fixture_stream import iter_fixture
+
+FIXTURE = {
+    'constructions': [{'id': 1, 'name': 'НФС'}, {'id': 2, 'name': 'Штукатурный'}],
+    'empty': [],
+    'products': [
+        {'id': 10, 'product_name_ru': 'Фасад "100"\\Ж', 'volume_m3': 0.144,
+         'count': 123456789, 'ratio': -1.5e-3, 'flags': [True, False, None],
+         'size': {'length_mm': 1200, 'width_mm': 600}},
+        12345,
+        'строка',
+    ],
+}
+
+
+def write(tmp_path, text, name='fixture.json'):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def expected_items(fixture):
+    return [(name, item) for name, items in fixture.items() for item in items]
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 64, 1 << 16])
+def test_values_across_chunk_boundaries(tmp_path, indent, chunk_size):
+    path = write(tmp_path, json.dumps(FIXTURE, ensure_ascii=False,
+                                      indent=indent))
+    sections = []
+    items = list(iter_fixture(path, chunk_size=chunk_size,
+                              sections=sections))
+    assert items == expected_items(FIXTURE)
+    assert sections == list(FIXTURE)
+
+
+def test_escaped_unicode_across_boundary(tmp_path):
+    path = write(tmp_path, '{"p": ["\\u0416\\u0416", 1]}')
+    for chunk_size in range(1, 12):
+        assert list(iter_fixture(path, chunk_size=chunk_size)) == [
+            ('p', 'ЖЖ'), ('p', 1)]
+
+
+def test_truncated_input_raises(tmp_path):
+    text = json.dumps(FIXTURE, ensure_ascii=False, indent=2)
+    for cut in range(1, len(text), 7):
+        path = write(tmp_path, text[:cut])
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_fixture(path, chunk_size=16))
+
+
+def test_malformed_item_fails_without_reading_rest(tmp_path):
+    items = [{'id': i, 'product_name_ru': f'Плита {i}'} for i in range(20000)]
+    text = json.dumps({'products': items}, ensure_ascii=False, indent=1)
+    # Ломаем запись в начале файла: ключ без кавычек
+    text = text.replace('"product_name_ru": "Плита 3"',
+                        'product_name_ru: "Плита 3"', 1)
+    path = write(tmp_path, text)
+    with pytest.raises(json.JSONDecodeError) as info:
+        list(iter_fixture(path, chunk_size=256))
+    # Ошибка найдена в пределах пары блоков, а не после чтения файла
+    assert len(info.value.doc) < 1024
+
+
+@pytest.mark.parametrize('text', [
+    '[]', '{"p": {}}', '{"p": [1 2]}', '{"p": [1],}', '{"p": []} 1',
+    '{1: []}', '{"p": [tru]}',
+])
+def test_malformed_structure_raises(tmp_path, text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_fixture(write(tmp_path, text), chunk_size=4))
+
+
+def test_value_size_limit(tmp_path):
+    path = write(tmp_path, json.dumps({'p': ['x' * 5000, 1]}))
+    with pytest.raises(json.JSONDecodeError, match='длиннее'):
+        list(iter_fixture(path, chunk_size=64, max_value_size=1000))
+    assert len(list(iter_fixture(path, chunk_size=64))) == 2
@@ -0,0 +1,86 @@
+import json
+import time
+
+import pytest
+
+from data.fixture_validator import validate_fixture
+
+from conftest import fixture_product, make_fixture, write_fixture
+
+
+def errors(report):
+    return [str(issue) for issue in report.errors]
+
+
+def test_valid_fixture(tmp_path):
+    report = validate_fixture(write_fixture(tmp_path / 'f.json',
+                                            make_fixture()))
+    assert report.ok
+    assert report.counts == {'ConstructionType': 1, 'MaterialType': 1,
+                             'Size': 1, 'Thickness': 2, 'products': 2}
+
+
+def test_duplicates(tmp_path):
+    fixture = make_fixture([fixture_product('Фасад 50'),
+                            fixture_product('Фасад 50', 2)])
+    fixture['Thickness'].append({'id': 2, 'thickness_mm': 150})
+    report = validate_fixture(write_fixture(tmp_path / 'f.json', fixture))
+    assert errors(report) == [
+        'Thickness[2]: повторный id=2',
+        'products[1]: повторное название «Фасад 50»',
+    ]
+
+
+def test_references_declared_after_products(tmp_path):
+    fixture = make_fixture([fixture_product('Фасад 50', 2),
+                            fixture_product('Фасад 150', 3)])
+    # Справочник толщин идет после продуктов: ссылки сверяются в конце
+    fixture['Thickness'] = fixture.pop('Thickness')
+    assert list(fixture)[-1] == 'Thickness'
+    report = validate_fixture(write_fixture(tmp_path / 'f.json', fixture))
+    assert errors(report) == [
+        'products[1]: thickness_id=3 не найден в секции Thickness']
+
+
+def test_missing_section_and_keys(tmp_path):
+    fixture = make_fixture([{'product_name_ru': 'Без ключей'}])
+    del fixture['MaterialType']
+    fixture['Size'][0].pop('width_mm')
+    report = validate_fixture(write_fixture(tmp_path / 'f.json', fixture))
+    assert errors(report) == [
+        "Size[0]: нет обязательных ключей ['width_mm']",
+        'MaterialType: секция отсутствует',
+    ]
+    assert len(report.warnings) == 1
+
+
+@pytest.mark.parametrize('section, index, patch, message', [
+    ('Size', 0, {'id': [1]}, 'id=[1] должен быть числом или строкой'),
+    ('Thickness', 1, {'id': True}, 'id=True должен быть числом или строкой'),
+    ('products', 0, {'product_name_ru': {'ru': 'x'}},
+     "product_name_ru={'ru': 'x'} должно быть строкой"),
+    ('products', 1, {'size_id': [1]},
+     '«Фасад 100»: size_id=[1] должен быть числом или строкой'),
+    ('products', 1, {'volume_m3': '0.1'},
+     "«Фасад 100»: volume_m3='0.1' должно быть неотрицательным числом"),
+    ('Size', 0, {'length_mm': 0},
+     'length_mm=0 должно быть положительным числом'),
+])
+def test_bad_types_are_reported(tmp_path, section, index, patch, message):
+    fixture = make_fixture()
+    fixture[section][index].update(patch)
+    report = validate_fixture(write_fixture(tmp_path / 'f.json', fixture))
+    assert f'{section}[{index}]: {message}' in errors(report)
+
+
+def test_malformed_file_is_rejected_quickly(tmp_path):
+    products = [fixture_product(f'Плита {i}') for i in range(100000)]
+    text = json.dumps(make_fixture(products), ensure_ascii=False, indent=2)
+    text = text.replace('"Плита 10",', '"Плита 10" ', 1)
+    path = tmp_path / 'f.json'
+    path.write_text(text, encoding='utf-8')
+
+    started = time.perf_counter()
+    with pytest.raises(json.JSONDecodeError):
+        validate_fixture(str(path))
+    assert time.perf_counter() - started < 1
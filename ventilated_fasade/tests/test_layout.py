@@ -0,0 +1,109 @@
+import math
+
+import numpy as np
+import pytest
+
+from logic.calculator import InsulationCalculator
+from logic.layout import (
+    OffcutPool, Wall, _cut, _wall_pieces, layout_walls, walls_for_area,
+    walls_from_perimeter)
+
+
+@pytest.mark.parametrize('sheet, piece', [
+    ((1200, 600), (500, 600)),
+    ((1200, 600), (1200, 250)),
+    ((1200, 600), (600, 1100)),
+    ((1200, 600), (300, 200)),
+])
+def test_cut_is_guillotine(sheet, piece):
+    first, second = _cut(sheet, piece)
+    length, width = sheet
+    a, b = piece if piece[0] <= length and piece[1] <= width \
+        else piece[::-1]
+    across = ((length - a, width), (a, width - b))
+    along = ((length, width - b), (length - a, b))
+    assert (first, second) in (across, along)
+    assert a * b + first[0] * first[1] + second[0] * second[1] == \
+        length * width
+    # Выбран рез, оставляющий больший обрезок
+    assert first[0] * first[1] == max(
+        across[0][0] * across[0][1], along[0][0] * along[0][1])
+
+
+def test_offcut_pool_takes_smallest_fitting():
+    pool = OffcutPool(min_side_mm=100)
+    pool.add(600, 400)
+    pool.add(300, 900)
+    pool.add(50, 1200)
+    assert len(pool) == 2
+    assert pool.take(250, 800) == (300, 900)
+    # Деталь поворачивается, чтобы войти в обрезок
+    assert pool.take(500, 350) == (400, 600)
+    assert pool.take(100, 100) is None
+    assert len(pool) == 0
+
+
+def test_wall_pieces():
+    full, pieces = _wall_pieces(3000, 1300, 1200, 600)
+    assert full == 4
+    assert pieces == {(600, 600): 2, (1200, 100): 2, (600, 100): 1}
+
+
+def test_offcuts_are_reused_across_walls():
+    result = layout_walls([Wall(1.8, 0.6), Wall(1.8, 0.6)], 1200, 600)
+    # Две целые плиты и одна, разрезанная на две детали 600×600
+    assert result.sheets == 3
+    assert result.pieces == 4
+    assert result.pieces_from_offcuts == 1
+    assert result.covered_area_m2 == pytest.approx(2.16)
+    assert result.waste_m2 == pytest.approx(0)
+
+
+def test_layout_never_buys_less_than_covered():
+    rng = np.random.default_rng(5)
+    for _ in range(50):
+        walls = [Wall(round(float(rng.uniform(0.3, 20)), 2),
+                     round(float(rng.uniform(0.3, 12)), 2))
+                 for _ in range(int(rng.integers(1, 6)))]
+        result = layout_walls(walls, 1200, 600)
+        assert result.purchased_area_m2 >= result.covered_area_m2 - 1e-9
+        # Без обрезков каждая деталь — новая плита
+        naive = 0
+        for wall in walls:
+            full, pieces = _wall_pieces(round(wall.width_m * 1000),
+                                        round(wall.height_m * 1000),
+                                        1200, 600)
+            naive += full + sum(pieces.values())
+        assert result.sheets <= naive
+
+
+def test_walls_for_area():
+    walls = walls_for_area(300, 80, 5, count_corner=4)
+    gross = walls_from_perimeter(80, 5, count_corner=4)
+    assert [w.width_m for w in walls] == [w.width_m for w in gross]
+    assert sum(w.area_m2 for w in walls) == pytest.approx(300)
+    with pytest.raises(ValueError):
+        walls_for_area(0, 80, 5)
+
+
+def test_layout_mode_covers_net_area(catalog):
+    kwargs = dict(area_m2=350, building_height_m=9, count_corner=4,
+                  perimeter_m=48, reveal_area_m2=12, repo=catalog)
+    area = InsulationCalculator('Фасад 100', **kwargs)
+    layout = InsulationCalculator('Фасад 100', use_layout=True, **kwargs)
+
+    product = layout.outer_product
+    expected = 350 + 12 + area.get_bandaging_the_corner(product)
+    result = layout.layout_layer(product, 12)
+    assert result.covered_area_m2 == pytest.approx(expected, rel=1e-3)
+
+    sheet_area = area.get_sheet_area(product)
+    area_sheets = area.summary()['outer_layer']['sheets']
+    layout_sheets = layout.summary()['outer_layer']['sheets']
+    assert area_sheets == math.ceil(expected / sheet_area)
+    assert area_sheets <= layout_sheets <= area_sheets * 1.1
+
+    # Меньшая площадь нетто (больше проемов) — меньше плит
+    smaller = InsulationCalculator(
+        'Фасад 100', use_layout=True, **{**kwargs, 'area_m2': 250})
+    assert smaller.summary()['outer_layer']['sheets'] < layout_sheets
@@ -0,0 +1,98 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from data.catalog import MaterialCatalog
+from logic.batch_calculator import (
+    INNER_FASTENERS_PER_SHEET, OUTER_FASTENERS_PER_SHEET)
+from logic.optimizer import MaterialOptimizer, OptimizerWeights
+
+from conftest import make_product
+
+
+@pytest.fixture
+def large_catalog() -> MaterialCatalog:
+    """Каталог с повторяющимися толщинами, чтобы отсечение работало."""
+    rng = np.random.default_rng(13)
+    products = []
+    for n in range(40):
+        thickness = int(rng.choice([30, 50, 80, 100, 120, 150]))
+        length, width = [(1200, 600), (1000, 600), (1000, 500)][n % 3]
+        products.append(make_product(
+            f'Плита {n}', thickness,
+            round(float(rng.uniform(0.1, 0.5)), 4), length, width,
+            material_type='Кварц' if n % 4 == 0 else 'Базальт'))
+    # Одно название у двух записей: пара из них запрещена allow_same
+    products.append(make_product('Плита 0', 60, 0.2))
+    return MaterialCatalog(products)
+
+
+def brute_force(optimizer, area, height, corners, target, weights,
+                system_type, allow_same):
+    """Полный перебор с той же оценкой, что и MaterialOptimizer."""
+    idx = np.arange(len(optimizer.names))
+    outer = optimizer._layer(
+        area, height, corners, idx, OUTER_FASTENERS_PER_SHEET)
+    inner = optimizer._layer(
+        area, height, corners, idx, INNER_FASTENERS_PER_SHEET)
+    scales = {
+        key: max(float(outer[key].min()), 1e-9)
+        for key in ('volume', 'sheets', 'fasteners')
+    }
+    score_outer = optimizer._separable(outer, scales, weights)
+    score_inner = optimizer._separable(inner, scales, weights)
+
+    def penalty(thickness):
+        if not target:
+            return 0.0
+        return weights.thickness * abs(thickness - target) / target
+
+    thickness = optimizer.thickness_mm
+    if system_type == 'single':
+        return sorted(
+            (score_outer[o] + penalty(thickness[o]), optimizer.names[o], None)
+            for o in idx)
+    return sorted(
+        (score_outer[o] + score_inner[i] + penalty(thickness[o] + thickness[i]),
+         optimizer.names[o], optimizer.names[i])
+        for o, i in itertools.product(idx, idx)
+        if allow_same or optimizer.names[o] != optimizer.names[i])
+
+
+@pytest.mark.parametrize('system_type', ['single', 'double'])
+@pytest.mark.parametrize('target', [None, 180])
+@pytest.mark.parametrize('allow_same', [False, True])
+def test_rank_matches_brute_force(large_catalog, system_type, target,
+                                  allow_same):
+    optimizer = MaterialOptimizer(repo=large_catalog)
+    weights = OptimizerWeights(volume=1.0, sheets=0.3, fasteners=0.2)
+    top_k = 15
+    ranked = optimizer.rank(
+        850.0, 21.0, 6, system_type=system_type, target_thickness_mm=target,
+        weights=weights, top_k=top_k, allow_same=allow_same)
+    expected = brute_force(
+        optimizer, 850.0, 21.0, 6, target, weights, system_type,
+        allow_same)[:top_k]
+
+    assert [c.score for c in ranked] == pytest.approx(
+        [item[0] for item in expected])
+    assert [(c.outer_material, c.inner_material) for c in ranked] == [
+        (item[1], item[2]) for item in expected]
+
+
+def test_rank_filters_material_types(large_catalog):
+    optimizer = MaterialOptimizer(repo=large_catalog)
+    ranked = optimizer.rank(
+        300.0, 9.0, 4, outer_material_type='Кварц',
+        inner_material_type='Базальт', top_k=5)
+    quartz = {p.product_name_ru for p in large_catalog.products
+              if p.material_type_name == 'Кварц'}
+    assert ranked
+    assert all(c.outer_material in quartz for c in ranked)
+    assert all(c.inner_material not in quartz for c in ranked)
+
+
+def test_rank_rejects_unknown_system_type(catalog):
+    with pytest.raises(ValueError):
+        MaterialOptimizer(repo=catalog).rank(100, 5, 4, system_type='triple')
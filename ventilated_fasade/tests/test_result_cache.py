@@ -0,0 +1,134 @@
+import pytest
+
+import data.catalog as catalog
+from data.catalog import get_catalog_version
+from data.db import get_engine
+from data.models import ResultCacheEntry
+from logic.result_cache import ResultCache, canonical_payload
+from logic.validators import ValidationError
+
+from conftest import set_manifest_version
+
+PAYLOAD = {'area_m2': 100.0, 'building_height_m': 9.0, 'count_corner': 4}
+
+
+class Counter:
+    """compute() для кэша, считающий вызовы."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {'sheets': self.calls}
+
+
+def gui_payload(system_type, inner, outer):
+    """Входные данные в виде _gather_input_payload окна расчета."""
+    return {
+        'system_type': system_type, 'area_m2': '100',
+        'building_height_m': '9', 'count_corner': '4', 'perimeter_m': '40',
+        'reveal_area_m2': 0.0, 'inner_material': inner,
+        'outer_material': outer, 'use_layout': False,
+        'zoned_fasteners': False, 'manager': 'Смирнова Анна',
+        'address': {'line1': 'ул. Ленина 1'},
+    }
+
+
+API_PAYLOAD = {'area_m2': 100, 'building_height_m': 9.0, 'count_corner': 4,
+               'perimeter_m': 40}
+
+
+@pytest.mark.parametrize('gui, api', [
+    (gui_payload('mono', 'Фасад 100', 'Фасад 100'),
+     {**API_PAYLOAD, 'system_type': 'single', 'outer_material': 'Фасад 100'}),
+    (gui_payload('mono', 'Фасад 100 ', 'Фасад 100'),
+     {**API_PAYLOAD, 'outer_material': 'Фасад 100'}),
+    (gui_payload('double', 'Фасад 50', 'Фасад 100'),
+     {**API_PAYLOAD, 'outer_material': 'Фасад 100',
+      'inner_material': 'Фасад 50'}),
+])
+def test_gui_and_api_payloads_share_key(gui, api):
+    gui, api = canonical_payload(gui), canonical_payload(api)
+    assert gui == api
+    assert ResultCache.make_key(gui, 'v1') == ResultCache.make_key(api, 'v1')
+
+
+def test_unknown_system_type_is_rejected():
+    with pytest.raises(ValidationError, match='тип системы'):
+        canonical_payload({**API_PAYLOAD, 'system_type': 'triple'})
+
+
+def stored_versions(db_url):
+    table = ResultCacheEntry.__table__
+    with get_engine(db_url).connect() as conn:
+        return [row.catalog_version for row in conn.execute(table.select())]
+
+
+def test_memory_and_disk_hits(db_url):
+    set_manifest_version(db_url, 'v1')
+    compute = Counter()
+    cache = ResultCache(db_url)
+    assert cache.get_or_compute(PAYLOAD, compute) == {'sheets': 1}
+    assert cache.get_or_compute(PAYLOAD, compute) == {'sheets': 1}
+
+    other = ResultCache(db_url)
+    assert other.get_or_compute(PAYLOAD, compute) == {'sheets': 1}
+    assert compute.calls == 1
+    assert cache.stats()['memory_hits'] == 1
+    assert other.stats()['disk_hits'] == 1
+
+
+def test_external_sync_invalidates_cache(db_url):
+    set_manifest_version(db_url, 'v1')
+    compute = Counter()
+    cache = ResultCache(db_url)
+    cache.get_or_compute(PAYLOAD, compute)
+
+    # Каталог синхронизировал другой процесс
+    set_manifest_version(db_url, 'v2')
+    assert cache.get_or_compute(PAYLOAD, compute) == {'sheets': 2}
+    assert compute.calls == 2
+    assert stored_versions(db_url) == ['v2']
+
+
+def test_result_of_stale_catalog_is_not_stored(db_url):
+    set_manifest_version(db_url, 'v2')
+    compute = Counter()
+    cache = ResultCache(db_url)
+    cache.get_or_compute(PAYLOAD, compute, catalog_version='v1')
+    cache.get_or_compute(PAYLOAD, compute, catalog_version='v1')
+    assert compute.calls == 2
+    assert stored_versions(db_url) == []
+
+
+def test_result_computed_during_sync_is_not_served(db_url):
+    set_manifest_version(db_url, 'v1')
+    cache = ResultCache(db_url)
+    compute = Counter()
+
+    def syncing():
+        set_manifest_version(db_url, 'v2')
+        return compute()
+
+    cache.get_or_compute(PAYLOAD, syncing)
+    assert get_catalog_version(db_url) == 'v2'
+    # Результат остался под ключом v1 и после синхронизации не находится
+    assert cache.get_or_compute(PAYLOAD, compute) == {'sheets': 2}
+    assert stored_versions(db_url) == ['v2']
+
+
+def test_hit_reads_no_manifest(db_url, monkeypatch):
+    set_manifest_version(db_url, 'v1')
+    compute = Counter()
+    cache = ResultCache(db_url)
+    cache.get_or_compute(PAYLOAD, compute)
+    cache.get_or_compute(PAYLOAD, compute)
+
+    def no_read(db_url):
+        raise AssertionError('манифест не должен читаться')
+
+    monkeypatch.setattr(catalog, 'read_catalog_version', no_read)
+    for _ in range(3):
+        assert cache.get_or_compute(PAYLOAD, compute) == {'sheets': 1}
+    assert cache.stats()['memory_hits'] == 4
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+import api.server as server
+from api.server import CalculationService
+from data.sync import sync_db_with_fixture
+
+from conftest import make_fixture, write_fixture
+
+PAYLOAD = {'area_m2': 100, 'building_height_m': 9.0, 'count_corner': 4,
+           'perimeter_m': 40, 'outer_material': 'Фасад 100'}
+
+
+@pytest.fixture
+def service_url(db_url, tmp_path):
+    """БД с каталогом фикстуры make_fixture."""
+    path = write_fixture(tmp_path / 'fixture.json', make_fixture())
+    assert sync_db_with_fixture(path, db_url)
+    return db_url
+
+
+async def request(port, method, path, body=None):
+    """HTTP-запрос к сервису на 127.0.0.1: (статус, JSON-ответ)."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = b'' if body is None else body
+    writer.write(
+        f'{method} {path} HTTP/1.1\r\nHost: test\r\n'
+        f'Content-Length: {len(data)}\r\nConnection: close\r\n\r\n'
+        .encode('latin-1') + data)
+    await writer.drain()
+    head, _, payload = (await reader.read()).partition(b'\r\n\r\n')
+    writer.close()
+    return int(head.split()[1]), json.loads(payload)
+
+
+def run_service(db_url, scenario):
+    """Запускает сервис на свободном порту и выполняет scenario(service, port)."""
+    async def main():
+        service = CalculationService(db_url, max_concurrency=4)
+        srv = await service.start('127.0.0.1', 0)
+        try:
+            return await scenario(service, srv.sockets[0].getsockname()[1])
+        finally:
+            await service.close()
+    return asyncio.run(main())
+
+
+def test_calculate(service_url):
+    async def scenario(service, port):
+        return await request(port, 'POST', '/calculate',
+                             json.dumps(PAYLOAD).encode('utf-8'))
+
+    status, result = run_service(service_url, scenario)
+    assert status == 200
+    assert result['outer_layer']['sheets'] > 0
+
+
+@pytest.mark.parametrize('method, path, body, status', [
+    ('POST', '/calculate', b'{"area_m2": ', 400),
+    ('POST', '/calculate', b'[1, 2]', 400),
+    ('POST', '/calculate', json.dumps(
+        {**PAYLOAD, 'area_m2': -5}).encode('utf-8'), 422),
+    ('GET', '/calculate', None, 405),
+    ('GET', '/nowhere', None, 404),
+])
+def test_bad_requests(service_url, method, path, body, status):
+    async def scenario(service, port):
+        return await request(port, method, path, body)
+
+    got, result = run_service(service_url, scenario)
+    assert got == status
+    assert result['error']
+
+
+def test_identical_requests_are_coalesced(service_url, monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def slow(payload, db_url):
+        calls.append(payload)
+        release.wait(5)
+        return {'ok': True}
+
+    monkeypatch.setattr(server, 'calculate_single', slow)
+    body = json.dumps(PAYLOAD).encode('utf-8')
+
+    async def scenario(service, port):
+        tasks = [asyncio.ensure_future(
+            request(port, 'POST', '/calculate', body)) for _ in range(5)]
+        while service.stats.coalesced < 4:
+            await asyncio.sleep(0.01)
+        release.set()
+        responses = await asyncio.gather(*tasks)
+        _, stats = await request(port, 'GET', '/stats')
+        return responses, stats
+
+    responses, stats = run_service(service_url, scenario)
+    assert responses == [(200, {'ok': True})] * 5
+    assert len(calls) == 1
+    assert stats['coalesced'] == 4
+    assert stats['routes']['calculate']['requests'] == 5
+
+
+def test_stats_and_materials_run_in_pool(service_url, monkeypatch):
+    threads = []
+
+    def record(fn):
+        def wrapper(*args):
+            threads.append(threading.current_thread().name)
+            return fn(*args)
+        return wrapper
+
+    monkeypatch.setattr(server, 'list_materials',
+                        record(server.list_materials))
+    monkeypatch.setattr(server, 'result_cache_stats',
+                        record(server.result_cache_stats))
+
+    async def scenario(service, port):
+        return (await request(port, 'GET', '/materials'),
+                await request(port, 'GET', '/stats'))
+
+    (status, materials), (stats_status, stats) = run_service(
+        service_url, scenario)
+    assert status == stats_status == 200
+    assert len(materials['items']) == 2
+    assert 'hit_rate' in stats['result_cache']
+    assert len(threads) == 2
+    assert all(name.startswith('api') for name in threads)
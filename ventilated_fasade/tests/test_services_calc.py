@@ -0,0 +1,128 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.exc import OperationalError
+
+import data.db as db
+from data.db import get_sessionmaker, retry_on_busy
+from data.models_calc import CalcSequence, Calculation
+from data.services_calc import reserve_seq
+
+from conftest import seed_calculations
+
+MARCH = datetime(2025, 3, 1, 9, 0)
+
+
+@pytest.fixture
+def engineer_id(db_url):
+    """Инженер с тремя расчетами за март 2025 (seq 1–3)."""
+    seed_calculations(db_url, series=3, revisions=0, start=MARCH)
+    with get_sessionmaker(db_url)() as session:
+        return session.execute(
+            select(Calculation.engineer_id).limit(1)).scalar()
+
+
+def reserve(db_url, engineer_id, dt=MARCH, count=1):
+    """Резервирует номера в отдельной транзакции."""
+    with get_sessionmaker(db_url)() as session:
+        first = reserve_seq(session, engineer_id, dt, count)
+        session.commit()
+        return range(first, first + count)
+
+
+def test_counter_continues_after_existing(db_url, engineer_id):
+    assert reserve(db_url, engineer_id) == range(4, 5)
+
+
+def test_new_counter_is_seeded_from_max_seq(db_url, engineer_id):
+    with get_sessionmaker(db_url)() as session:
+        session.execute(delete(CalcSequence))
+        session.commit()
+    assert reserve(db_url, engineer_id, count=2) == range(4, 6)
+    # Другой месяц и другой инженер считаются с единицы
+    assert reserve(db_url, engineer_id, datetime(2025, 4, 1)) == range(1, 2)
+    assert reserve(db_url, engineer_id + 1) == range(1, 2)
+
+
+def test_rolled_back_reservation_is_reused(db_url, engineer_id):
+    with get_sessionmaker(db_url)() as session:
+        assert reserve_seq(session, engineer_id, MARCH, 5) == 4
+        session.rollback()
+    assert reserve(db_url, engineer_id) == range(4, 5)
+
+
+def test_count_must_be_positive(db_url, engineer_id):
+    with get_sessionmaker(db_url)() as session:
+        with pytest.raises(ValueError, match='больше нуля'):
+            reserve_seq(session, engineer_id, MARCH, 0)
+
+
+def test_concurrent_blocks_do_not_overlap(db_url, engineer_id):
+    blocks, errors = [], []
+
+    def worker(count):
+        try:
+            for _ in range(5):
+                blocks.append(retry_on_busy(
+                    reserve, db_url, engineer_id, count=count))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(count,))
+               for count in range(1, 7)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    numbers = sorted(seq for block in blocks for seq in block)
+    assert numbers == list(range(4, 4 + 5 * sum(range(1, 7))))
+
+
+def test_retry_on_busy_repeats_whole_transaction(db_url, engineer_id,
+                                                 monkeypatch):
+    monkeypatch.setattr(db.time, 'sleep', lambda delay: None)
+    attempts = []
+
+    def store():
+        with get_sessionmaker(db_url)() as session:
+            first = reserve_seq(session, engineer_id, MARCH, 3)
+            attempts.append(first)
+            if len(attempts) < 3:
+                # Фиксация не прошла: БД занята другим писателем
+                raise OperationalError(
+                    'COMMIT', {}, sqlite3.OperationalError('database is locked'))
+            session.commit()
+            return first
+
+    assert retry_on_busy(store, retries=3) == 4
+    # Неудачные попытки откатились и не заняли номеров
+    assert attempts == [4, 4, 4]
+    assert reserve(db_url, engineer_id) == range(7, 8)
+
+
+def test_retry_on_busy_gives_up(monkeypatch):
+    monkeypatch.setattr(db.time, 'sleep', lambda delay: None)
+    calls = []
+
+    def locked():
+        calls.append(1)
+        raise OperationalError(
+            'INSERT', {}, sqlite3.OperationalError('database is locked'))
+
+    with pytest.raises(OperationalError):
+        retry_on_busy(locked, retries=2)
+    assert len(calls) == 3
+
+    def broken():
+        calls.append(1)
+        raise OperationalError(
+            'INSERT', {}, sqlite3.OperationalError('no such table: x'))
+
+    with pytest.raises(OperationalError):
+        retry_on_busy(broken, retries=2)
+    assert len(calls) == 4
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def imported_modules(statement):
+    """Модули, загруженные в чистом процессе после statement."""
+    code = f'import sys\n{statement}\nprint(" ".join(sys.modules))'
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=PROJECT_DIR, check=True,
+        capture_output=True, text=True).stdout
+    return set(output.split())
+
+
+def test_gui_import_is_light():
+    pytest.importorskip('tkinter')
+    modules = imported_modules('import gui.calc_app')
+    assert 'sqlalchemy' not in modules
+    assert 'numpy' not in modules
+
+
+def test_snapshot_read_is_light(tmp_path):
+    from data.catalog import MaterialCatalog
+    from data.snapshot import write_snapshot
+    from conftest import make_product
+
+    path = tmp_path / 'catalog.snapshot'
+    write_snapshot(
+        MaterialCatalog([make_product('Фасад 100', 100, 0.072)]), str(path))
+    modules = imported_modules(
+        f'from data.snapshot import read_snapshot\n'
+        f'assert len(read_snapshot({str(path)!r}, "")) == 1')
+    assert 'sqlalchemy' not in modules
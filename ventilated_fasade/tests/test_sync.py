@@ -0,0 +1,175 @@
+import os
+
+import pytest
+from sqlalchemy import select
+
+import data.sync as sync
+from data.catalog import get_catalog
+from data.db import get_engine
+from data.models import Product, Thickness
+from data.sync import sync_db_with_fixture
+
+from conftest import fixture_product, make_fixture, write_fixture
+
+
+class Stop(Exception):
+    pass
+
+
+def products(db_url):
+    table = Product.__table__
+    with get_engine(db_url).connect() as conn:
+        return {
+            row.product_name_ru: (row.volume_m3, row.thickness_id)
+            for row in conn.execute(select(table))
+        }
+
+
+@pytest.fixture
+def synced(db_url, tmp_path):
+    """БД после первой синхронизации фикстуры make_fixture."""
+    path = write_fixture(tmp_path / 'fixture.json', make_fixture())
+    assert sync_db_with_fixture(path, db_url) == sync.SECTIONS
+    return db_url, tmp_path / 'fixture.json'
+
+
+def test_first_sync_inserts_everything(synced):
+    db_url, _ = synced
+    assert products(db_url) == {'Фасад 50': (0.288, 1),
+                                'Фасад 100': (0.144, 2)}
+    assert sorted(get_catalog(db_url).get_all_ru_names()) == [
+        'Фасад 100', 'Фасад 50']
+
+
+def test_upsert_updates_inserts_and_deletes(synced):
+    db_url, path = synced
+    fixture = make_fixture([
+        fixture_product('Фасад 50', 2, 0.3),
+        fixture_product('Фасад 150', 1, 0.1),
+    ])
+    fixture['Thickness'][1]['thickness_mm'] = 110
+    write_fixture(path, fixture)
+
+    assert sync_db_with_fixture(str(path), db_url) == ['Thickness',
+                                                       'products']
+    assert products(db_url) == {'Фасад 50': (0.3, 2),
+                                'Фасад 150': (0.1, 1)}
+    with get_engine(db_url).connect() as conn:
+        assert conn.execute(select(Thickness.thickness_mm).where(
+            Thickness.id == 2)).scalar() == 110
+    catalog = get_catalog(db_url)
+    assert sorted(catalog.get_all_ru_names()) == ['Фасад 150', 'Фасад 50']
+    product, = catalog.get_materials_by_ru_name('Фасад 50')
+    assert product.thickness.thickness_mm == 110
+
+
+def test_failed_write_rolls_back(synced, monkeypatch):
+    db_url, path = synced
+    before = products(db_url)
+    write_fixture(path, make_fixture([fixture_product('Новый')]))
+
+    def fail(*args):
+        raise RuntimeError('сбой записи манифеста')
+
+    monkeypatch.setattr(sync, 'write_manifest', fail)
+    assert sync_db_with_fixture(str(path), db_url) is None
+    assert products(db_url) == before
+
+
+def test_cancel_from_progress_rolls_back(synced):
+    db_url, path = synced
+    before = products(db_url)
+    write_fixture(path, make_fixture(
+        [fixture_product(f'Плита {i}') for i in range(10)]))
+
+    def progress(count):
+        if count >= 3:
+            raise Stop()
+
+    with pytest.raises(Stop):
+        sync_db_with_fixture(str(path), db_url, batch_size=1,
+                             progress=progress)
+    assert products(db_url) == before
+
+
+def test_rebuild_failure_keeps_sync_result(synced, monkeypatch):
+    db_url, path = synced
+    get_catalog(db_url)
+    write_fixture(path, make_fixture([fixture_product('Новый')]))
+
+    def fail(db_url):
+        raise OSError('диск переполнен')
+
+    monkeypatch.setattr(sync, 'rebuild_catalog', fail)
+    assert sync_db_with_fixture(str(path), db_url) == ['products']
+    assert list(products(db_url)) == ['Новый']
+    assert get_catalog(db_url).get_all_ru_names() == ['Новый']
+
+
+def manifest(db_url):
+    with get_engine(db_url).connect() as conn:
+        return sync.read_manifest(conn)
+
+
+def test_unchanged_file_skipped_by_size_and_mtime(synced, monkeypatch):
+    db_url, path = synced
+
+    def no_hash(path):
+        raise AssertionError('файл не должен читаться')
+
+    monkeypatch.setattr(sync, 'file_hash', no_hash)
+    assert sync_db_with_fixture(str(path), db_url) == []
+
+
+def test_touched_file_skipped_by_hash(synced, monkeypatch):
+    db_url, path = synced
+    before = manifest(db_url)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def no_stream(*args):
+        raise AssertionError('фикстура не должна разбираться')
+
+    monkeypatch.setattr(sync, 'stream_fixture', no_stream)
+    assert sync_db_with_fixture(str(path), db_url) == []
+    after = manifest(db_url)
+    assert after.mtime_ns == before.mtime_ns + 10 ** 9
+    assert after.catalog_version == before.catalog_version
+    # Следующий запуск снова отсекается по размеру и времени
+    monkeypatch.setattr(sync, 'file_hash', lambda path: 1 / 0)
+    assert sync_db_with_fixture(str(path), db_url) == []
+
+
+@pytest.mark.parametrize('edit, changed', [
+    (lambda f: f['Size'][0].update(width_mm=500), ['Size']),
+    (lambda f: f['products'][0].update(volume_m3=0.5), ['products']),
+    (lambda f: f['products'].reverse(), ['products']),
+])
+def test_only_changed_sections_are_rewritten(synced, monkeypatch,
+                                             edit, changed):
+    db_url, path = synced
+    version = manifest(db_url).catalog_version
+    fixture = make_fixture()
+    edit(fixture)
+    write_fixture(path, fixture)
+
+    rewritten = []
+    apply_stage = sync.apply_stage
+
+    def record(conn, table, *args, **kwargs):
+        rewritten.append(table)
+        return apply_stage(conn, table, *args, **kwargs)
+
+    monkeypatch.setattr(sync, 'apply_stage', record)
+    assert sync_db_with_fixture(str(path), db_url) == changed
+    tables = {model.__name__: model.__tablename__
+              for model in sync.LOOKUP_MODELS}
+    tables['products'] = Product.__tablename__
+    assert rewritten == [tables[name] for name in changed]
+    assert manifest(db_url).catalog_version != version
+
+
+def test_force_rewrites_all_sections(synced):
+    db_url, path = synced
+    assert sync_db_with_fixture(str(path), db_url, force=True) == \
+        sync.SECTIONS
@@ -0,0 +1,49 @@
+import os
+import time
+
+from gui.tasks import TaskExecutor
+
+# Меняется в тестовом процессе; порожденный через spawn процесс
+# импортирует модуль заново и видит исходное значение
+STATE = {'parent': False}
+
+
+def child_state():
+    return STATE['parent'], os.getpid()
+
+
+class Root:
+    """Заменитель Tk: after() выполняется при вызове run_pending()."""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append(callback)
+
+    def run_pending(self):
+        pending, self.pending = self.pending, []
+        for callback in pending:
+            callback()
+
+
+def test_cpu_tasks_run_in_spawned_process():
+    STATE['parent'] = True
+    root = Root()
+    executor = TaskExecutor(root, cpu_workers=1, poll_ms=1)
+    results, errors = [], []
+    try:
+        executor.submit(child_state, kind='cpu',
+                        on_done=results.append, on_error=errors.append)
+        deadline = time.monotonic() + 60
+        while executor.busy and time.monotonic() < deadline:
+            root.run_pending()
+            time.sleep(0.01)
+    finally:
+        executor.shutdown()
+        STATE['parent'] = False
+
+    assert errors == []
+    (inherited, pid), = results
+    assert pid != os.getpid()
+    assert inherited is False